@@ -2,9 +2,16 @@ from django.contrib.auth.models import User
 
 import xadmin
 
+from .models import Product
+
 
 class UserAdmin:
     pass
 
 
+class ProductAdmin:
+    list_display = ('name', 'store', 'code', 'edition', 'category', 'price')
+
+
 xadmin.site.register(User, UserAdmin)
+xadmin.site.register(Product, ProductAdmin)
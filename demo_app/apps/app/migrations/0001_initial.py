@@ -0,0 +1,41 @@
+# Generated by Django 3.1.14 on 2026-10-16 23:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store', models.CharField(max_length=32, verbose_name='store')),
+                ('code', models.CharField(max_length=32, verbose_name='code')),
+                ('name', models.CharField(max_length=100, verbose_name='name')),
+                ('edition', models.PositiveIntegerField(default=1, verbose_name='edition')),
+                ('category', models.CharField(choices=[('book', 'Book'), ('music', 'Music'), ('game', 'Game')], default='book', max_length=16, verbose_name='category')),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='price')),
+                ('revision', models.IntegerField(default=0, verbose_name='revision')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='owner')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('name', 'edition'), name='app_product_name_edition'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='product',
+            unique_together={('store', 'code')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Product(models.Model):
+    CATEGORY_CHOICES = (
+        ('book', 'Book'),
+        ('music', 'Music'),
+        ('game', 'Game'),
+    )
+
+    store = models.CharField('store', max_length=32)
+    code = models.CharField('code', max_length=32)
+    name = models.CharField('name', max_length=100)
+    edition = models.PositiveIntegerField('edition', default=1)
+    category = models.CharField('category', max_length=16, choices=CATEGORY_CHOICES, default='book')
+    price = models.DecimalField('price', max_digits=10, decimal_places=2, default=0)
+    revision = models.IntegerField('revision', default=0)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, models.SET_NULL, null=True, blank=True, verbose_name='owner'
+    )
+    created = models.DateTimeField('created', default=timezone.now)
+
+    class Meta:
+        unique_together = ('store', 'code')
+        constraints = [
+            models.UniqueConstraint(fields=('name', 'edition'), name='app_product_name_edition'),
+        ]
+
+    def __str__(self):
+        return self.name
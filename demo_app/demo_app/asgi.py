@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'demo_app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+import xadmin  # noqa: E402
+
+# change feed 的 SSE 长连接由 xadmin 直接处理，其他请求交给 Django
+application = xadmin.site.asgi_application(django_application)
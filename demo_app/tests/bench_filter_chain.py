@@ -0,0 +1,56 @@
+"""
+filter_hook 调用开销的基准，不在默认的测试中运行：
+
+    python manage.py test tests.bench_filter_chain
+"""
+import timeit
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase
+
+from xadmin.sites import AdminSite
+from xadmin.views.base import compile_filter_chain
+
+from .test_filter_chain import ChainView, make_plugin
+
+NUMBER = 5000
+
+
+def uncached_filter_chain(view_class, tag):
+    """ 对照：每次调用都重新解析插件方法链 """
+    return compile_filter_chain(getattr(view_class, 'plugin_classes', ()), tag)
+
+
+class FilterChainBenchmark(SimpleTestCase):
+
+    def make_view(self, count, executor):
+        site = AdminSite(name=f'bench_{count}_{executor}')
+        site.set_filter_executor(executor)
+        for index in range(count):
+            site.register_plugin(make_plugin(index, 'lazy', 10, True, 1), ChainView)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        view = site.get_view_class(ChainView, base_result='base')(request)
+        view.log = []
+        return view
+
+    def measure(self, view):
+        """ 每次调用的最短耗时（微秒） """
+        def call():
+            view.log.clear()
+            view.process('value')
+        return min(timeit.repeat(call, number=NUMBER, repeat=3)) / NUMBER * 1e6
+
+    def test_plugin_counts(self):
+        print(f'\none lazy hook per plugin, us per call, best of 3 x {NUMBER}')
+        print(f'{"plugins":<10}{"executor":<12}{"uncached":>10}{"cached":>10}')
+        for executor in ('recursive', 'iterative'):
+            for count in (0, 5, 20):
+                view = self.make_view(count, executor)
+                with mock.patch('xadmin.views.base.get_filter_chain', uncached_filter_chain):
+                    uncached = self.measure(view)
+                cached = self.measure(view)
+                print(f'{count:<10}{executor:<12}{uncached:>10.2f}{cached:>10.2f}')
+                if count:
+                    self.assertLess(cached, uncached)
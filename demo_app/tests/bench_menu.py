@@ -0,0 +1,49 @@
+"""
+注册 500 个 model 时菜单骨架的基准，不在默认的测试中运行：
+
+    python manage.py test tests.bench_menu
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+
+from xadmin.views import ListAdminView
+
+from .utils import make_site
+
+MODELS = 500
+
+
+class MenuBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def first_requests(self, site, shared):
+        """
+        每个 model 的 changelist view 类第一次生成菜单的总耗时。shared 为 False 时每个 view 类都重新构建骨架，
+        相当于按 view 类保存骨架时的情况。
+        """
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        views = [site.get_view_class(ListAdminView, admin_class)(request) for admin_class in site._registry.values()]
+        site._menu_skeletons = {}
+        start = time.perf_counter()
+        for view in views:
+            if not shared:
+                site._menu_skeletons = {}
+            view.get_user_nav_menu()
+        return time.perf_counter() - start
+
+    @override_settings(DEBUG=True)
+    def test_first_requests(self):
+        site, urlconf = make_site(MODELS, name='bench_menu')
+        with override_settings(ROOT_URLCONF=urlconf):
+            per_view = self.first_requests(site, shared=False)
+            shared = self.first_requests(site, shared=True)
+        print(f'\n{MODELS} models, first menu of each changelist view class (no menu cache):')
+        print(f'  skeleton per view class: {per_view * 1000:8.0f} ms')
+        print(f'  shared skeleton:         {shared * 1000:8.0f} ms')
+        self.assertLess(shared, per_view)
@@ -0,0 +1,62 @@
+"""
+搜索后端的基准，不在默认的测试中运行：
+
+    python manage.py test tests.bench_search
+"""
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+import xadmin
+from xadmin.search import SEARCH_VAR, SqliteFTSSearchBackend
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+ROWS = 200000
+SEARCH_FIELDS = ('username', 'first_name', 'email')
+QUERIES = ('w1234', 'w17 w18', 'example')
+
+
+class SearchBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create([
+            User(username=f'user{i}', first_name=f'w{i % 5000} w{i % 37}', email=f'user{i}@example.com')
+            for i in range(ROWS)
+        ], batch_size=5000)
+
+    def setUp(self):
+        self.addCleanup(SqliteFTSSearchBackend._existing_tables.clear)
+        option = xadmin.site._registry[User]
+        with mock.patch.object(option, 'search_fields', SEARCH_FIELDS, create=True), \
+                mock.patch.object(option, 'search_backend', 'sqlite_fts', create=True):
+            call_command('xadmin_search_index', 'auth.User', stdout=mock.Mock())
+
+    def measure(self, backend, query):
+        """ 首页（包括计数）的最短耗时 """
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            response = get_admin_response(
+                ListAdminView, User, self.admin, '/auth/user/', {SEARCH_VAR: query},
+                search_fields=SEARCH_FIELDS, search_backend=backend,
+            )
+            timings.append(time.perf_counter() - start)
+        return min(timings), response.context_data['result_count']
+
+    def test_backends(self):
+        print(f'\n{ROWS} users, first page with count, best of 3')
+        print(f'{"query":<12}{"icontains":>18}{"sqlite_fts":>18}')
+        for query in QUERIES:
+            (icontains, icontains_count), (fts, fts_count) = [
+                self.measure(backend, query) for backend in ('icontains', 'sqlite_fts')
+            ]
+            print(f'{query!r:<12}{icontains * 1000:>10.0f} ms ({icontains_count:>5}){fts * 1000:>10.0f} ms ({fts_count:>5})')
+        # 单个不常见的词使用索引时应明显更快
+        self.assertLess(self.measure('sqlite_fts', 'w1234')[0], self.measure('icontains', 'w1234')[0])
@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+import xadmin
+from app.models import Product
+from xadmin.plugins.actions import ACTION_CHECKBOX_NAME, ActionPlugin, DeleteSelectedAction
+from xadmin.plugins.batch import BatchChangeAction
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+
+class BatchChangeActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.users = [User.objects.create_user(f'user{i}') for i in range(3)]
+
+    def test_enabled_by_batch_fields(self):
+        response = get_admin_response(ListAdminView, User, self.admin, '/auth/user/')
+        self.assertNotContains(response, 'change_selected')
+        response = get_admin_response(ListAdminView, User, self.admin, '/auth/user/', batch_fields=('is_staff',))
+        self.assertContains(response, 'change_selected')
+
+    def test_change_selected(self):
+        data = {
+            'action': 'change_selected',
+            ACTION_CHECKBOX_NAME: [user.pk for user in self.users[:2]],
+            'post': 'yes',
+            '_batch_change_fields': ['is_staff'],
+            'is_staff': 'on',
+        }
+        response = get_admin_response(
+            ListAdminView, User, self.admin, '/auth/user/', data, method='post', batch_fields=('is_staff',)
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(User.objects.filter(is_staff=True).values_list('username', flat=True)), {'admin', 'user0', 'user1'}
+        )
+
+
+class ProductBatchChangeTests(TestCase):
+    """ 批量修改：校验后对选中的行执行一条 UPDATE，不读取对象 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.products = [
+            Product.objects.create(store='s1', code=f'c{i}', name=f'Product {i}', price=Decimal('1.00'))
+            for i in range(4)
+        ]
+
+    def post(self, data, **options):
+        options.setdefault('batch_fields', ('category', 'price', 'owner'))
+        data = dict({'action': 'change_selected'}, **data)
+        return get_admin_response(ListAdminView, Product, self.admin, '/app/product/', data, method='post', **options)
+
+    def test_registered_on_site(self):
+        self.assertIsNone(ActionPlugin.global_actions)
+        self.assertEqual(xadmin.site.get_actions(), [DeleteSelectedAction, BatchChangeAction])
+
+    def test_global_actions_option_overrides_site(self):
+        response = get_admin_response(
+            ListAdminView, Product, self.admin, '/app/product/', batch_fields=('price',),
+            global_actions=[DeleteSelectedAction],
+        )
+        self.assertContains(response, 'delete_selected')
+        self.assertNotContains(response, 'change_selected')
+
+    def test_form(self):
+        response = self.post({ACTION_CHECKBOX_NAME: [self.products[0].pk, self.products[1].pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['count'], 2)
+        self.assertEqual(list(response.context_data['form'].fields), ['category', 'price', 'owner'])
+        self.assertContains(response, '_batch_change_fields')
+
+    def test_change_across_selection_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({
+                'select_across': '1', 'post': 'yes',
+                '_batch_change_fields': ['price', 'owner'], 'price': '9.50', 'owner': self.admin.pk,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Product.objects.values_list('price', 'owner')), {(Decimal('9.50'), self.admin.pk)}
+        )
+        # 不读取产品的行
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'app_product' in q['sql']])
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "app_product"')]), 1)
+
+    def test_only_checked_fields_change(self):
+        response = self.post({
+            ACTION_CHECKBOX_NAME: [self.products[0].pk], 'post': 'yes',
+            '_batch_change_fields': ['category'], 'category': 'game', 'price': '5.00',
+        })
+        self.assertEqual(response.status_code, 302)
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual((product.category, product.price), ('game', Decimal('1.00')))
+        self.assertEqual(Product.objects.filter(category='game').count(), 1)
+
+    def test_invalid_value_redisplays_form(self):
+        response = self.post({
+            ACTION_CHECKBOX_NAME: [self.products[0].pk], 'post': 'yes',
+            '_batch_change_fields': ['price'], 'price': 'abc',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('price', response.context_data['form'].errors)
+        self.assertEqual(Product.objects.filter(price=Decimal('1.00')).count(), 4)
+
+    def test_field_outside_batch_fields_is_ignored(self):
+        response = self.post({
+            ACTION_CHECKBOX_NAME: [self.products[0].pk], 'post': 'yes',
+            '_batch_change_fields': ['name'], 'name': 'Renamed',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Product.objects.filter(name='Renamed').exists())
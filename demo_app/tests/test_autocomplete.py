@@ -0,0 +1,139 @@
+from django import forms
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+import xadmin
+from app.models import Product
+from xadmin.views.form import FormAdminView
+from xadmin.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+
+
+class ProductForm(forms.ModelForm):
+
+    class Meta:
+        model = Product
+        fields = ('name', 'owner')
+
+
+class UserPermissionsForm(forms.ModelForm):
+
+    class Meta:
+        model = User
+        fields = ('username', 'user_permissions')
+
+
+class AutocompleteFormTests(TestCase):
+    """ 关联表行数超过 autocomplete_threshold 时外键、多对多字段改用 autocomplete 控件 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create([User(username=f'user{i:02d}') for i in range(24)])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_view(self, form, **options):
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        return xadmin.site.get_view_class(FormAdminView, form=form, **options)(request)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_widget_swapped_above_threshold(self):
+        view = self.get_view(ProductForm, autocomplete_threshold=10)
+        widget = view.view_form.base_fields['owner'].widget
+        self.assertIsInstance(widget, AutocompleteSelect)
+        self.assertEqual(widget.url, '/auth/user/autocomplete/?_field=app.product.owner')
+        # 原来的 form 类不变
+        self.assertNotIsInstance(ProductForm.base_fields['owner'].widget, AutocompleteSelect)
+
+    def test_widget_kept_without_endpoint(self):
+        # Permission 没有注册到 xadmin，没有 autocomplete 接口
+        self.analyze()
+        form_class = self.get_view(UserPermissionsForm, autocomplete_threshold=10).view_form
+        self.assertIs(form_class, UserPermissionsForm)
+        self.assertNotIsInstance(form_class.base_fields['user_permissions'].widget, AutocompleteSelectMultiple)
+
+    def test_widget_kept_below_threshold(self):
+        self.assertIs(self.get_view(ProductForm, autocomplete_threshold=100).view_form, ProductForm)
+        self.assertIs(self.get_view(ProductForm, autocomplete_threshold=None).view_form, ProductForm)
+
+    def test_renders_only_selected_options(self):
+        owner = User.objects.get(username='user07')
+        form_class = self.get_view(ProductForm, autocomplete_threshold=10).view_form
+        form = form_class(instance=Product(name='Book', owner=owner))
+        with CaptureQueriesContext(connection) as queries:
+            html = str(form['owner'])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('user07', html)
+        self.assertNotIn('user08', html)
+        self.assertIn('data-search-url="/auth/user/autocomplete/?_field=app.product.owner"', html)
+
+    def test_relation_size_from_estimate(self):
+        self.analyze()
+        User.objects.create_user('late')
+        view = self.get_view(ProductForm, autocomplete_threshold=10)
+        with CaptureQueriesContext(connection) as queries:
+            # sqlite_stat1 中的行数为 ANALYZE 时的 25
+            self.assertEqual(view.get_relation_size(User), 25)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+    def test_relation_size_from_cached_count(self):
+        view = self.get_view(ProductForm, autocomplete_threshold=10)
+        cache.clear()
+        with self.assertNumQueries(2):
+            # 查找统计信息及一次 COUNT
+            self.assertEqual(view.get_relation_size(User), 25)
+        User.objects.create_user('late')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(view.get_relation_size(User), 25)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+
+class AutocompleteViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create([User(username=f'user{i:02d}') for i in range(24)])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        return self.client.get('/auth/user/autocomplete/', params)
+
+    def test_pages(self):
+        first = self.get(_q_='user', _field='app.product.owner').json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertTrue(first['more'])
+        second = self.get(_q_='user', _field='app.product.owner', _page=2).json()
+        self.assertEqual(len(second['results']), 4)
+        self.assertFalse(second['more'])
+        ids = [r['id'] for r in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 24)
+        self.assertEqual(second['results'][-1]['text'], 'user23')
+
+    def test_search(self):
+        results = self.get(_q_='user1').json()['results']
+        self.assertEqual({r['text'] for r in results}, {f'user{i}' for i in range(10, 20)})
+
+    def test_unknown_field_is_forbidden(self):
+        for label in ('app.product.nope', 'app.product.store', 'app.product', 'app.nope.owner',
+                      'auth.user.groups'):
+            with self.subTest(label=label):
+                self.assertEqual(self.get(_field=label).status_code, 403)
+
+    def test_requires_view_permission(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.get().status_code, 403)
+        staff.user_permissions.add(Permission.objects.get(codename='view_user'))
+        self.client.force_login(User.objects.get(pk=staff.pk))
+        self.assertEqual(self.get().status_code, 200)
@@ -0,0 +1,78 @@
+import json
+import posixpath
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from xadmin import util
+from xadmin.management.commands.xadmin_bundle import CSS_URL_RE
+from xadmin.util import BUNDLE_MANIFEST, get_bundle_key, vendor
+from xadmin.vendors import bundles
+
+
+class BundleCommandTests(SimpleTestCase):
+    """ xadmin_bundle 把每组 vendor tags 合并为带摘要的文件，vendor() 在开启 XADMIN_STATIC_BUNDLE 后使用它们 """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static_root = Path(tmp.name)
+        call_command('xadmin_bundle', output_dir=str(self.static_root), stdout=StringIO())
+        self.manifest = json.loads((self.static_root / BUNDLE_MANIFEST).read_text(encoding='utf-8'))
+        self.reset_caches()
+
+    def reset_caches(self):
+        for name, value in (('_bundle_manifest', None), ('_vendor_cache', {}), ('_xstatic_cache', {})):
+            patcher = mock.patch.object(util, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_manifest(self):
+        keys = {get_bundle_key(tags) for media_sets in bundles.values() for tags in media_sets}
+        self.assertEqual(set(self.manifest), keys)
+        for key, entry in self.manifest.items():
+            with self.subTest(key=key):
+                for file_type, name in entry.items():
+                    self.assertTrue(name.startswith('xadmin/bundles/'))
+                    self.assertTrue(name.endswith(f'.{file_type}'))
+                    self.assertTrue((self.static_root / name).is_file())
+
+        dashboard = self.manifest[get_bundle_key(bundles['dashboard'][0])]
+        self.assertEqual(set(dashboard), {'css', 'js'})
+        content = (self.static_root / dashboard['js']).read_text(encoding='utf-8')
+        self.assertIn('/* xadmin/js/xadmin.page.dashboard.js */', content)
+        self.assertNotIn('sourceMappingURL', content)
+
+    def test_css_urls_relative_to_bundle(self):
+        css = self.manifest[get_bundle_key(bundles['base'][0])]['css']
+        content = (self.static_root / css).read_text(encoding='utf-8')
+        urls = {re.split('[?#]', url)[0] for quote, url in CSS_URL_RE.findall(content) if not url.startswith('data:')}
+        # font-awesome 中的 ../webfonts/ 改为相对 xadmin/bundles/ 的路径
+        self.assertIn('../vendor/font-awesome/webfonts/fa-solid-900.woff2', urls)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertTrue(finders.find(posixpath.normpath(posixpath.join('xadmin/bundles', url))))
+
+    def test_vendor_uses_bundles(self):
+        tags = bundles['base'][1]
+        with override_settings(STATICFILES_DIRS=[str(self.static_root)], DEBUG=False, XADMIN_STATIC_BUNDLE=True):
+            media = vendor(*tags)
+        self.assertEqual(media._js, [f'/static/{self.manifest[get_bundle_key(tags)]["js"]}'])
+        self.assertEqual(media._css, {'screen': []})
+
+        # 没有开启 XADMIN_STATIC_BUNDLE 或 DEBUG 模式下使用原来的文件
+        for options in ({'DEBUG': True, 'XADMIN_STATIC_BUNDLE': True}, {'DEBUG': False}):
+            self.reset_caches()
+            with self.subTest(**options), override_settings(STATICFILES_DIRS=[str(self.static_root)], **options):
+                self.assertEqual(vendor(*tags)._js, [f for tag in tags for f in util.xstatic(tag)])
+
+    def test_tags_without_bundle(self):
+        with override_settings(STATICFILES_DIRS=[str(self.static_root)], DEBUG=False, XADMIN_STATIC_BUNDLE=True):
+            media = vendor('xadmin.page.list.js')
+        self.assertEqual(media._js, ['/static/xadmin/js/xadmin.page.list.js'])
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+import xadmin
+from app.models import Product
+from xadmin.changefeed import CacheBroker, MemoryBroker, publish_change
+
+
+def event(pk, model='app.product'):
+    return {'model': model, 'pk': str(pk), 'action': 'save', 'created': False}
+
+
+class MemoryBrokerTests(SimpleTestCase):
+
+    def test_publish_from_other_thread(self):
+        broker = MemoryBroker()
+
+        @async_to_sync
+        async def run():
+            subscription = broker.subscribe()
+            # publish 在写入数据的线程中调用
+            thread = threading.Thread(target=broker.publish, args=(event(1),))
+            thread.start()
+            item = await subscription.get(5)
+            thread.join()
+            empty = await subscription.get(0.01)
+            subscription.close()
+            return item, empty
+
+        self.assertEqual(run(), ((1, event(1)), None))
+        self.assertEqual(broker._subscribers, set())
+
+    def test_replay_after_last_event_id(self):
+        broker = MemoryBroker(history=3)
+        for pk in range(1, 6):
+            broker.publish(event(pk))
+
+        @async_to_sync
+        async def read(last_event_id):
+            subscription = broker.subscribe(last_event_id)
+            items = []
+            while True:
+                item = await subscription.get(0.01)
+                if item is None:
+                    subscription.close()
+                    return items
+                items.append(item[0])
+
+        self.assertEqual(read(None), [])
+        self.assertEqual(read(3), [4, 5])
+        # 只保留最近 history 个事件
+        self.assertEqual(read(0), [3, 4, 5])
+
+    def test_slow_subscriber_drops_oldest(self):
+        broker = MemoryBroker(queue_size=2)
+
+        @async_to_sync
+        async def run():
+            subscription = broker.subscribe()
+            for pk in range(1, 4):
+                broker.publish(event(pk))
+            # call_soon_threadsafe 的回调在下一轮事件循环中执行
+            await asyncio.sleep(0)
+            items = [await subscription.get(0.01) for _ in range(3)]
+            subscription.close()
+            return items
+
+        self.assertEqual([item and item[0] for item in run()], [2, 3, None])
+
+
+class CacheBrokerTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.broker = CacheBroker(poll_interval=0.01)
+
+    def read(self, last_event_id, timeout=0.05):
+        @async_to_sync
+        async def run():
+            subscription = self.broker.subscribe(last_event_id)
+            items = []
+            while True:
+                item = await subscription.get(timeout)
+                if item is None:
+                    return items
+                items.append(item)
+
+        return run()
+
+    def test_publish_and_subscribe(self):
+        self.broker.publish(event(1))
+        self.broker.publish(event(2))
+        self.assertEqual(cache.get(CacheBroker.seq_key), 2)
+        # 新的订阅只接收之后的事件
+        self.assertEqual(self.read(None), [])
+        self.assertEqual(self.read(1), [(2, event(2))])
+        self.assertEqual(self.read(0), [(1, event(1)), (2, event(2))])
+
+    def test_polls_new_events(self):
+        @async_to_sync
+        async def run():
+            subscription = self.broker.subscribe()
+            loop = asyncio.get_event_loop()
+            loop.call_later(0.05, self.broker.publish, event(1))
+            return await subscription.get(5)
+
+        self.assertEqual(run(), (1, event(1)))
+
+    def test_expired_events_skipped(self):
+        for pk in range(1, 6):
+            self.broker.publish(event(pk))
+        cache.delete(self.broker.get_event_key(3))
+        self.assertEqual([seq for seq, item in self.read(0)], [1, 2, 4, 5])
+        # 每次最多读取 batch_size 个
+        self.broker.batch_size = 2
+        self.assertEqual([seq for seq, item in self.read(0)], [4, 5])
+
+
+class PublishChangeTests(TestCase):
+
+    def setUp(self):
+        self.broker = MemoryBroker()
+        patcher = mock.patch('xadmin.changefeed._broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [item for seq, item in self.broker._history]
+
+    def test_published_on_commit(self):
+        callbacks = []
+        product = Product(pk=1, store='s1', code='c1', name='Book')
+        with mock.patch('xadmin.changefeed.transaction.on_commit',
+                        lambda func, using=None: callbacks.append(func)):
+            publish_change(Product, product, created=True)
+            publish_change(Product, product)
+            publish_change(Product, product, created=False, raw=True)
+        # 事务提交前没有发布
+        self.assertEqual(self.published(), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.published(), [
+            {'model': 'app.product', 'pk': '1', 'action': 'save', 'created': True},
+            {'model': 'app.product', 'pk': '1', 'action': 'delete', 'created': False},
+        ])
+
+
+class ChangeFeedApplicationTests(TestCase):
+    """ AdminSite.asgi_application 包装的应用以 SSE 推送有权限的 model 的变更 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.broker = MemoryBroker()
+        for target, value in (('xadmin.changefeed._broker', self.broker),
+                              ('xadmin.changefeed.close_old_connections', lambda: None)):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.inner = []
+
+        async def application(scope, receive, send):
+            self.inner.append(scope['path'])
+
+        self.application = xadmin.site.asgi_application(application)
+
+    def call(self, path, query_string=b'', headers=()):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': query_string, 'headers': list(headers),
+        }
+        messages = []
+
+        @async_to_sync
+        async def run():
+            disconnected = asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if b'event: change' in message.get('body', b''):
+                    disconnected.set()
+
+            await asyncio.wait_for(self.application(scope, receive, send), 5)
+
+        run()
+        return messages
+
+    def test_without_wrapper(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/changes/')
+        self.assertEqual(response.status_code, 501)
+
+    def test_other_requests_passed_through(self):
+        self.call('/app/product/')
+        self.assertEqual(self.inner, ['/app/product/'])
+
+    def test_requires_admin_login(self):
+        messages = self.call('/changes/')
+        self.assertEqual(messages[0]['status'], 403)
+        self.assertEqual(self.inner, [])
+
+    def test_stream(self):
+        self.client.force_login(self.admin)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.broker.publish(event(1, 'auth.user'))
+        self.broker.publish(event(2, 'auth.group'))
+        self.broker.publish(event(3))
+
+        messages = self.call('/changes/', b'models=app.product', [
+            (b'cookie', cookie.encode('utf-8')), (b'last-event-id', b'0'),
+        ])
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), messages[0]['headers'])
+        bodies = [message['body'].decode('utf-8') for message in messages[1:]]
+        self.assertEqual(bodies[0], 'retry: 3000\n\n')
+        # 只推送订阅的 model 的事件，序号用于重连
+        self.assertEqual(bodies[1:], [f'id: 3\nevent: change\ndata: {json.dumps(event(3))}\n\n'])
+        # 断开后取消订阅
+        self.assertEqual(self.broker._subscribers, set())
@@ -0,0 +1,113 @@
+import datetime
+import math
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import xadmin
+from app.models import Product
+from xadmin.plugins.chart import downsample
+
+
+class DownsampleTests(SimpleTestCase):
+
+    def test_keeps_shape(self):
+        points = [[x, math.sin(x / 10)] for x in range(1000)]
+        points[500][1] = 10
+        sampled = downsample(points, 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        # 尖峰不会被平均掉
+        self.assertIn(points[500], sampled)
+        self.assertEqual([p[0] for p in sampled], sorted(p[0] for p in sampled))
+
+    def test_small_inputs_unchanged(self):
+        points = [[x, x] for x in range(10)]
+        self.assertIs(downsample(points, 10), points)
+        self.assertIs(downsample(points, 2), points)
+
+
+class ChartViewTests(TestCase):
+    """ ChartsView 在数据库中统计图表数据 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.start = timezone.now().replace(second=0, microsecond=0) - datetime.timedelta(hours=2)
+        # store 的总数：s1 5 个、s2 4 个、s3 3 个、s4 1 个，但 (store, category) 中 s3 的 game 比 s2 的任一分组多
+        rows = [('s1', 'book')] * 5 + [('s2', 'book')] * 2 + [('s2', 'music')] * 2 + [('s3', 'game')] * 3 + \
+            [('s4', 'music')]
+        for i, (store, category) in enumerate(rows):
+            Product.objects.create(
+                store=store, code=f'c{i}', name=f'Product {i}', edition=i % 3 + 1, category=category,
+                price=i, created=cls.start + datetime.timedelta(minutes=i * 7),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def get_chart(self, **chart):
+        with mock.patch.object(xadmin.site._registry[Product], 'data_charts', {'test': chart}, create=True):
+            response = self.client.get('/app/product/chart/test/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def series(self, result):
+        return {series['label']: series['data'] for series in result['data']}
+
+    def test_top_categories(self):
+        result = self.get_chart(**{'x-field': 'store', 'y-field': {'count': Count('pk')}, 'max-points': 2})
+        self.assertEqual(self.series(result), {'Count': [['s1', 5], ['s2', 4]]})
+        self.assertEqual(result['option']['xaxis'], {'mode': 'categories'})
+
+    def test_top_categories_with_group_by(self):
+        result = self.get_chart(**{
+            'x-field': 'store', 'y-field': {'count': Count('pk')}, 'group-by': 'category', 'max-points': 2,
+        })
+        # 先选出总数最多的两个 store，再取它们所有分组的值；不是 (store, category) 中最多的两行
+        self.assertEqual(self.series(result), {'Book': [['s1', 5], ['s2', 2]], 'Music': [['s2', 2]]})
+
+    def test_numeric_x_is_ordered(self):
+        result = self.get_chart(**{'x-field': 'edition', 'y-field': [Count('pk'), Sum('price')]})
+        series = self.series(result)
+        self.assertEqual([x for x, y in series['Pk__count']], [1, 2, 3])
+        self.assertEqual(sum(y for x, y in series['Pk__count']), 13)
+        self.assertEqual(sum(y for x, y in series['Price__sum']), sum(range(13)))
+
+    def test_time_series_downsampled(self):
+        result = self.get_chart(**{
+            'x-field': 'created', 'y-field': {'price': Sum('price')}, 'bucket': 'minute', 'max-points': 5,
+        })
+        points = self.series(result)['Price']
+        self.assertEqual(len(points), 5)
+        # 首尾两点总是保留
+        self.assertEqual(points[0][1], 0)
+        self.assertEqual(points[-1][1], 12)
+        self.assertEqual(points, sorted(points))
+        self.assertEqual(points[-1][0] - points[0][0], 12 * 7 * 60 * 1000)
+        self.assertEqual(result['option']['xaxis'], {'mode': 'time'})
+
+    def test_time_bucket_chosen_from_span(self):
+        # 84 分钟的跨度，max-points 为 10 时分钟粒度点数太多，按小时统计
+        result = self.get_chart(**{'x-field': 'created', 'y-field': {'count': Count('pk')}, 'max-points': 10})
+        points = self.series(result)['Count']
+        self.assertLessEqual(len(points), 3)
+        self.assertEqual(sum(y for x, y in points), 13)
+
+    def test_cached(self):
+        chart = {'x-field': 'store', 'y-field': {'count': Count('pk')}}
+        self.get_chart(**chart)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_chart(**chart)
+        self.assertFalse([q for q in queries if 'GROUP BY' in q['sql']])
+
+    def test_unknown_chart(self):
+        with mock.patch.object(xadmin.site._registry[Product], 'data_charts', {}, create=True):
+            self.assertEqual(self.client.get('/app/product/chart/missing/').status_code, 404)
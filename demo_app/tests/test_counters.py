@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+
+from app.models import Product
+from xadmin.counters import CachedCounter, EstimateCounter, ExactCounter, get_counter_class
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+
+class CounterTests(TestCase):
+    """ 各种行数统计方式在 SQLite 上的行为 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        Product.objects.bulk_create([
+            Product(store=f's{i % 3}', code=f'c{i}', name=f'Product {i}', category='book' if i % 2 else 'game')
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.admin_view = SimpleNamespace(count_cache='default', count_cache_timeout=60, count_estimate_threshold=10)
+
+    def count(self, counter_class, queryset):
+        return counter_class(self.admin_view).count(queryset)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_exact(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(ExactCounter, Product.objects.filter(category='book')), (15, False))
+
+    def test_cached_by_sql(self):
+        queryset = Product.objects.filter(store='s0')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(CachedCounter, queryset), (10, False))
+            # 相同的 sql 及参数使用缓存的结果
+            self.assertEqual(self.count(CachedCounter, Product.objects.filter(store='s0')), (10, False))
+
+        key = CachedCounter(self.admin_view).get_cache_key(queryset)
+        self.assertEqual(cache.get(key), 10)
+        self.assertNotEqual(key, CachedCounter(self.admin_view).get_cache_key(Product.objects.filter(store='s1')))
+
+        # 缓存期间的新行不计入
+        Product.objects.create(store='s0', code='new', name='New')
+        self.assertEqual(self.count(CachedCounter, queryset), (10, False))
+
+    def test_cached_empty_result(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(CachedCounter, Product.objects.filter(pk__in=[])), (0, False))
+
+    def test_estimate_without_statistics(self):
+        # 没有执行过 ANALYZE 时没有 sqlite_stat1，使用精确行数
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            has_stats = cursor.fetchone() is not None
+        if has_stats:
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM sqlite_stat1')
+        self.assertIsNone(EstimateCounter(self.admin_view).estimate(Product.objects.all()))
+        self.assertEqual(self.count(EstimateCounter, Product.objects.all()), (30, False))
+
+    def test_estimate_from_sqlite_stat1(self):
+        self.analyze()
+        Product.objects.create(store='s0', code='new', name='New')
+        # 统计信息是 ANALYZE 时的行数
+        self.assertEqual(self.count(EstimateCounter, Product.objects.all()), (30, True))
+        self.analyze()
+        self.assertEqual(self.count(EstimateCounter, Product.objects.all()), (31, True))
+
+    def test_estimate_below_threshold_is_exact(self):
+        self.analyze()
+        self.admin_view.count_estimate_threshold = 100
+        # 读取统计信息后再查询精确行数
+        with self.assertNumQueries(3):
+            self.assertEqual(self.count(EstimateCounter, Product.objects.all()), (30, False))
+
+    def test_filtered_estimate_falls_back_to_exact(self):
+        # SQLite 的 EXPLAIN QUERY PLAN 没有估算行数，有过滤条件时使用精确行数
+        self.analyze()
+        self.assertIsNone(EstimateCounter(self.admin_view).estimate(Product.objects.filter(store='s1')))
+        self.assertEqual(self.count(EstimateCounter, Product.objects.filter(store='s1')), (10, False))
+        self.assertEqual(self.count(EstimateCounter, Product.objects.distinct()), (30, False))
+
+    def test_changelist_count_strategy(self):
+        self.analyze()
+        response = get_admin_response(
+            ListAdminView, Product, self.admin, '/app/product/', count_strategy='estimate',
+            count_estimate_threshold=10,
+        )
+        self.assertEqual(response.context_data['result_count'], 30)
+        self.assertTrue(response.context_data['result_count_approximate'])
+
+        response = get_admin_response(
+            ListAdminView, Product, self.admin, '/app/product/', count_strategy='cached',
+        )
+        self.assertEqual(response.context_data['result_count'], 30)
+        self.assertFalse(response.context_data['result_count_approximate'])
+
+    def test_counter_class(self):
+        self.assertIs(get_counter_class('estimate'), EstimateCounter)
+        self.assertIs(get_counter_class(CachedCounter), CachedCounter)
+        with self.assertRaises(ImproperlyConfigured):
+            get_counter_class('approximate')
@@ -0,0 +1,175 @@
+import asyncio
+import io
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.test import RequestFactory, TestCase
+from django.utils import translation
+
+import xadmin
+from xadmin.views import IndexView
+from xadmin.views.dashboard import BaseWidget, widget_manager
+
+# 测试 widget 之间共享的状态，每个测试重新设置
+state = {}
+
+
+class BarrierWidget(BaseWidget):
+    """ 所有 widget 都进入 get_data 后才返回，串行执行时会超时 """
+
+    widget_type = 'test_barrier'
+
+    def get_data(self):
+        state['barrier'].wait(timeout=5)
+        return {'thread': threading.current_thread().name, 'language': translation.get_language()}
+
+
+class AsyncWidget(BaseWidget):
+    widget_type = 'test_async'
+
+    async def get_data(self):
+        events = state['events']
+        events[self.widget_id].set()
+        # 等待其他 widget 开始执行
+        for event in events.values():
+            await asyncio.wait_for(event.wait(), timeout=5)
+        return {'language': translation.get_language()}
+
+
+class CountingWidget(BaseWidget):
+    widget_type = 'test_counting'
+    template = 'xadmin/widgets/html.html'
+    cache_timeout = 60
+
+    def get_data(self):
+        state['calls'] = state.get('calls', 0) + 1
+        return {'content': self.options.get('content', '')}
+
+
+class DashboardTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+        state.clear()
+        for widget_class in (BarrierWidget, AsyncWidget, CountingWidget):
+            widget_manager.register(widget_class)
+            self.addCleanup(widget_manager._widgets.pop, widget_class.widget_type)
+
+    def set_widgets(self, widgets, **options):
+        options['widgets'] = widgets
+        for name, value in options.items():
+            patcher = mock.patch.object(IndexView, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_view(self, request):
+        request.user = self.admin
+        request.session = {}
+        view = xadmin.site.get_view_class(IndexView)(request)
+        return view, [widget for column in view.widget_columns for widget in column]
+
+
+class RunWidgetsTests(DashboardTestCase):
+    """ 多个 widget 的 get_data 并发执行 """
+
+    def test_thread_pool(self):
+        state['barrier'] = threading.Barrier(3)
+        self.set_widgets([[{'type': 'test_barrier'}, {'type': 'test_barrier'}], [{'type': 'test_barrier'}]])
+        view, widgets = self.get_view(RequestFactory().get('/'))
+        with translation.override('zh-hans'):
+            view.load_widgets(widgets)
+        for widget in widgets:
+            self.assertTrue(widget.data['thread'].startswith('xadmin-widget'))
+            # 工作线程使用请求的语言
+            self.assertEqual(widget.data['language'], 'zh-hans')
+
+    def test_single_widget_runs_inline(self):
+        self.set_widgets([[{'type': 'test_counting'}]])
+        view, widgets = self.get_view(RequestFactory().get('/'))
+        with mock.patch('xadmin.views.dashboard.get_widget_executor') as get_executor:
+            view.load_widgets(widgets)
+        get_executor.assert_not_called()
+        self.assertEqual(state['calls'], 1)
+
+    def test_asyncio_tasks_under_asgi(self):
+        state['barrier'] = threading.Barrier(2)
+        self.set_widgets([[{'type': 'test_async', 'id': 'a'}, {'type': 'test_async', 'id': 'b'}],
+                          [{'type': 'test_barrier'}, {'type': 'test_barrier'}]])
+        request = ASGIRequest({
+            'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': [],
+        }, io.BytesIO())
+        view, widgets = self.get_view(request)
+
+        async def run_widgets_async(*args):
+            # 事件在 async_to_sync 的事件循环中创建
+            state['events'] = {'a': asyncio.Event(), 'b': asyncio.Event()}
+            return await original(*args)
+
+        original = view.run_widgets_async
+        with translation.override('zh-hans'), \
+                mock.patch('xadmin.views.dashboard.get_widget_executor') as get_executor, \
+                mock.patch.object(view, 'run_widgets_async', run_widgets_async):
+            view.load_widgets(widgets)
+        get_executor.assert_not_called()
+        self.assertEqual([widget.data['language'] for widget in widgets], ['zh-hans'] * 4)
+        # 同步的 get_data 在 asgiref 的线程中执行，不使用共用的线程池
+        self.assertFalse([w for w in widgets[2:] if w.data['thread'].startswith('xadmin-widget')])
+
+    def test_cached_data(self):
+        self.set_widgets([[{'type': 'test_counting', 'content': 'a'}, {'type': 'test_counting', 'content': 'b'}]])
+        for _ in range(2):
+            view, widgets = self.get_view(RequestFactory().get('/'))
+            view.load_widgets(widgets)
+        self.assertEqual(state['calls'], 2)
+        self.assertEqual([widget.data['content'] for widget in widgets], ['a', 'b'])
+
+
+class WidgetResponseTests(DashboardTestCase):
+    """ 延迟加载的 widget 内容及其 HTTP 缓存 """
+
+    def setUp(self):
+        super(WidgetResponseTests, self).setUp()
+        self.client.force_login(self.admin)
+        self.set_widgets([[{'type': 'test_counting', 'id': 'w1', 'content': '<b>first</b>'}]], widget_deferred=True)
+
+    def test_placeholder(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'data-widget-url="/widget/index/w1/"')
+        self.assertNotContains(response, '<b>first</b>')
+        self.assertNotIn('calls', state)
+
+    def test_conditional_get(self):
+        response = self.client.get('/widget/index/w1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<b>first</b>')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        cache_control = {value.strip() for value in response['Cache-Control'].split(',')}
+        self.assertEqual(cache_control, {'private', 'max-age=60'})
+        vary = {value.strip() for value in response['Vary'].split(',')}
+        self.assertTrue({'Cookie', 'Accept-Language'} <= vary)
+
+        response = self.client.get('/widget/index/w1/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('private', response['Cache-Control'])
+
+        # 内容变化后 ETag 不再匹配
+        self.set_widgets([[{'type': 'test_counting', 'id': 'w1', 'content': '<b>second</b>'}]], widget_deferred=True)
+        response = self.client.get('/widget/index/w1/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<b>second</b>')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_widget(self):
+        self.assertEqual(self.client.get('/widget/index/missing/').status_code, 404)
+        self.assertEqual(self.client.get('/widget/nope/w1/').status_code, 404)
+        self.assertEqual(self.client.post('/widget/index/w1/').status_code, 405)
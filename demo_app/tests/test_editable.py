@@ -0,0 +1,90 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+import xadmin
+from app.models import Product
+
+
+class EditPatchViewTests(TestCase):
+    """ changelist 中单个字段的编辑：只校验并写入请求的字段 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.product = Product.objects.create(store='s1', code='c1', name='Book', price=Decimal('1.00'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.patch_option(list_editable=('price', 'category'))
+        self.url = f'/app/product/{self.product.pk}/patch/'
+
+    def patch_option(self, **options):
+        for name, value in options.items():
+            patcher = mock.patch.object(xadmin.site._registry[Product], name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, fields, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'{self.url}?fields={fields}', data)
+        self.assertEqual(response.status_code, 200)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "app_product"')]
+        return response.json(), updates
+
+    def test_get_partial_form(self):
+        response = self.client.get(f'{self.url}?fields=price')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['form'].fields), ['price'])
+        self.assertContains(response, 'name="price"')
+        self.assertNotContains(response, 'name="name"')
+        self.assertEqual(response.context['form'].initial['price'], Decimal('1.00'))
+
+    def test_post_with_update(self):
+        signals = []
+        post_save.connect(signals.append, sender=Product, dispatch_uid='test_editable')
+        self.addCleanup(post_save.disconnect, sender=Product, dispatch_uid='test_editable')
+
+        result, updates = self.post('category', {'category': 'music'})
+        self.assertEqual(result['result'], 'success')
+        self.assertEqual(result['new_data'], {'category': 'music'})
+        self.assertEqual(result['new_html'], {'category': 'Music'})
+        # queryset.update() 只写入该字段，不调用 save()，也不发送信号
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "category"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.assertEqual(signals, [])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).category, 'music')
+
+    def test_post_with_update_fields(self):
+        self.patch_option(editable_save='save')
+        with mock.patch.object(Product, 'save', autospec=True, side_effect=Product.save) as save:
+            result, updates = self.post('price', {'price': '12.50'})
+        self.assertEqual(result['result'], 'success')
+        self.assertEqual(result['new_html'], {'price': '12.50'})
+        save.assert_called_once()
+        self.assertEqual(save.call_args.kwargs, {'update_fields': ('price',)})
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"name"', updates[0])
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.price, product.name), (Decimal('12.50'), 'Book'))
+
+    def test_post_validation_error(self):
+        result, updates = self.post('price', {'price': 'abc'})
+        self.assertEqual(result['result'], 'error')
+        self.assertEqual([(e['id'], e['name']) for e in result['errors']], [('id_price', 'price')])
+        self.assertTrue(result['errors'][0]['errors'])
+        self.assertEqual(updates, [])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('1.00'))
+
+    def test_only_list_editable_fields(self):
+        self.assertEqual(self.client.get(f'{self.url}?fields=name').status_code, 403)
+        self.assertEqual(self.client.get(f'{self.url}?fields=price,name').status_code, 403)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(f'/app/product/{self.product.pk + 100}/patch/?fields=price').status_code, 404)
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+LIST_DISPLAY = ('username', 'email', 'is_staff')
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', is_staff=i % 2 == 0) for i in range(30)
+        ])
+
+    def export(self, export_type, **options):
+        return get_admin_response(
+            ListAdminView, User, self.admin, '/auth/user/', {'_do_': 'export', 'export_type': export_type},
+            list_display=LIST_DISPLAY, **options
+        )
+
+    def expected_rows(self):
+        return list(User.objects.order_by('-pk').values_list(*LIST_DISPLAY))
+
+    def test_csv_is_streamed(self):
+        response = self.export('csv')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('﻿'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows[0], ['Username', 'Email address', 'Staff status'])
+        self.assertEqual(
+            rows[1:], [[username, email, str(is_staff)] for username, email, is_staff in self.expected_rows()]
+        )
+
+    def test_ndjson_is_streamed(self):
+        response = self.export('json')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(
+            [(row['username'], row['email'], row['is_staff']) for row in rows], self.expected_rows()
+        )
+
+
+class ExportMemoryTests(TestCase):
+    """ 导出的内存占用与行数无关：1 万行与 2 千行的峰值内存相差不大 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.bulk_create(
+            [User(username=f'user{i}', email=f'user{i}@example.com') for i in range(10000)], batch_size=5000
+        )
+
+    def measure(self, export_type):
+        response = get_admin_response(
+            ListAdminView, User, self.admin, '/auth/user/', {'_do_': 'export', 'export_type': export_type},
+            list_display=LIST_DISPLAY, export_chunk_size=200,
+        )
+        size = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                size += len(chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return size, peak
+
+    def test_peak_memory_is_bounded(self):
+        for export_type in ('csv', 'json'):
+            with self.subTest(export_type=export_type):
+                large_size, large_peak = self.measure(export_type)
+                with transaction.atomic():
+                    User.objects.filter(pk__gt=self.admin.pk + 2000).delete()
+                    small_size, small_peak = self.measure(export_type)
+                    transaction.set_rollback(True)
+                self.assertGreater(large_size, small_size * 4)
+                # 峰值内存不随行数增长
+                self.assertLess(large_peak, small_peak * 1.5)
@@ -0,0 +1,153 @@
+import random
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase
+
+from xadmin.sites import AdminSite
+from xadmin.views import BaseAdminPlugin, BaseAdminView, filter_hook
+from xadmin.views.base import IncorrectPluginArg, compile_filter_chain
+
+
+class ChainView(BaseAdminView):
+    base_result = None
+
+    @filter_hook
+    def process(self, value, scale=1):
+        self.log.append(('base', value, scale))
+        return self.base_result
+
+
+def make_plugin(index, kind, priority, enabled, lazy_calls):
+    """ kind 为 'self'、'lazy' 或 'eager'，与 filter_hook 判断插件方法调用方式的三种参数形式对应 """
+    if kind == 'self':
+        def process(self):
+            self.admin_view.log.append((index, 'self'))
+            return f'self{index}'
+    elif kind == 'lazy':
+        def process(self, __, value, scale=1):
+            self.admin_view.log.append((index, 'lazy', value, scale))
+            results = [__() for _ in range(lazy_calls)]
+            return ('lazy', index, results)
+    else:
+        def process(self, result, value, scale=1):
+            self.admin_view.log.append((index, 'eager', value, scale))
+            return ('eager', index, result)
+    process.priority = priority
+
+    def init_request(self, *args, **kwargs):
+        return enabled
+
+    return type(f'Plugin{index}', (BaseAdminPlugin,), {'process': process, 'init_request': init_request})
+
+
+def make_fixture(rng):
+    plugins = [
+        make_plugin(
+            index,
+            rng.choice(('self', 'lazy', 'eager')),
+            rng.choice((1, 5, 10, 10, 20)),
+            rng.random() > 0.2,
+            rng.choice((0, 1, 1, 2)),
+        )
+        for index in range(rng.randint(0, 8))
+    ]
+    return plugins, rng.choice((None, 'base')), rng.choice(('eager', 'lazy'))
+
+
+def run_fixture(fixture, executor):
+    plugins, base_result, activation = fixture
+    site = AdminSite(name=f'conformance_{executor}')
+    site.set_filter_executor(executor)
+    site.plugin_activation = activation
+    for plugin in plugins:
+        site.register_plugin(plugin, ChainView)
+    view_class = site.get_view_class(ChainView, base_result=base_result)
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    view = view_class(request)
+    view.log = []
+    try:
+        result = view.process('value', scale=2)
+    except IncorrectPluginArg:
+        result = IncorrectPluginArg
+    return result, view.log
+
+
+class FilterChainConformanceTests(SimpleTestCase):
+    """ recursive 与 iterative 两种 filter_hook 执行方式对同样的插件必须得到相同的结果和调用顺序 """
+
+    def assertConforms(self, fixture):
+        self.assertEqual(run_fixture(fixture, 'recursive'), run_fixture(fixture, 'iterative'))
+
+    def test_priority_order(self):
+        plugins = [make_plugin(0, 'eager', 20, True, 0), make_plugin(1, 'eager', 5, True, 0)]
+        result, log = run_fixture((plugins, 'base', 'eager'), 'iterative')
+        # priority 大的在内层，先处理父方法的结果
+        self.assertEqual(result, ('eager', 1, ('eager', 0, 'base')))
+        self.assertConforms((plugins, 'base', 'eager'))
+
+    def test_lazy_parent_access(self):
+        # priority 相同时后注册的插件在内层
+        plugins = [make_plugin(0, 'lazy', 10, True, 0), make_plugin(1, 'eager', 10, True, 0)]
+        result, log = run_fixture((plugins, 'base', 'eager'), 'iterative')
+        # 不调用 ``__`` 时内层的插件方法和原方法都不会执行
+        self.assertEqual(result, ('lazy', 0, []))
+        self.assertEqual(log, [(0, 'lazy', 'value', 2)])
+        plugins = [make_plugin(0, 'lazy', 10, True, 2), make_plugin(1, 'eager', 10, True, 0)]
+        self.assertEqual(run_fixture((plugins, 'base', 'eager'), 'iterative')[0],
+                         ('lazy', 0, [('eager', 1, 'base')] * 2))
+        self.assertConforms((plugins, 'base', 'eager'))
+
+    def test_self_only_requires_none(self):
+        plugins = [make_plugin(0, 'self', 10, True, 0)]
+        self.assertEqual(run_fixture((plugins, None, 'eager'), 'iterative')[0], 'self0')
+        self.assertEqual(run_fixture((plugins, 'base', 'eager'), 'iterative')[0], IncorrectPluginArg)
+        self.assertConforms((plugins, 'base', 'eager'))
+
+    def test_random_fixtures(self):
+        rng = random.Random(20240601)
+        for _ in range(2000):
+            fixture = make_fixture(rng)
+            with self.subTest(plugins=[(p.__name__, p.process.priority) for p in fixture[0]]):
+                self.assertConforms(fixture)
+
+
+class FilterChainCacheTests(SimpleTestCase):
+    """ 插件方法链每个 (合并后的 view 类, hook) 只解析一次，注册信息变化后随新的 view 类重新解析 """
+
+    def setUp(self):
+        self.site = AdminSite(name='chain_cache')
+        for index in range(3):
+            self.site.register_plugin(make_plugin(index, 'eager', 10, True, 0), ChainView)
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        view = self.site.get_view_class(ChainView, base_result='base')(request)
+        view.log = []
+        return view.process('value')
+
+    def count_compiles(self, requests):
+        with mock.patch('xadmin.views.base.compile_filter_chain', side_effect=compile_filter_chain) as compile:
+            results = [self.request() for _ in range(requests)]
+        return compile.call_count, results
+
+    def test_reused_across_requests(self):
+        compiles, results = self.count_compiles(5)
+        self.assertEqual(compiles, 1)
+        self.assertEqual(results, [('eager', 0, ('eager', 1, ('eager', 2, 'base')))] * 5)
+        self.assertEqual(self.count_compiles(5)[0], 0)
+
+    def test_rebuilt_after_registry_change(self):
+        self.count_compiles(1)
+        view_class = self.site.get_view_class(ChainView, base_result='base')
+        self.site.register_plugin(make_plugin(3, 'eager', 1, True, 0), ChainView)
+
+        compiles, results = self.count_compiles(2)
+        self.assertEqual(compiles, 1)
+        self.assertEqual(results[0], ('eager', 3, ('eager', 0, ('eager', 1, ('eager', 2, 'base')))))
+        # 旧的 view 类仍使用旧的插件方法链
+        self.assertEqual(len(view_class._filter_chains['process']), 3)
+        self.assertIsNot(self.site.get_view_class(ChainView, base_result='base'), view_class)
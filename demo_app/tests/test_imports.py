@@ -0,0 +1,84 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from app.models import Product
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+HEADER = 'store,code,name,edition,category,price\n'
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.existing = Product.objects.create(store='s1', code='c1', name='Existing', edition=1)
+
+    def upload(self, content, name='products.csv', **options):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        response = get_admin_response(
+            ListAdminView, Product, self.admin, '/app/product/',
+            {'_do_': 'import', 'import_file': SimpleUploadedFile(name, content)}, method='post', **options
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_create_and_update(self):
+        report = self.upload(
+            'id,store,code,name,edition,category,price\n'
+            ',s1,c2,New,1,music,9.50\n'
+            f'{self.existing.pk},s1,c1,Renamed,2,game,1\n'
+        )
+        self.assertEqual((report['created'], report['updated'], report['errors']), (1, 1, []))
+        self.assertEqual(Product.objects.get(code='c2').category, 'music')
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.edition), ('Renamed', 2))
+
+    def test_unique_together_and_constraint(self):
+        report = self.upload(
+            HEADER +
+            's1,c1,Other,1,book,1\n'  # 与数据库中的 (store, code) 重复
+            's2,c9,Existing,1,book,1\n'  # 与数据库中的 (name, edition) 重复
+            's3,c3,A,1,book,1\n'
+            's3,c3,B,1,book,1\n'  # 与文件中上一行的 (store, code) 重复
+            's4,c4,Fine,1,book,1\n'
+        )
+        self.assertEqual(report['created'], 2)
+        errors = {error['line']: error['errors'] for error in report['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 5])
+        self.assertEqual(errors[2], {'__all__': ['Product with this Store and Code already exists.']})
+        self.assertEqual(errors[3], {'__all__': ['Product with this Name and Edition already exists.']})
+        self.assertEqual(errors[5], {'__all__': ['Duplicate value in the imported file.']})
+        self.assertEqual(set(Product.objects.values_list('name', flat=True)), {'Existing', 'A', 'Fine'})
+
+    def test_unique_checks_use_one_query_per_chunk(self):
+        rows = ''.join(f's5,c{i},Name {i},1,book,1\n' for i in range(50))
+        with self.assertNumQueries(5):
+            # 更新对象的 in_bulk、两个唯一字段组合各一次、事务中的 bulk_create
+            report = self.upload(HEADER + rows)
+        self.assertEqual(report['created'], 50)
+
+    def test_non_utf8_file(self):
+        report = self.upload((HEADER + 's6,c1,Café,1,book,1\n').encode('latin-1'))
+        self.assertEqual(report['result'], 'error')
+        self.assertEqual(report['errors'][0]['line'], 1)
+        self.assertIn('Unable to read the file', report['errors'][0]['errors']['__all__'][0])
+
+    def test_malformed_csv(self):
+        report = self.upload(HEADER + 's7,c1,Before,1,book,1\n' + 's7,c2,' + 'x' * 200000 + ',1,book,1\n')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertIn('Unable to read the file', report['errors'][0]['errors']['__all__'][0])
+
+    def test_invalid_json_line(self):
+        report = self.upload(
+            '{"store": "s8", "code": "c1", "name": "Json", "edition": 1}\nnot json\n', name='products.json'
+        )
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [{'line': 2, 'errors': {'__all__': ['Invalid row.']}}])
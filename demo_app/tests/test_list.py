@@ -0,0 +1,91 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import xadmin
+
+
+class KeysetPaginationTests(TestCase):
+    """ changelist 的 keyset 分页：沿 next/prev cursor 翻页时不能跳过或重复行 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        start = timezone.now().replace(microsecond=0)
+        # 每 3 个用户落在同一毫秒内，只有微秒不同
+        for i in range(10):
+            User.objects.create_user(
+                f'user{i}', date_joined=start + datetime.timedelta(microseconds=(i // 3) * 1000 + i)
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.option = xadmin.site._registry[User]
+
+    def walk(self, url, cursor_key):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([obj.pk for obj in response.context['result_list']])
+            url = response.context[cursor_key] and f'/auth/user/{response.context[cursor_key]}'
+        return pages
+
+    def assertWalksAll(self, ordering):
+        expected = list(User.objects.order_by(*ordering, '-pk').values_list('pk', flat=True))
+        pages = self.walk('/auth/user/', 'next_url')
+        self.assertEqual(sum(pages, []), expected)
+
+        # 从最后一页沿 prev cursor 回到第一页
+        response = self.client.get('/auth/user/')
+        last = response.context['next_url']
+        while True:
+            response = self.client.get(f'/auth/user/{last}')
+            if not response.context['next_url']:
+                break
+            last = response.context['next_url']
+        pages = self.walk(f'/auth/user/{last}', 'prev_url')
+        self.assertEqual(sum(reversed(pages), []), expected)
+
+    def test_microsecond_datetime_ordering(self):
+        with mock.patch.object(self.option, 'ordering', ('-date_joined',), create=True), \
+                mock.patch.object(self.option, 'list_per_page', 3, create=True):
+            self.assertWalksAll(['-date_joined'])
+
+    def test_nullable_ordering_falls_back_to_pk(self):
+        with mock.patch.object(self.option, 'ordering', ('-last_login',), create=True), \
+                mock.patch.object(self.option, 'list_per_page', 3, create=True), \
+                self.assertLogs('xadmin.views.list', 'WARNING'):
+            self.assertWalksAll([])
+
+    def get_page_query(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        page_queries = [q['sql'] for q in queries if 'FROM "auth_user"' in q['sql'] and 'ORDER BY' in q['sql']]
+        self.assertEqual(len(page_queries), 1)
+        return response, page_queries[0]
+
+    def test_pages_are_fetched_without_offset(self):
+        with mock.patch.object(self.option, 'ordering', ('-date_joined',), create=True), \
+                mock.patch.object(self.option, 'list_per_page', 3, create=True):
+            response, sql = self.get_page_query('/auth/user/')
+            self.assertNotIn('OFFSET', sql)
+            self.assertNotIn('WHERE', sql)
+            # 多取一行判断是否有下一页
+            self.assertRegex(sql, r'LIMIT 4$')
+
+            for _ in range(2):
+                response, sql = self.get_page_query(f'/auth/user/{response.context["next_url"]}')
+                self.assertNotIn('OFFSET', sql)
+                self.assertRegex(sql, r'LIMIT 4$')
+                # (date_joined, id) 的 keyset 条件：date_joined < v OR (date_joined = v AND id < v)
+                self.assertRegex(
+                    sql,
+                    r'WHERE \(?"auth_user"\."date_joined" < .+ OR \("auth_user"\."date_joined" = .+ AND '
+                    r'"auth_user"\."id" < .+\)\)? ORDER BY "auth_user"\."date_joined" DESC, "auth_user"\."id" DESC'
+                )
@@ -0,0 +1,23 @@
+from django.forms import Media
+from django.test import SimpleTestCase
+
+from xadmin.util import MediaCollector
+
+
+class MediaCollectorTests(SimpleTestCase):
+
+    def test_add_does_not_change_operands(self):
+        media = MediaCollector(Media(js=['a.js']))
+        first = media + Media(js=['b.js'])
+        second = media + Media(js=['c.js'])
+        self.assertEqual(media.merge()._js, ['a.js'])
+        self.assertEqual(first.merge()._js, ['a.js', 'b.js'])
+        self.assertEqual(second.merge()._js, ['a.js', 'c.js'])
+
+    def test_iadd_and_merge_order(self):
+        media = MediaCollector()
+        media += Media(js=['a.js'], css={'all': ['a.css']})
+        media += MediaCollector(Media(js=['b.js']))
+        media = Media(js=['base.js']) + media
+        self.assertEqual(media._js, ['base.js', 'a.js', 'b.js'])
+        self.assertEqual(media._css, {'all': ['a.css']})
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import translation
+
+from xadmin.views import ListAdminView, ModelAdminView
+from xadmin.views.base import CommAdminView
+
+from .utils import make_site
+
+
+class MenuSkeletonTests(TestCase):
+    """ 菜单骨架按 (site, registry_version, 语言) 构建一次，所有 view 共用 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.site, urlconf = make_site(5, name='menu')
+        settings = override_settings(ROOT_URLCONF=urlconf)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get_views(self, site):
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        yield site.get_view_class(CommAdminView)(request)
+        for admin_class in site._registry.values():
+            for view_class in (ModelAdminView, ListAdminView):
+                yield site.get_view_class(view_class, admin_class)(request)
+
+    def count_builds(self, site):
+        with mock.patch.object(CommAdminView, 'get_nav_menu', autospec=True,
+                               side_effect=CommAdminView.get_nav_menu) as get_nav_menu:
+            skeletons = {id(site.get_menu_skeleton(view)) for view in self.get_views(site)}
+        return get_nav_menu.call_count, skeletons
+
+    def test_shared_across_views(self):
+        builds, skeletons = self.count_builds(self.site)
+        self.assertEqual(builds, 1)
+        self.assertEqual(len(skeletons), 1)
+
+        # 第二次请求直接使用已构建的骨架
+        self.assertEqual(self.count_builds(self.site)[0], 0)
+
+    def test_rebuilt_after_registry_change(self):
+        before = self.site.get_menu_skeleton(next(self.get_views(self.site)))
+        self.site.unregister(list(self.site._registry)[0])
+
+        builds, skeletons = self.count_builds(self.site)
+        self.assertEqual(builds, 1)
+        self.assertNotIn(id(before), skeletons)
+
+    def test_per_language(self):
+        view = next(self.get_views(self.site))
+        with translation.override('en'):
+            english = self.site.get_menu_skeleton(view)
+        with translation.override('zh-hans'):
+            self.assertIsNot(self.site.get_menu_skeleton(view), english)
+        with translation.override('en'):
+            self.assertIs(self.site.get_menu_skeleton(view), english)
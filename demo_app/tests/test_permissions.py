@@ -0,0 +1,39 @@
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from xadmin.views import ModelAdminView
+from xadmin.views.base import CommAdminView
+
+from .utils import make_site
+
+
+class PermissionQueryTests(TestCase):
+    """ 菜单及 get_model_perms 的权限判断只加载一次用户的权限，查询数与注册的 model 数量无关 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', is_staff=True)
+        cls.user.user_permissions.add(*Permission.objects.filter(codename__startswith='view_')[:3])
+
+    def count_queries(self, count):
+        site, urlconf = make_site(count)
+        with override_settings(ROOT_URLCONF=urlconf):
+            cache.clear()
+            request = RequestFactory().get('/')
+            # 每个请求重新读取用户，不使用其他请求中已缓存的权限
+            request.user = User.objects.get(pk=self.user.pk)
+            with CaptureQueriesContext(connection) as queries:
+                view = site.get_view_class(CommAdminView)(request)
+                view.get_user_nav_menu()
+                for model, admin_class in site._registry.items():
+                    site.get_view_class(ModelAdminView, admin_class)(request).get_model_perms()
+        return len(queries)
+
+    def test_constant_query_count(self):
+        few, many = self.count_queries(5), self.count_queries(200)
+        self.assertEqual(few, many)
+        # 用户的权限及所属组的权限
+        self.assertLessEqual(many, 2)
@@ -0,0 +1,41 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+
+class QuickFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        for i in range(12):
+            User.objects.create_user(f'alice{i}' if i % 3 == 0 else f'bob{i}', is_staff=i % 2 == 0)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, data):
+        response = get_admin_response(
+            ListAdminView, User, self.admin, '/auth/user/', data,
+            list_quick_filter=('is_staff',), search_fields=('username',),
+        )
+        self.assertEqual(response.status_code, 200)
+        badges = [int(count) for count in re.findall(r'<span class="badge">(\d+)</span>', response.content.decode())]
+        return response.context_data['result_count'], badges
+
+    def test_counts_include_search(self):
+        expected = User.objects.filter(username__icontains='alice')
+        result_count, badges = self.get_list({'_q_': 'alice'})
+        self.assertEqual(result_count, expected.count())
+        self.assertEqual(sum(badges), expected.count())
+
+        result_count, badges = self.get_list({'_q_': 'alice', '_p_is_staff': 'True'})
+        self.assertEqual(result_count, expected.filter(is_staff=True).count())
+        # 分面自身的过滤条件不影响自身的行数
+        self.assertEqual(sum(badges), expected.count())
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+import xadmin
+from app.models import Product
+
+
+class RefreshVersionTests(TestCase):
+    """ RefreshVersionView 返回 model 的变更版本，If-None-Match 与 ETag 相同时返回 304 """
+
+    url = '/app/product/version/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.product = Product.objects.create(store='s1', code='c1', name='Book', revision=3)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def patch_option(self, **options):
+        for name, value in options.items():
+            patcher = mock.patch.object(xadmin.site._registry[Product], name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_version(self, **headers):
+        response = self.client.get(self.url, **headers)
+        return response, response.get('ETag')
+
+    def assertRoundTrip(self):
+        """ 第一次请求返回 200 及 ETag，带上 ETag 再次请求返回 304 """
+        response, etag = self.get_version()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(etag)
+        version = response.json()['version']
+
+        response, same_etag = self.get_version(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(same_etag, etag)
+        self.assertEqual(response.content, b'')
+        return version, etag
+
+    def assertChanged(self, etag):
+        cache.clear()
+        response, new_etag = self.get_version(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(new_etag, etag)
+        return response.json()['version']
+
+    def test_count(self):
+        version, etag = self.assertRoundTrip()
+        self.assertEqual(version, '1')
+        Product.objects.create(store='s1', code='c2', name='Game')
+        self.assertEqual(self.assertChanged(etag), '2')
+
+    def test_datetime_field(self):
+        self.patch_option(refresh_version_field='created')
+        version, etag = self.assertRoundTrip()
+        self.assertEqual(version, f'{self.product.created.isoformat()}:1')
+        Product.objects.filter(pk=self.product.pk).update(created=self.product.created.replace(year=2030))
+        self.assertTrue(self.assertChanged(etag).startswith('2030-'))
+
+    def test_non_date_field(self):
+        self.patch_option(refresh_version_field='revision')
+        version, etag = self.assertRoundTrip()
+        self.assertEqual(version, '3:1')
+        Product.objects.filter(pk=self.product.pk).update(revision=4)
+        self.assertEqual(self.assertChanged(etag), '4:1')
+
+    def test_empty_table(self):
+        self.patch_option(refresh_version_field='revision')
+        Product.objects.all().delete()
+        self.assertEqual(self.assertRoundTrip()[0], ':0')
+
+    def test_cached_between_requests(self):
+        self.assertRoundTrip()
+        Product.objects.create(store='s1', code='c3', name='Music')
+        # refresh_cache_timeout 内多个用户共用缓存的版本
+        self.assertEqual(self.client.get(self.url).json()['version'], '1')
+
+    def test_requires_view_permission(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,196 @@
+from unittest import mock, skipIf, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.http import QueryDict
+from django.test import TestCase
+
+import xadmin
+from xadmin.plugins.search import ready
+from xadmin.search import (
+    SEARCH_RANK, SEARCH_VAR, IcontainsSearchBackend, PostgresSearchBackend, SqliteFTSSearchBackend,
+)
+from xadmin.views import ListAdminView
+
+from .utils import get_admin_response
+
+SEARCH_FIELDS = ('username', 'first_name', 'email')
+
+
+class SearchTestMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        # 前 12 个用户内容相同，bm25 相同，只能按主键区分先后
+        for i in range(12):
+            User.objects.create_user(f'alpha{i:02d}', first_name='Alpha', email=f'a{i}@example.com')
+        User.objects.create_user('alpha-beta', first_name='Alpha Alpha Alpha', email='ab@example.com')
+        User.objects.create_user('beta', first_name='Beta', email='beta@example.com')
+        User.objects.create_user('gamma', first_name='Gamma', email='alpha@example.org')
+
+    def search(self, query, cursor=None, **options):
+        data = {SEARCH_VAR: query}
+        if cursor:
+            data['c'] = cursor
+        options.setdefault('search_fields', SEARCH_FIELDS)
+        response = get_admin_response(ListAdminView, User, self.admin, '/auth/user/', data, **options)
+        self.assertEqual(response.status_code, 200)
+        return response.context_data
+
+    def walk(self, query, **options):
+        """ 沿 next cursor 取完所有页，返回每页的主键 """
+        pages, cursor = [], None
+        while True:
+            context = self.search(query, cursor, **options)
+            pages.append([obj.pk for obj in context['result_list']])
+            if not context['next_url']:
+                return pages
+            cursor = QueryDict(context['next_url'][1:])['c']
+
+    def usernames(self, query, **options):
+        return {obj.username for obj in self.search(query, list_per_page=100, **options)['result_list']}
+
+
+class IcontainsSearchTests(SearchTestMixin, TestCase):
+
+    def test_every_term_in_some_field(self):
+        self.assertEqual(self.usernames('beta'), {'alpha-beta', 'beta'})
+        self.assertEqual(self.usernames('alpha beta'), {'alpha-beta'})
+        # email 中的 alpha 也匹配
+        self.assertIn('gamma', self.usernames('ALPHA'))
+
+    def test_lookup_prefixes(self):
+        self.assertEqual(
+            self.usernames('alpha', search_fields=('^email',)), {'gamma'}
+        )
+        self.assertEqual(self.usernames('beta', search_fields=('=username',)), {'beta'})
+
+    def test_empty_query_returns_everything(self):
+        self.assertEqual(len(self.search('  ', list_per_page=100)['result_list']), User.objects.count())
+
+    def test_unranked_search_keeps_list_ordering(self):
+        pages = self.walk('alpha', list_per_page=5)
+        pks = sum(pages, [])
+        self.assertEqual(pks, list(User.objects.filter(
+            pk__in=pks).order_by('-pk').values_list('pk', flat=True)))
+
+
+class SqliteFTSSearchTests(SearchTestMixin, TestCase):
+
+    def setUp(self):
+        # 命令和信号从注册的 admin 类读取搜索配置
+        option = xadmin.site._registry[User]
+        for name, value in (('search_fields', SEARCH_FIELDS), ('search_backend', 'sqlite_fts')):
+            patcher = mock.patch.object(option, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # 索引表在测试的事务中创建，回滚后不再存在
+        self.addCleanup(SqliteFTSSearchBackend._existing_tables.clear)
+        call_command('xadmin_search_index', 'auth.User', stdout=mock.Mock())
+
+    def search(self, query, cursor=None, **options):
+        options.setdefault('search_backend', 'sqlite_fts')
+        return super().search(query, cursor, **options)
+
+    def connect_signals(self):
+        ready(xadmin.site)
+        for signal, uid in ((post_save, 'xadmin_update_search_index_auth.user'),
+                            (post_delete, 'xadmin_remove_search_index_auth.user')):
+            self.addCleanup(signal.disconnect, sender=User, dispatch_uid=uid)
+
+    def test_command_creates_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM auth_user_xadmin_fts')
+            self.assertEqual(cursor.fetchone()[0], User.objects.count())
+
+    def test_prefix_match(self):
+        self.assertEqual(self.usernames('bet'), {'alpha-beta', 'beta'})
+        self.assertEqual(self.usernames('alpha beta'), {'alpha-beta'})
+        # 引号使输入不会被当作 FTS5 的查询语法
+        self.assertEqual(self.usernames('beta OR'), set())
+
+    def test_ranked_by_relevance(self):
+        context = self.search('alpha', list_per_page=100)
+        results = context['result_list']
+        self.assertEqual(results[0].username, 'alpha-beta')
+        ranks = [getattr(obj, SEARCH_RANK) for obj in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_ranked_keyset_paging(self):
+        expected = [obj.pk for obj in self.search('alpha', list_per_page=100)['result_list']]
+        self.assertEqual(len(expected), 14)
+        for per_page in (1, 3, 5, 13):
+            with self.subTest(per_page=per_page):
+                pages = self.walk('alpha', list_per_page=per_page)
+                self.assertTrue(all(len(page) == per_page for page in pages[:-1]))
+                # 相关度相同的行之间没有重复或遗漏
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_signals_keep_index_in_sync(self):
+        self.connect_signals()
+        user = User.objects.create_user('delta', first_name='Zeta')
+        self.assertEqual(self.usernames('zeta'), {'delta'})
+
+        user.first_name = 'Eta'
+        user.save()
+        self.assertEqual(self.usernames('zeta'), set())
+        self.assertEqual(self.usernames('eta'), {'delta'})
+
+        pk = user.pk
+        user.delete()
+        self.assertEqual(self.usernames('eta'), set())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM auth_user_xadmin_fts WHERE rowid = %s', [pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_picks_up_bulk_changes(self):
+        User.objects.filter(username='beta').update(first_name='Omega')
+        self.assertEqual(self.usernames('omega'), set())
+        call_command('xadmin_search_index', 'auth.User', rebuild=True, stdout=mock.Mock())
+        self.assertEqual(self.usernames('omega'), {'beta'})
+
+    def test_falls_back_to_icontains_without_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE auth_user_xadmin_fts')
+        SqliteFTSSearchBackend._existing_tables.clear()
+        # icontains 不是前缀匹配，相关度都为 0，仍然可以按 (相关度, 主键) 分页
+        self.assertEqual(self.usernames('lpha b'), {'alpha-beta'})
+        self.assertEqual(
+            sum(self.walk('alpha', list_per_page=4), []),
+            list(User.objects.filter(username__in=self.usernames('alpha')).order_by('-pk').values_list('pk', flat=True)),
+        )
+
+
+class PostgresSearchTests(SearchTestMixin, TestCase):
+
+    def search(self, query, cursor=None, **options):
+        options.setdefault('search_backend', 'postgres')
+        return super().search(query, cursor, **options)
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL is used directly')
+    def test_falls_back_to_icontains(self):
+        backend = PostgresSearchBackend(User, SEARCH_FIELDS)
+        backend.create_index()
+        queryset = User.objects.all()
+        self.assertEqual(
+            list(backend.search(queryset, 'alpha beta')),
+            list(IcontainsSearchBackend(User, SEARCH_FIELDS).search(queryset, 'alpha beta')),
+        )
+        self.assertEqual(self.usernames('alpha beta'), {'alpha-beta'})
+        self.assertEqual(len(sum(self.walk('alpha', list_per_page=4), [])), 14)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL full-text search')
+    def test_ranked_search_uses_index_expression(self):
+        option = xadmin.site._registry[User]
+        with mock.patch.object(option, 'search_fields', SEARCH_FIELDS, create=True), \
+                mock.patch.object(option, 'search_backend', 'postgres', create=True):
+            call_command('xadmin_search_index', 'auth.User', stdout=mock.Mock())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', ['auth_user_xadmin_search'])
+            self.assertIsNotNone(cursor.fetchone())
+        self.assertEqual(self.usernames('beta'), {'alpha-beta', 'beta'})
+        expected = [obj.pk for obj in self.search('alpha', list_per_page=100)['result_list']]
+        self.assertEqual(sum(self.walk('alpha', list_per_page=3), []), expected)
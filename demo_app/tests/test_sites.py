@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from xadmin.sites import AdminSite
+from xadmin.views import BaseAdminView
+
+
+class Unhashable:
+    __hash__ = None
+
+
+class ViewClassCacheTests(SimpleTestCase):
+    """ get_view_class 按 (view 类, admin 类, opts) 缓存合并后的类，opts 的值可以是 list、dict 等 """
+
+    def setUp(self):
+        self.site = AdminSite(name='view_class_cache')
+
+    def get(self, **opts):
+        return self.site.get_view_class(BaseAdminView, **opts)
+
+    def test_list_and_dict_options(self):
+        opts = {'list_display': ['name', 'price'], 'widgets': {'size': [1, 2], 'labels': {'a': 'A'}}}
+        view_class = self.get(**opts)
+        self.assertEqual(view_class.list_display, ['name', 'price'])
+        self.assertEqual(view_class.widgets, opts['widgets'])
+
+        # 内容相同的新对象命中缓存
+        self.assertIs(self.get(list_display=['name', 'price'], widgets={'labels': {'a': 'A'}, 'size': [1, 2]}),
+                      view_class)
+        self.assertEqual(self.site.view_class_cache_info()['hits'], 1)
+
+        # 内容不同时生成新的类
+        self.assertIsNot(self.get(list_display=['name'], widgets=opts['widgets']), view_class)
+        self.assertIsNot(self.get(list_display=('name', 'price'), widgets=opts['widgets']), view_class)
+
+    def test_mixed_value_types(self):
+        view_class = self.get(a=1, b='x', c=None, d={1: 'one', 'two': 2}, e={3, 'four'})
+        self.assertIs(self.get(e={'four', 3}, d={'two': 2, 1: 'one'}, c=None, b='x', a=1), view_class)
+
+    def test_unhashable_values_are_not_cached(self):
+        value = Unhashable()
+        view_class = self.get(option=[value])
+        self.assertIs(view_class.option[0], value)
+        self.assertIsNot(self.get(option=[value]), view_class)
+        self.assertEqual(self.site.view_class_cache_info()['size'], 0)
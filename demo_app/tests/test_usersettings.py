@@ -0,0 +1,88 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from xadmin.usersettings import REQUEST_CACHE_ATTR, UserSettingsStore
+
+
+class UserSettingsStoreTests(SimpleTestCase):
+    """ 写入的合并：连续保存时每次重新计时，但最多等待 max_delay 秒 """
+
+    def setUp(self):
+        self.store = UserSettingsStore(delay=0.2, max_delay=0.7)
+        self.writes = []
+        self.user_writes = []
+        self.written = threading.Event()
+
+        def write(user_id, key, value):
+            self.writes.append((time.monotonic(), key, value))
+            self.user_writes.append((time.monotonic(), user_id, key, value))
+            self.written.set()
+
+        patcher = mock.patch.object(self.store, 'write', side_effect=write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.store.flush)
+
+    def get_request(self, user_id=1):
+        request = SimpleNamespace(user=SimpleNamespace(pk=user_id, is_authenticated=True))
+        setattr(request, REQUEST_CACHE_ATTR, {})
+        return request
+
+    def test_debounce(self):
+        start = time.monotonic()
+        for i in range(3):
+            self.store.set(self.get_request(), 'dashboard', str(i))
+            time.sleep(0.1)
+        self.assertTrue(self.written.wait(2))
+        self.assertEqual([(key, value) for at, key, value in self.writes], [('dashboard', '2')])
+        # 最后一次保存之后 delay 秒才写入
+        self.assertGreaterEqual(self.writes[0][0] - start, 0.2 + 0.2)
+
+    def test_max_delay(self):
+        start = time.monotonic()
+        while not self.written.is_set() and time.monotonic() - start < 2:
+            self.store.set(self.get_request(), 'dashboard', 'value')
+            time.sleep(0.05)
+        self.assertTrue(self.written.is_set())
+        self.assertLess(self.writes[0][0] - start, 0.7 + 0.15)
+
+    def test_concurrent_users_have_own_deadlines(self):
+        """ 一个用户持续保存不会推迟其他用户、其他 key 的写入 """
+        start = time.monotonic()
+        saved = {}
+
+        def keep_saving():
+            while time.monotonic() - start < 1:
+                self.store.set(self.get_request(1), 'dashboard', 'dragging')
+                time.sleep(0.02)
+
+        def save_once(user_id, key, at):
+            time.sleep(at)
+            saved[(user_id, key)] = time.monotonic()
+            self.store.set(self.get_request(user_id), key, 'value')
+
+        threads = [
+            threading.Thread(target=keep_saving),
+            threading.Thread(target=save_once, args=(2, 'dashboard', 0.3)),
+            threading.Thread(target=save_once, args=(1, 'list_per_page', 0.4)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(0.3)
+
+        first = {}
+        for at, user_id, key, value in self.user_writes:
+            first.setdefault((user_id, key), at)
+        # 只保存一次的 key 在 delay 秒后写入，不受用户 1 持续保存的影响
+        for item in ((2, 'dashboard'), (1, 'list_per_page')):
+            self.assertGreaterEqual(first[item] - saved[item], 0.2 - 0.01)
+            self.assertLess(first[item] - saved[item], 0.2 + 0.1)
+        # 持续保存的 key 在 max_delay 秒时写入
+        self.assertLess(first[(1, 'dashboard')] - start, 0.7 + 0.1)
+
@@ -0,0 +1,41 @@
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import models
+from django.test import RequestFactory
+from django.test.utils import isolate_apps
+from django.urls import path
+
+import xadmin
+from xadmin.sites import AdminSite
+from xadmin.views import register_builtin_views
+
+
+def get_admin_response(view_class, model, user, path, data=None, method='get', **options):
+    """
+    用 options 覆盖 model 注册时的 admin 设置，请求 view_class。
+    插件的设置在合并插件类时复制，所以每次创建新的 admin 类，而不是修改已注册的类。
+    """
+    option_class = type(f'{model.__name__}TestAdmin', (xadmin.site._registry[model],), options)
+    request = getattr(RequestFactory(), method)(path, data or {})
+    request.user = user
+    request.session = {}
+    request._messages = FallbackStorage(request)
+    request._dont_enforce_csrf_checks = True
+    response = xadmin.site.get_view_class(view_class, option_class).as_view()(request)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+@isolate_apps('app')
+def make_site(count, name=None):
+    """ 注册 count 个 model 的 AdminSite 及其 urlconf，model 不需要数据表 """
+    site = AdminSite(name=name or f'site{count}')
+    register_builtin_views(site)
+    for index in range(count):
+        model = type(f'Model{index}', (models.Model,), {'__module__': 'app.models'})
+        site.register(model)
+
+    class URLConf:
+        urlpatterns = [path('', site.urls)]
+
+    return site, URLConf
@@ -13,7 +13,7 @@ def autodiscover():
     from django.apps import apps
     from django.conf import settings
     from django.utils.module_loading import module_has_submodule
-    from xadmin.plugins import register_builtin_plugins
+    from xadmin.plugins import builtin_plugins_ready, register_builtin_plugins
     from xadmin.views import register_builtin_views
 
     setattr(settings, 'CRISPY_TEMPLATE_PACK', 'bootstrap3')
@@ -44,3 +44,5 @@ def autodiscover():
             # attempting to import it, otherwise we want it to bubble up.
             if module_has_submodule(mod, 'adminx'):
                 raise e
+
+    builtin_plugins_ready(site)
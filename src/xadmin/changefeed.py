@@ -0,0 +1,280 @@
+import asyncio
+import io
+import json
+import threading
+from collections import deque
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    """
+    change feed 的发布/订阅。publish 在写入数据的线程中同步调用，必须是线程安全的；
+    subscribe 在事件循环中调用，返回的订阅对象提供 ``async get(timeout)`` 和 ``close()``。
+    事件按 (序号, 事件) 传递，序号用于 SSE 的 Last-Event-ID 断线重连。
+    """
+
+    def publish(self, event):
+        raise NotImplementedError
+
+    def subscribe(self, last_event_id=None):
+        raise NotImplementedError
+
+
+class MemorySubscription:
+
+    def __init__(self, broker, loop, queue_size):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            # 事件循环已关闭
+            self.close()
+
+    def _put(self, item):
+        if self.queue.full():
+            # 订阅方处理不及时时丢弃最早的事件
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker(BaseBroker):
+    """ 进程内的发布/订阅，只有与 ASGI 服务在同一进程中的写入才能被订阅到，保留最近 history 个事件用于重连 """
+
+    def __init__(self, history=1000, queue_size=1000):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self.queue_size = queue_size
+
+    def publish(self, event):
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event)
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(item)
+
+    def subscribe(self, last_event_id=None):
+        subscription = MemorySubscription(self, asyncio.get_event_loop(), self.queue_size)
+        with self._lock:
+            replay = [item for item in self._history if last_event_id is not None and item[0] > last_event_id]
+            self._subscribers.add(subscription)
+        for item in replay[-self.queue_size:]:
+            subscription.queue.put_nowait(item)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class CacheSubscription:
+
+    def __init__(self, broker, last_event_id):
+        self.broker = broker
+        self.last = last_event_id
+        self.pending = []
+
+    async def get(self, timeout):
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not self.pending:
+                self.last, self.pending = await sync_to_async(self.broker.read, thread_sensitive=False)(self.last)
+            if self.pending:
+                return self.pending.pop(0)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.broker.poll_interval, remaining))
+
+    def close(self):
+        pass
+
+
+class CacheBroker(BaseBroker):
+    """
+    通过 Django 缓存在多个进程间传递事件，用于没有消息服务时的多进程部署，需要进程间共享的缓存
+    （文件、memcached、redis）。事件保留 timeout 秒，订阅方每 poll_interval 秒轮询一次新的序号。
+    """
+
+    seq_key = 'xadmin:changefeed:seq'
+
+    def __init__(self, cache='default', timeout=60, poll_interval=0.5, batch_size=1000):
+        self.cache = cache
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+
+    def get_event_key(self, seq):
+        return f'xadmin:changefeed:event:{seq}'
+
+    def publish(self, event):
+        cache = caches[self.cache]
+        cache.add(self.seq_key, 0, None)
+        seq = cache.incr(self.seq_key)
+        cache.set(self.get_event_key(seq), event, self.timeout)
+
+    def read(self, last):
+        """ 返回 (最新的序号, last 之后的 [(序号, 事件), ...]) """
+        cache = caches[self.cache]
+        current = cache.get(self.seq_key) or 0
+        if last is None or last >= current:
+            return current, []
+        start = max(last + 1, current - self.batch_size + 1)
+        events = cache.get_many([self.get_event_key(seq) for seq in range(start, current + 1)])
+        items = [
+            (seq, events[self.get_event_key(seq)])
+            for seq in range(start, current + 1) if self.get_event_key(seq) in events
+        ]
+        return current, items
+
+    def subscribe(self, last_event_id=None):
+        return CacheSubscription(self, last_event_id)
+
+
+_broker = None
+
+
+def get_broker():
+    """ XADMIN_CHANGEFEED_BROKER 为 BaseBroker 子类的路径，XADMIN_CHANGEFEED_BROKER_OPTIONS 为其参数 """
+    global _broker
+    if _broker is None:
+        broker_class = import_string(getattr(settings, 'XADMIN_CHANGEFEED_BROKER', 'xadmin.changefeed.MemoryBroker'))
+        _broker = broker_class(**getattr(settings, 'XADMIN_CHANGEFEED_BROKER_OPTIONS', {}))
+    return _broker
+
+
+def publish_change(sender, instance, created=None, raw=False, using=None, **kwargs):
+    """ post_save/post_delete 的接收者，事务提交后才发布，事件中只有 model、主键和操作 """
+    if raw:
+        return
+    event = {
+        'model': sender._meta.label_lower,
+        'pk': force_text(instance.pk),
+        'action': 'delete' if created is None else 'save',
+        'created': bool(created),
+    }
+    transaction.on_commit(lambda: get_broker().publish(event), using=using)
+
+
+class ChangeFeedApplication:
+    """
+    包装 Django 的 ASGI application，AdminSite 的 change_feed url 由这里以 SSE 返回，其他请求交给 application。
+    只推送用户有查看权限的 model 的事件，``?models=app_label.model_name,...`` 可以只订阅部分 model，
+    断线重连时浏览器带上 Last-Event-ID，broker 中仍保留的事件会补发。
+    """
+
+    heartbeat = 15
+
+    def __init__(self, admin_site, application):
+        self.admin_site = admin_site
+        self.application = application
+        self._path = None
+
+    def get_path(self):
+        if self._path is None:
+            self._path = reverse(f'{self.admin_site.app_name}:change_feed', current_app=self.admin_site.name)
+        return self._path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == self.get_path():
+            return await self.handle(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+    def get_models(self, request):
+        """ 加载用户，返回可以订阅的 model，没有 admin 权限时返回 None """
+        engine = import_module(settings.SESSION_ENGINE)
+        try:
+            request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+            request.user = get_user(request)
+            if not self.admin_site.has_permission(request):
+                return None
+            requested = set(filter(None, request.GET.get('models', '').split(',')))
+            models = set()
+            for model in self.admin_site._registry:
+                opts = model._meta
+                if requested and opts.label_lower not in requested:
+                    continue
+                if request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}') or \
+                        request.user.has_perm(f'{opts.app_label}.change_{opts.model_name}'):
+                    models.add(opts.label_lower)
+            return models
+        finally:
+            close_old_connections()
+
+    def get_last_event_id(self, request):
+        value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    async def handle(self, scope, receive, send):
+        request = ASGIRequest(scope, io.BytesIO())
+        models = await sync_to_async(self.get_models)(request)
+        if models is None:
+            await send({'type': 'http.response.start', 'status': 403, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        subscription = get_broker().subscribe(self.get_last_event_id(request))
+        stream = asyncio.ensure_future(self.stream(send, subscription, models))
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stream.cancel()
+            disconnect.cancel()
+            subscription.close()
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def stream(self, send, subscription, models):
+        await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+        while True:
+            item = await subscription.get(self.heartbeat)
+            if item is None:
+                body = ': ping\n\n'
+            else:
+                seq, event = item
+                if event['model'] not in models:
+                    continue
+                body = f'id: {seq}\nevent: change\ndata: {json.dumps(event)}\n\n'
+            await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
@@ -0,0 +1,126 @@
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db import connections
+
+
+class BaseCounter:
+    """
+    统计 queryset 的行数，approximate 为 True 时结果可能是估算值。
+    """
+
+    approximate = False
+
+    def __init__(self, admin_view):
+        self.admin_view = admin_view
+
+    def count(self, queryset):
+        """ 返回 (行数, 是否为估算值) """
+        raise NotImplementedError
+
+
+class ExactCounter(BaseCounter):
+
+    def count(self, queryset):
+        return queryset.count(), False
+
+
+class CachedCounter(ExactCounter):
+    """ 精确行数按过滤条件缓存 count_cache_timeout 秒 """
+
+    def get_cache_key(self, queryset):
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        signature = hashlib.md5(f'{sql}:{params!r}'.encode('utf-8')).hexdigest()
+        return f'xadmin:count:{queryset.db}:{signature}'
+
+    def count(self, queryset):
+        try:
+            cache_key = self.get_cache_key(queryset)
+        except EmptyResultSet:
+            return 0, False
+
+        cache = caches[self.admin_view.count_cache]
+        count = cache.get(cache_key)
+        if count is None:
+            count = queryset.count()
+            cache.set(cache_key, count, self.admin_view.count_cache_timeout)
+        return count, False
+
+
+class EstimateCounter(ExactCounter):
+    """
+    使用数据库的统计信息估算行数：PostgreSQL 读取 pg_class.reltuples，有过滤条件时读取 EXPLAIN 的估算行数；
+    SQLite 在执行过 ANALYZE 后读取 sqlite_stat1。
+    估算值小于 count_estimate_threshold 或无法估算时使用精确行数。
+    """
+
+    approximate = True
+
+    def count(self, queryset):
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.admin_view.count_estimate_threshold:
+            return super(EstimateCounter, self).count(queryset)
+        return estimate, True
+
+    def estimate(self, queryset):
+        vendor = connections[queryset.db].vendor
+        if vendor == 'postgresql':
+            if self.is_unfiltered(queryset):
+                return self.estimate_pg_class(queryset)
+            return self.estimate_explain(queryset)
+        elif vendor == 'sqlite' and self.is_unfiltered(queryset):
+            return self.estimate_sqlite_stat(queryset)
+        return None
+
+    def is_unfiltered(self, queryset):
+        query = queryset.query
+        return not query.where and not query.distinct and not query.combinator
+
+    def estimate_pg_class(self, queryset):
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # 从未 ANALYZE 过的表 reltuples 为 -1 或 0
+        return int(row[0]) if row and row[0] > 0 else None
+
+    def estimate_explain(self, queryset):
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            return 0
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def estimate_sqlite_stat(self, queryset):
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # stat 的第一个数字是表（或索引）的行数
+        return int(row[0].split()[0]) if row else None
+
+
+COUNTERS = {
+    'exact': ExactCounter,
+    'cached': CachedCounter,
+    'estimate': EstimateCounter,
+}
+
+
+def get_counter_class(strategy):
+    if isinstance(strategy, type) and issubclass(strategy, BaseCounter):
+        return strategy
+    if strategy not in COUNTERS:
+        raise ImproperlyConfigured(f"The count strategy {strategy} isn't one of {', '.join(COUNTERS)}")
+    return COUNTERS[strategy]
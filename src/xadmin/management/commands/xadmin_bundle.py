@@ -0,0 +1,82 @@
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+import xadmin
+from xadmin.util import BUNDLE_MANIFEST, get_bundle_key, resolve_files
+from xadmin.vendors import bundles
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+SOURCE_MAP_RE = re.compile(r'^\s*(/\*#|//#) sourceMappingURL=.*$', re.MULTILINE)
+
+
+class Command(BaseCommand):
+    help = 'Concatenate the vendor assets each xadmin page needs into content-hashed bundles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=str(Path(xadmin.__file__).resolve().parent / 'static'),
+            help='Static directory the bundles and manifest are written to, '
+                 'defaults to the static directory of the xadmin app.',
+        )
+
+    def handle(self, *args, **options):
+        bundle_dir = posixpath.dirname(BUNDLE_MANIFEST)
+        output_dir = Path(options['output_dir'])
+        (output_dir / bundle_dir).mkdir(parents=True, exist_ok=True)
+
+        manifest = {}
+        for page, media_sets in bundles.items():
+            for index, tags in enumerate(media_sets):
+                entry = {}
+                for file_type in ('css', 'js'):
+                    type_tags = [tag for tag in tags if tag.split('.')[-1] == file_type]
+                    if not type_tags:
+                        continue
+                    content = self.concat(resolve_files(type_tags, settings.LANGUAGE_CODE, 'production'),
+                                          file_type, bundle_dir)
+                    digest = hashlib.md5(content.encode('utf-8')).hexdigest()[:12]
+                    name = f'{bundle_dir}/{page}-{index}.{digest}.{file_type}'
+                    (output_dir / name).write_text(content, encoding='utf-8')
+                    entry[file_type] = name
+                    self.stdout.write(f'{name} <- {" ".join(type_tags)}')
+                manifest[get_bundle_key(tags)] = entry
+
+        (output_dir / BUNDLE_MANIFEST).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output_dir / BUNDLE_MANIFEST}'))
+
+    def concat(self, files, file_type, bundle_dir):
+        contents = []
+        for path in files:
+            if path.startswith('http://') or path.startswith('https://'):
+                raise CommandError(f"{path} isn't a local file and can't be bundled")
+            full_path = finders.find(path)
+            if not full_path:
+                raise CommandError(f'Static file {path} not found')
+            with open(full_path, encoding='utf-8') as f:
+                content = SOURCE_MAP_RE.sub('', f.read())
+            if file_type == 'css':
+                content = self.rewrite_css_urls(content, path, bundle_dir)
+            contents.append(f'/* {path} */\n{content}')
+        # js 文件之间加上分号，避免前一个文件缺少结尾分号
+        return (';\n' if file_type == 'js' else '\n').join(contents)
+
+    def rewrite_css_urls(self, content, path, bundle_dir):
+        """ 把 css 中的相对 url 改为相对 bundle 目录的路径 """
+        base_dir = posixpath.dirname(path)
+
+        def replace(match):
+            quote, url = match.groups()
+            if url.startswith(('data:', 'http:', 'https:', '/', '#')):
+                return match.group(0)
+            target = posixpath.normpath(posixpath.join(base_dir, url))
+            return f'url({quote}{posixpath.relpath(target, bundle_dir)}{quote})'
+
+        return CSS_URL_RE.sub(replace, content)
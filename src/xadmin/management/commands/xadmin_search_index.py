@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from xadmin.plugins.search import get_model_search_backend
+from xadmin.sites import site
+
+
+class Command(BaseCommand):
+    help = 'Create the full-text search indexes used by the search_backend of the registered model admins.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Only index these models, as app_label.ModelName.')
+        parser.add_argument('--rebuild', action='store_true', help='Drop and recreate existing indexes.')
+        parser.add_argument('--database', default=None, help='Database to create the indexes in.')
+
+    def handle(self, *args, **options):
+        labels = {label.lower() for label in options['models']}
+        for model, admin_class in site._registry.items():
+            if labels and model._meta.label_lower not in labels:
+                continue
+            backend = get_model_search_backend(model, admin_class)
+            if backend is None:
+                continue
+            backend.create_index(using=options['database'], rebuild=options['rebuild'])
+            self.stdout.write(f'{model._meta.label}: {backend.__class__.__name__}')
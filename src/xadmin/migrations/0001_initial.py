@@ -0,0 +1,31 @@
+# Generated by Django 3.1.14 on 2026-10-16 23:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSettings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=256, verbose_name='Settings Key')),
+                ('value', models.TextField(verbose_name='Settings Content')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'User Setting',
+                'verbose_name_plural': 'User Settings',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -1,3 +1,19 @@
+from django.conf import settings
 from django.db import models
+from django.utils.translation import ugettext_lazy as _
 
-# Create your models here.
+
+class UserSettings(models.Model):
+    """ 用户的 admin 设置，例如 dashboard 和表单的面板位置，通过 xadmin.usersettings 读写 """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_('user'))
+    key = models.CharField(_('Settings Key'), max_length=256)
+    value = models.TextField(_('Settings Content'))
+
+    class Meta:
+        verbose_name = _('User Setting')
+        verbose_name_plural = _('User Settings')
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f'{self.user} {self.key}'
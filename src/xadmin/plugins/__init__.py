@@ -1,11 +1,36 @@
 PLUGINS = (
     'portal',
+    'export',
+    'imports',
+    'chart',
+    'editable',
+    'actions',
+    'batch',
+    'quickfilter',
+    'search',
+    'refresh',
+    'changefeed',
 )
 
 
-def register_builtin_plugins():
-    from importlib import import_module
+def get_builtin_plugins():
     from django.conf import settings
 
     exclude_plugins = getattr(settings, 'XADMIN_EXCLUDE_PLUGINS', [])
-    [import_module(f'xadmin.plugins.{plugin}') for plugin in PLUGINS if plugin not in exclude_plugins]
+    return [plugin for plugin in PLUGINS if plugin not in exclude_plugins]
+
+
+def register_builtin_plugins():
+    from importlib import import_module
+
+    [import_module(f'xadmin.plugins.{plugin}') for plugin in get_builtin_plugins()]
+
+
+def builtin_plugins_ready(site):
+    """ 所有 adminx 导入后调用插件模块中的 ready(site)，用于需要读取 model 注册信息的初始化 """
+    from importlib import import_module
+
+    for plugin in get_builtin_plugins():
+        ready = getattr(import_module(f'xadmin.plugins.{plugin}'), 'ready', None)
+        if ready is not None:
+            ready(site)
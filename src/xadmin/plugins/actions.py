@@ -0,0 +1,259 @@
+import time
+
+from django.core.exceptions import PermissionDenied
+from django.db import router, transaction
+from django.http import HttpResponse, HttpResponseRedirect
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
+from django.utils.encoding import force_text
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from django.utils.translation import ugettext as _, ugettext_lazy
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminObject, BaseAdminPlugin, ListAdminView, ModelAdminView
+
+ACTION_CHECKBOX_NAME = '_selected_action'
+# 分批执行时由前端带上，表示从这个主键之后继续处理，空字符串表示从头开始
+ACTION_CURSOR_VAR = '_action_cursor'
+
+
+class BaseActionView(BaseAdminObject):
+    """
+    changelist 的批量操作。do_action 接收选中行的 queryset，操作应当直接在 queryset 上执行
+    （``update()``、``delete()``），不要逐个读取对象。
+    设置 chunk_size 后，行数超过 chunk_size 的操作通过 execute 分批执行：每批一个事务，
+    每个请求最多执行 chunk_time 秒，由前端循环请求并显示进度，不会出现长时间持有的大事务。
+    """
+
+    action_name = None
+    description = None
+    icon = 'fa fa-tasks'
+    model_perm = 'change'
+
+    chunk_size = None
+    chunk_time = 2
+
+    def __init__(self, list_view):
+        self.list_view = list_view
+        self.admin_site = list_view.admin_site
+        self.request = list_view.request
+        self.user = list_view.user
+        self.model = list_view.model
+        self.opts = list_view.opts
+
+    @classmethod
+    def has_perm(cls, list_view):
+        return list_view.get_model_perms()[cls.model_perm]
+
+    @classmethod
+    def get_description(cls, opts):
+        return force_text(cls.description or cls.action_name) % {
+            'verbose_name': force_text(opts.verbose_name),
+            'verbose_name_plural': force_text(opts.verbose_name_plural),
+        }
+
+    def do_action(self, queryset):
+        """ 返回 HttpResponse 时直接返回给用户，否则回到 changelist """
+        raise NotImplementedError
+
+    def get_context(self):
+        context = ModelAdminView.get_context(self.list_view)
+        context.update({
+            'title': self.get_description(self.opts),
+            'action_name': self.action_name,
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+            'selected': self.request.POST.getlist(ACTION_CHECKBOX_NAME),
+            'select_across': self.request.POST.get('select_across', '0'),
+        })
+        return context
+
+    def get_success_message(self, count):
+        return _('Successfully processed %(count)d %(items)s.') % {
+            'count': count, 'items': force_text(self.opts.verbose_name_plural)
+        }
+
+    def execute(self, queryset, func):
+        """
+        用 func(queryset) 处理选中的行，func 返回处理的行数。行数不超过 chunk_size 时在一个事务中执行，
+        超过时返回进度页，之后每个请求处理若干批。
+        """
+        using = router.db_for_write(self.model)
+        if self.chunk_size:
+            cursor = self.request.POST.get(ACTION_CURSOR_VAR)
+            if cursor is not None:
+                return self.execute_chunks(queryset, func, cursor)
+            total = queryset.count()
+            if total > self.chunk_size:
+                return self.progress_response(total)
+
+        with transaction.atomic(using=using):
+            count = func(queryset)
+        self.list_view.message_user(self.get_success_message(count), 'success')
+
+    def execute_chunks(self, queryset, func, cursor):
+        using = router.db_for_write(self.model)
+        pk_field = self.opts.pk
+        queryset = queryset.order_by(pk_field.attname)
+        if cursor:
+            queryset = queryset.filter(pk__gt=pk_field.to_python(cursor))
+
+        deadline = time.monotonic() + self.chunk_time
+        processed = 0
+        done = False
+        while not done and time.monotonic() < deadline:
+            # 先读取这一批的主键，再用 pk__in 处理，每批一个事务
+            pks = list(queryset.values_list(pk_field.attname, flat=True)[:self.chunk_size])
+            if pks:
+                with transaction.atomic(using=using):
+                    processed += func(self.model._default_manager.filter(pk__in=pks))
+                cursor = pks[-1]
+                queryset = queryset.filter(pk__gt=cursor)
+            done = len(pks) < self.chunk_size
+
+        total = int(self.request.POST.get('_action_processed') or 0) + processed
+        if done:
+            self.list_view.message_user(self.get_success_message(total), 'success')
+        return self.render_to_response({
+            'result': 'success' if done else 'progress',
+            'processed': processed,
+            'cursor': force_text(cursor),
+            'redirect': self.request.get_full_path(),
+        })
+
+    def progress_response(self, total):
+        context = self.get_context()
+        context.update({
+            'total': total,
+            'post_data': [
+                (name, value)
+                for name, values in self.request.POST.lists() if name != 'csrfmiddlewaretoken'
+                for value in values
+            ],
+        })
+        return TemplateResponse(self.request, self.list_view.get_template_list('views/model_action_progress.html'),
+                                context)
+
+
+class DeleteSelectedAction(BaseActionView):
+    """ 确认后直接对 queryset 执行 delete()，没有级联和信号时 Django 只执行一条 DELETE 语句 """
+
+    action_name = 'delete_selected'
+    description = ugettext_lazy('Delete selected %(verbose_name_plural)s')
+    icon = 'fa fa-times'
+    model_perm = 'delete'
+
+    delete_confirmation_template = None
+
+    def get_success_message(self, count):
+        return _('Successfully deleted %(count)d %(items)s.') % {
+            'count': count, 'items': force_text(self.opts.verbose_name_plural)
+        }
+
+    def delete_queryset(self, queryset):
+        count, per_model = queryset.delete()
+        return per_model.get(self.opts.label, 0)
+
+    def do_action(self, queryset):
+        if self.request.POST.get('post') == 'yes':
+            return self.execute(queryset, self.delete_queryset)
+
+        count, approximate = self.list_view.get_result_count(queryset)
+        context = self.get_context()
+        context.update({
+            'title': _('Are you sure?'),
+            'count': count,
+            'count_approximate': approximate,
+        })
+        return TemplateResponse(
+            self.request,
+            self.delete_confirmation_template or self.list_view.get_template_list(
+                'views/model_delete_selected_confirm.html'
+            ),
+            context,
+        )
+
+
+class ActionPlugin(BaseAdminPlugin):
+    """
+    changelist 的批量操作。选中当前页的行时操作 ``pk__in`` 过滤后的 queryset，
+    选中全部时操作当前过滤条件下的 queryset，不会读取所有的行。
+    """
+
+    actions = []
+    # 为 None 时使用 site.register_action 注册的全局 action
+    global_actions = None
+
+    def init_request(self, *args, **kwargs):
+        self.actions_by_name = self.get_actions()
+        return bool(self.actions_by_name)
+
+    def get_actions(self):
+        actions = {}
+        global_actions = self.admin_site.get_actions() if self.global_actions is None else self.global_actions
+        for action in list(global_actions) + list(self.actions or ()):
+            if action.has_perm(self.admin_view):
+                actions[action.action_name] = action
+        return actions
+
+    def get_action_choices(self):
+        return [
+            {'name': name, 'icon': action.icon, 'description': action.get_description(self.opts)}
+            for name, action in self.actions_by_name.items()
+        ]
+
+    def get_action_queryset(self):
+        queryset = self.admin_view.get_list_queryset()
+        if self.request.POST.get('select_across') == '1':
+            return queryset
+        return queryset.filter(pk__in=self.request.POST.getlist(ACTION_CHECKBOX_NAME))
+
+    def post(self, __, request, *args, **kwargs):
+        name = request.POST.get('action')
+        if not name or '_do_' in request.POST:
+            return __()
+        if name not in self.actions_by_name:
+            raise PermissionDenied
+
+        if request.POST.get('select_across') != '1' and not request.POST.getlist(ACTION_CHECKBOX_NAME):
+            self.admin_view.message_user(
+                _('Items must be selected in order to perform actions on them. No items have been changed.'),
+                'warning'
+            )
+            return HttpResponseRedirect(request.get_full_path())
+
+        action = self.actions_by_name[name](self.admin_view)
+        response = action.do_action(self.get_action_queryset())
+        if isinstance(response, HttpResponse):
+            return response
+        return HttpResponseRedirect(request.get_full_path())
+
+    def result_headers(self, headers):
+        return [{
+            'name': '_action_',
+            'label': '',
+            'html': mark_safe('<input type="checkbox" id="action-toggle"/>'),
+        }] + headers
+
+    def result_row(self, row, obj):
+        row['cells'].insert(0, {
+            'name': '_action_',
+            'html': format_html('<input type="checkbox" name="{}" value="{}" class="action-select"/>',
+                                ACTION_CHECKBOX_NAME, obj.pk),
+        })
+        return row
+
+    def block_results_bottom(self, context, nodes):
+        return render_to_string('xadmin/blocks/model_list.results_bottom.actions.html', {
+            'actions': self.get_action_choices(),
+            'result_count': context.get('result_count'),
+            'result_count_approximate': context.get('result_count_approximate'),
+            'page_count': len(context.get('result_list') or ()),
+        })
+
+    def get_media(self, media):
+        return media + self.vendor('xadmin.plugin.actions.js')
+
+
+site.register_action(DeleteSelectedAction)
+site.register_plugin(ActionPlugin, ListAdminView)
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.template.loader import render_to_string
+
+from xadmin.changefeed import publish_change
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView
+
+
+class ChangeFeedPlugin(BaseAdminPlugin):
+    """
+    change_feed 为 True 时，changelist 通过 SSE 订阅 model 的变更，有变更时重新加载列表部分。
+    需要使用 ``AdminSite.asgi_application`` 包装的 ASGI 应用，change_feed_debounce 为合并事件的毫秒数。
+    """
+
+    change_feed = False
+    change_feed_debounce = 500
+
+    def init_request(self, *args, **kwargs):
+        return self.change_feed
+
+    def block_nav_btns(self, context, nodes):
+        return render_to_string('xadmin/blocks/model_list.nav_btns.changefeed.html', {
+            'feed_url': self.get_admin_url('change_feed'),
+            'model_label': self.opts.label_lower,
+            'debounce': self.change_feed_debounce,
+        })
+
+    def get_media(self, media):
+        return media + self.vendor('xadmin.plugin.changefeed.js')
+
+
+def ready(site):
+    """ 只为开启 change_feed 的 model 连接信号 """
+    for model, admin_class in site._registry.items():
+        if getattr(admin_class, 'change_feed', False):
+            label = model._meta.label_lower
+            post_save.connect(publish_change, sender=model, dispatch_uid=f'xadmin_change_feed_save_{label}')
+            post_delete.connect(publish_change, sender=model, dispatch_uid=f'xadmin_change_feed_delete_{label}')
+
+
+site.register_plugin(ChangeFeedPlugin, ListAdminView)
@@ -0,0 +1,283 @@
+import calendar
+import datetime
+import decimal
+import hashlib
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db import models
+from django.db.models.functions import Trunc
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.encoding import force_text
+from django.utils.text import capfirst
+from django.utils.translation import get_language
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView, filter_hook
+from xadmin.views.list import CURSOR_VAR
+
+# 时间字段可以使用的分组粒度及每个分组的大致秒数，从小到大排列
+TIME_BUCKETS = (
+    ('minute', 60),
+    ('hour', 3600),
+    ('day', 86400),
+    ('week', 7 * 86400),
+    ('month', 31 * 86400),
+    ('quarter', 92 * 86400),
+    ('year', 366 * 86400),
+)
+DATE_BUCKETS = TIME_BUCKETS[2:]
+
+
+def downsample(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样：保留首尾两点，其余按 x 顺序分成 threshold - 2 个桶，
+    每个桶中选出与前一个选中点及下一个桶平均点组成的三角形面积最大的点，保留曲线的形状。
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_points = points[end:min(int((i + 2) * every) + 1, count)] or points[-1:]
+        avg_x = sum(p[0] for p in next_points) / len(next_points)
+        avg_y = sum(p[1] for p in next_points) / len(next_points)
+        ax, ay = points[a]
+        best, max_area = start, -1
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                best, max_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class ChartsPlugin(BaseAdminPlugin):
+    """
+    在 changelist 上方显示 data_charts 中声明的图表，图表数据由 ChartsView 按当前的过滤条件返回。
+    """
+
+    data_charts = {}
+
+    def init_request(self, *args, **kwargs):
+        return bool(self.data_charts) and not isinstance(self.admin_view, ChartsView)
+
+    def get_chart_url(self, name):
+        query_string = self.admin_view.get_query_string(remove=[CURSOR_VAR])
+        return self.admin_view.get_model_url(self.model, 'chart', name) + query_string
+
+    def block_results_top(self, context, nodes):
+        charts = [
+            {'name': name, 'title': chart.get('title', name), 'url': self.get_chart_url(name)}
+            for name, chart in self.data_charts.items()
+        ]
+        return render_to_string('xadmin/blocks/model_list.results_top.charts.html', {'charts': charts})
+
+    def get_media(self, media):
+        return media + self.vendor('flot.js', 'xadmin.plugin.charts.js')
+
+
+class ChartsView(ListAdminView):
+    """
+    返回 flot 使用的图表数据。data_charts 中每个图表的配置：
+
+    * ``x-field``: x 轴字段，时间字段按 ``bucket`` （minute/hour/day/week/month/quarter/year）截断分组，
+      不指定时根据数据的时间跨度自动选择点数不超过 ``max-points`` 的最小粒度
+    * ``y-field``: {名称: 聚合表达式} 或聚合表达式的列表，例如 ``{'count': Count('pk')}``
+    * ``group-by``: 可选，按该字段的值拆分为多条曲线
+    * ``max-points``: 每条曲线的最大点数，默认为 chart_max_points
+    * ``option``: 覆盖默认的 flot 选项
+
+    统计在数据库中通过 values/annotate 完成，不会读取 model 对象，结果按图表及过滤条件缓存 chart_cache_timeout 秒。
+    """
+
+    data_charts = {}
+    chart_max_points = 200
+    chart_cache = 'default'
+    chart_cache_timeout = 300
+
+    def init_request(self, name, *args, **kwargs):
+        super(ChartsView, self).init_request(*args, **kwargs)
+        if name not in self.data_charts:
+            raise Http404
+        self.chart_name = name
+        self.chart = self.data_charts[name]
+        self.x_field = self.get_chart_field(self.chart['x-field'])
+        self.group_field = self.chart.get('group-by') and self.get_chart_field(self.chart['group-by'])
+        self.max_points = self.chart.get('max-points', self.chart_max_points)
+
+    def get_chart_field(self, name):
+        field = self.opts.pk if name == 'pk' else self.opts.get_field(name)
+        if not field.concrete:
+            raise ImproperlyConfigured(f"The chart field {name} of {self.opts.label} isn't a concrete field")
+        return field
+
+    def get_aggregates(self):
+        """ 返回 [(别名, 名称, 聚合表达式), ...] """
+        y_field = self.chart['y-field']
+        if isinstance(y_field, dict):
+            items = y_field.items()
+        else:
+            items = [(aggregate.default_alias, aggregate) for aggregate in y_field]
+        return [(f'chart_y{i}', label, aggregate) for i, (label, aggregate) in enumerate(items)]
+
+    def is_time_field(self, field):
+        return isinstance(field, models.DateField)
+
+    def is_numeric_field(self, field):
+        return isinstance(field, (models.IntegerField, models.FloatField, models.DecimalField))
+
+    @filter_hook
+    def get_chart_queryset(self):
+        return self.get_list_queryset().order_by()
+
+    def get_cache_key(self, queryset):
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        signature = hashlib.md5(
+            f'{sql}:{params!r}:{get_language()}:{timezone.get_current_timezone_name()}'.encode('utf-8')
+        ).hexdigest()
+        return f'xadmin:chart:{self.opts.label_lower}:{self.chart_name}:{signature}'
+
+    def get_bucket(self, queryset):
+        """ 返回时间字段的分组粒度，没有数据时返回 None """
+        if 'bucket' in self.chart:
+            return self.chart['bucket']
+        bounds = queryset.aggregate(
+            chart_min=models.Min(self.x_field.attname), chart_max=models.Max(self.x_field.attname)
+        )
+        if bounds['chart_min'] is None:
+            return None
+        span = (bounds['chart_max'] - bounds['chart_min']).total_seconds()
+        buckets = TIME_BUCKETS if isinstance(self.x_field, models.DateTimeField) else DATE_BUCKETS
+        for kind, seconds in buckets:
+            if span / seconds < self.max_points:
+                return kind
+        return buckets[-1][0]
+
+    def get_rows(self, queryset, aggregates):
+        x_name = self.x_field.attname
+        if self.is_time_field(self.x_field):
+            bucket = self.get_bucket(queryset)
+            if bucket is None:
+                return []
+            queryset = queryset.annotate(chart_x=Trunc(x_name, bucket))
+            x_name = 'chart_x'
+
+        names = [x_name] + ([self.group_field.attname] if self.group_field else [])
+        annotations = {alias: aggregate for alias, label, aggregate in aggregates}
+        if self.is_time_field(self.x_field) or self.is_numeric_field(self.x_field):
+            queryset = queryset.values(*names).annotate(**annotations).order_by(x_name)
+        elif self.group_field:
+            # 分类数据只保留第一个统计值最大的 max-points 个分类：先不分组统计出这些分类，再查询它们所有分组的值
+            top = self.get_top_categories(queryset, x_name, aggregates[0][2])
+            position = {value: index for index, value in enumerate(top)}
+            condition = models.Q(**{f'{x_name}__in': [value for value in top if value is not None]})
+            if None in position:
+                condition |= models.Q(**{f'{x_name}__isnull': True})
+            queryset = sorted(
+                queryset.filter(condition).values(*names).annotate(**annotations).order_by(),
+                key=lambda row: position[row[x_name]]
+            )
+        else:
+            queryset = queryset.values(x_name).annotate(**annotations).order_by(
+                f'-{aggregates[0][0]}', x_name
+            )[:self.max_points]
+        return [(row[x_name], row.get(names[-1]) if self.group_field else None, row) for row in queryset]
+
+    def get_top_categories(self, queryset, x_name, aggregate):
+        """ 返回按 aggregate 从大到小排列的前 max-points 个分类的值 """
+        rows = queryset.values(x_name).annotate(chart_rank=aggregate).order_by('-chart_rank', x_name)
+        return [row[x_name] for row in rows[:self.max_points]]
+
+    def to_x_value(self, value):
+        if isinstance(value, datetime.datetime):
+            if timezone.is_aware(value):
+                value = timezone.localtime(value)
+            # flot 按 UTC 显示时间，这里把本地时间当作 UTC 时间戳输出
+            return calendar.timegm(value.timetuple()) * 1000
+        if isinstance(value, datetime.date):
+            return calendar.timegm(value.timetuple()) * 1000
+        if isinstance(value, decimal.Decimal):
+            return float(value)
+        if self.is_numeric_field(self.x_field):
+            return value
+        return self.display_value(self.x_field, value)
+
+    def display_value(self, field, value):
+        choices = dict(field.flatchoices)
+        return force_text(choices.get(value, value))
+
+    def get_option(self):
+        if self.is_time_field(self.x_field):
+            xaxis = {'mode': 'time'}
+        elif self.is_numeric_field(self.x_field):
+            xaxis = {}
+        else:
+            xaxis = {'mode': 'categories'}
+        option = {
+            'series': {'lines': {'show': True}, 'points': {'show': False}},
+            'grid': {'hoverable': True, 'clickable': True},
+            'xaxis': xaxis,
+            'legend': {'position': 'nw'},
+        }
+        for key, value in self.chart.get('option', {}).items():
+            if isinstance(value, dict) and isinstance(option.get(key), dict):
+                option[key] = dict(option[key], **value)
+            else:
+                option[key] = value
+        return option
+
+    @filter_hook
+    def get_chart_data(self):
+        queryset = self.get_chart_queryset()
+        try:
+            cache_key = self.get_cache_key(queryset)
+        except EmptyResultSet:
+            cache_key = None
+        cache = caches[self.chart_cache]
+        if cache_key:
+            result = cache.get(cache_key)
+            if result is not None:
+                return result
+
+        aggregates = self.get_aggregates()
+        rows = self.get_rows(queryset, aggregates) if cache_key else []
+        series = {}
+        for x, group, row in rows:
+            x = self.to_x_value(x)
+            for alias, label, aggregate in aggregates:
+                y = row[alias]
+                if y is None:
+                    continue
+                series.setdefault((group, label), []).append([x, float(y) if isinstance(y, decimal.Decimal) else y])
+
+        data = []
+        for (group, label), points in series.items():
+            if self.group_field:
+                group = self.display_value(self.group_field, group)
+                label = f'{group} {label}' if len(aggregates) > 1 else group
+            if self.is_time_field(self.x_field) or self.is_numeric_field(self.x_field):
+                points = downsample(points, self.max_points)
+            data.append({'label': force_text(capfirst(label)), 'data': points})
+
+        result = {'data': data, 'option': self.get_option()}
+        if cache_key:
+            cache.set(cache_key, result, self.chart_cache_timeout)
+        return result
+
+    def get(self, request, name, *args, **kwargs):
+        return self.render_to_response(self.get_chart_data())
+
+
+site.register_plugin(ChartsPlugin, ListAdminView)
+site.register_modelview(path=r'^chart/(?P<name>[\w-]+)/$', admin_view_class=ChartsView, name='%s_%s_chart')
@@ -0,0 +1,126 @@
+from functools import lru_cache
+
+from django import forms
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.forms.models import modelform_factory
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils.encoding import force_text
+from django.utils.html import conditional_escape
+from django.views.decorators.cache import never_cache
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView, ModelAdminView, csrf_protect_m, filter_hook
+
+
+@lru_cache(maxsize=None)
+def get_editable_form(model, fields):
+    """ 只包含 fields 的 ModelForm，按 (model, fields) 缓存 """
+    return modelform_factory(model, form=forms.ModelForm, fields=fields)
+
+
+class EditablePlugin(BaseAdminPlugin):
+    """ 在 changelist 中为 list_editable 中的字段加上编辑按钮，点击后由 EditPatchView 加载并保存单个字段 """
+
+    list_editable = ()
+
+    def init_request(self, *args, **kwargs):
+        return bool(self.list_editable) and self.admin_view.has_change_permission()
+
+    def result_item(self, item, obj, name):
+        if name in self.list_editable:
+            item['edit_url'] = f'{self.admin_view.model_admin_url("patch", obj.pk)}?fields={name}'
+        return item
+
+    def get_media(self, media):
+        return media + self.vendor('xadmin.plugin.editable.js', 'xadmin.widget.editable.css')
+
+
+class EditPatchView(ModelAdminView):
+    """
+    单个字段的编辑：GET 返回只包含 fields 参数中字段的表单，POST 只校验这些字段，
+    通过 ``queryset.filter(pk=...).update()`` 写入，editable_save 为 'save' 时使用 ``save(update_fields=...)``，
+    后者会调用 model 的 save() 并发送信号。返回 JSON，new_html 为字段在列表中新的显示内容。
+    """
+
+    list_editable = ()
+    # 'update' 或 'save'
+    editable_save = 'update'
+    editable_template = 'xadmin/views/model_editable.html'
+
+    def init_request(self, object_id, *args, **kwargs):
+        self.org_obj = self.get_object(object_id)
+        if self.org_obj is None:
+            raise Http404
+        if not self.has_change_permission(self.org_obj):
+            raise PermissionDenied
+        self.edit_fields = self.get_edit_fields()
+
+    def get_edit_fields(self):
+        names = [name for name in self.request.GET.get('fields', '').split(',') if name]
+        if not names or any(name not in self.list_editable for name in names):
+            raise PermissionDenied
+        for name in names:
+            try:
+                field = self.opts.get_field(name)
+            except FieldDoesNotExist:
+                raise PermissionDenied
+            if not field.concrete or field.many_to_many or not field.editable:
+                raise PermissionDenied
+        return tuple(names)
+
+    @filter_hook
+    def get_form(self, data=None, files=None):
+        return get_editable_form(self.model, self.edit_fields)(data=data, files=files, instance=self.org_obj)
+
+    @filter_hook
+    def save_fields(self, obj):
+        if self.editable_save == 'save':
+            obj.save(update_fields=self.edit_fields)
+        else:
+            fields = [self.opts.get_field(name) for name in self.edit_fields]
+            self.model._default_manager.filter(pk=obj.pk).update(
+                **{field.attname: getattr(obj, field.attname) for field in fields}
+            )
+
+    def display_value(self, obj, name):
+        field = self.opts.get_field(name)
+        if field.choices:
+            value = getattr(obj, f'get_{name}_display')()
+        else:
+            value = getattr(obj, name)
+        return conditional_escape(force_text(value))
+
+    @never_cache
+    @filter_hook
+    def get(self, request, *args, **kwargs):
+        return TemplateResponse(request, self.editable_template, {
+            'form': self.get_form(),
+            'form_url': request.get_full_path(),
+        })
+
+    @csrf_protect_m
+    @filter_hook
+    def post(self, request, *args, **kwargs):
+        form = self.get_form(data=request.POST, files=request.FILES)
+        if not form.is_valid():
+            return self.render_to_response({
+                'result': 'error',
+                'errors': [{
+                    'id': form[name].auto_id if name in form.fields else None,
+                    'name': name,
+                    'errors': list(errors),
+                } for name, errors in form.errors.items()],
+            })
+
+        obj = form.save(commit=False)
+        self.save_fields(obj)
+        return self.render_to_response({
+            'result': 'success',
+            'new_data': {name: self.opts.get_field(name).value_from_object(obj) for name in self.edit_fields},
+            'new_html': {name: self.display_value(obj, name) for name in self.edit_fields},
+        })
+
+
+site.register_plugin(EditablePlugin, ListAdminView)
+site.register_modelview(path=r'^(?P<object_id>.+)/patch/$', admin_view_class=EditPatchView, name='%s_%s_patch')
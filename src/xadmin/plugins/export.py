@@ -0,0 +1,146 @@
+import csv
+import datetime
+import json
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.encoding import force_text
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView
+from xadmin.views.base import JSONEncoder
+from xadmin.views.list import CURSOR_VAR
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+EXPORT_NAMES = {
+    'csv': 'CSV',
+    'json': 'JSON',
+    'xlsx': 'Excel',
+}
+
+
+class Echo:
+    """ 只实现 write 的伪文件对象，csv.writer 写入的内容直接返回给 StreamingHttpResponse """
+
+    def write(self, value):
+        return value
+
+
+class ExportPlugin(BaseAdminPlugin):
+    """
+    导出 changelist 的数据，使用 queryset.iterator(chunk_size) 分批读取（PostgreSQL 上为服务端游标），
+    csv 和 json（每行一个 JSON 对象）边查询边输出，xlsx 使用 openpyxl 的 write-only 模式，内存占用与行数无关。
+    """
+
+    list_export = ('csv', 'json', 'xlsx')
+    export_chunk_size = 2000
+
+    def init_request(self, *args, **kwargs):
+        return bool(self.get_export_types())
+
+    def get_export_types(self):
+        return [
+            {'type': et, 'name': EXPORT_NAMES.get(et, et)}
+            for et in self.list_export or ()
+            if et != 'xlsx' or Workbook is not None
+        ]
+
+    def get_export_queryset(self):
+        queryset = self.admin_view.get_list_queryset().order_by(*self.admin_view.get_order_by())
+        if self.request.GET.get('_select_across') == '0':
+            # 只导出选中的行
+            pks = [pk for pk in self.request.GET.get('_selected_actions', '').split(',') if pk]
+            queryset = queryset.filter(pk__in=pks)
+        return queryset
+
+    def get_export_headers(self):
+        # 带 html 的列（例如 actions 的复选框）只用于页面显示
+        return [h for h in self.admin_view.result_headers() if not h.get('html')]
+
+    def get_export_rows(self, names):
+        value_for_field = self.admin_view.value_for_field
+        for obj in self.get_export_queryset().iterator(chunk_size=self.export_chunk_size):
+            yield [value_for_field(obj, name) for name in names]
+
+    def get_filename(self, export_type):
+        return f'{self.opts.model_name}_{timezone.localtime().strftime("%Y%m%d%H%M%S")}.{export_type}'
+
+    def get_csv_export(self, headers):
+        writer = csv.writer(Echo())
+        # BOM 让 Excel 按 utf-8 打开
+        yield '\ufeff'
+        yield writer.writerow([h['label'] for h in headers])
+        for row in self.get_export_rows([h['name'] for h in headers]):
+            yield writer.writerow(['' if v is None else force_text(v) for v in row])
+
+    def get_json_export(self, headers):
+        names = [h['name'] for h in headers]
+        for row in self.get_export_rows(names):
+            yield json.dumps(dict(zip(names, row)), cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+    def to_xlsx_value(self, value):
+        if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+            # openpyxl 不支持带时区的时间
+            return timezone.make_naive(value)
+        if value is None or isinstance(value, (bool, int, float, datetime.date, datetime.time)):
+            return value
+        return force_text(value)
+
+    def get_xlsx_export(self, headers):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(force_text(self.opts.verbose_name))
+        sheet.append([h['label'] for h in headers])
+        for row in self.get_export_rows([h['name'] for h in headers]):
+            sheet.append([self.to_xlsx_value(v) for v in row])
+        # xlsx 是 zip 格式，只能写完后再输出，先写入临时文件避免占用内存
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return output
+
+    def get(self, __, request, *args, **kwargs):
+        export_type = request.GET.get('export_type')
+        if request.GET.get('_do_') != 'export' or export_type not in [et['type'] for et in self.get_export_types()]:
+            return __()
+
+        headers = self.get_export_headers()
+        filename = self.get_filename(export_type)
+        if export_type == 'xlsx':
+            return FileResponse(
+                self.get_xlsx_export(headers),
+                as_attachment=True,
+                filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+
+        if export_type == 'csv':
+            response = StreamingHttpResponse(self.get_csv_export(headers), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(
+                self.get_json_export(headers), content_type='application/x-ndjson; charset=utf-8'
+            )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def block_nav_btns(self, context, nodes):
+        params = [
+            (name, value)
+            for name, values in self.request.GET.lists() if name not in (CURSOR_VAR, '_do_', 'export_type')
+            for value in values
+        ]
+        return render_to_string('xadmin/blocks/model_list.nav_btns.export.html', {
+            'export_types': self.get_export_types(),
+            'export_params': params,
+        })
+
+    def get_media(self, media):
+        return media + self.vendor('xadmin.plugin.importexport.js', 'xadmin.plugin.importexport.css')
+
+
+site.register_plugin(ExportPlugin, ListAdminView)
@@ -0,0 +1,298 @@
+import hashlib
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured, ValidationError
+from django.db import models
+from django.db.models import CharField, Count, Q, TextField, Value
+from django.db.models.functions import Cast
+from django.template.loader import render_to_string
+from django.utils.encoding import force_text
+from django.utils.text import capfirst
+from django.utils.translation import ugettext as _, get_language
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView
+from xadmin.views.list import CURSOR_VAR
+
+FILTER_PREFIX = '_p_'
+# 值为空（NULL）的选项在 url 中的参数后缀
+NULL_SUFFIX = '__isnull'
+FACET_VAR = '_facet'
+FACET_SEARCH_VAR = '_facet_q'
+FACET_PAGE_VAR = '_facet_page'
+
+
+class QuickFilterPlugin(BaseAdminPlugin):
+    """
+    changelist 左侧的分面过滤，list_quick_filter 中每个字段显示各个值及其行数，可以多选。
+
+    所有分面的行数通过一条 ``UNION ALL`` 查询得到，每个分面的子查询使用除自身以外的其他分面的过滤条件，
+    结果按查询语句缓存 quick_filter_cache_timeout 秒。不同值的个数超过 quick_filter_max_choices 的分面
+    改为可搜索的列表，由 ``?_facet=字段名`` 分页返回；不同值的个数只用于选择显示方式，
+    需要扫描整个表，缓存 quick_filter_cardinality_timeout 秒。
+    """
+
+    list_quick_filter = ()
+    quick_filter_max_choices = 50
+    quick_filter_page_size = 20
+    quick_filter_cache = 'default'
+    quick_filter_cache_timeout = 60
+    quick_filter_cardinality_timeout = 24 * 3600
+    # {字段名: 搜索使用的 lookup}，外键默认使用关联 model 的第一个字符字段
+    quick_filter_search_fields = {}
+
+    def init_request(self, *args, **kwargs):
+        if not self.list_quick_filter:
+            return False
+        self.facet_fields = {name: self.get_facet_field(name) for name in self.list_quick_filter}
+        self.facet_filters = {}
+        self.facet_base = None
+        return True
+
+    def get_facet_field(self, name):
+        field = self.opts.get_field(name)
+        if not field.concrete or field.many_to_many or isinstance(field, models.DateField):
+            raise ImproperlyConfigured(
+                f"The quick filter field {name} of {self.opts.label} must be a concrete, non-date, non-m2m field"
+            )
+        return field
+
+    def value_field(self, field):
+        return field.target_field if field.is_relation else field
+
+    def to_python(self, field, value):
+        """ 把 url 参数或数据库中转换为文本的值转换为字段的值 """
+        if value is None:
+            return None
+        if isinstance(field, models.BooleanField):
+            return force_text(value).lower() in ('1', 't', 'true')
+        return self.value_field(field).to_python(value)
+
+    def get_selected(self, name):
+        """ 返回 (选中的值的集合, 是否选中了空值) """
+        field = self.facet_fields[name]
+        values = set()
+        for value in self.request.GET.getlist(FILTER_PREFIX + name):
+            try:
+                values.add(self.to_python(field, value))
+            except ValidationError:
+                continue
+        return values, self.request.GET.get(FILTER_PREFIX + name + NULL_SUFFIX) == '1'
+
+    def get_list_queryset(self, queryset):
+        # facet_base 是其他插件过滤后的 queryset，分面的行数在它上面计算
+        self.facet_base = queryset
+        for name, field in self.facet_fields.items():
+            values, null = self.get_selected(name)
+            condition = Q()
+            if values:
+                condition |= Q(**{f'{field.attname}__in': values})
+            if null:
+                condition |= Q(**{f'{field.attname}__isnull': True})
+            if condition:
+                self.facet_filters[name] = condition
+        return queryset.filter(*self.facet_filters.values()) if self.facet_filters else queryset
+
+    # priority 小的插件方法在外层，最后执行，这时 queryset 已经包含其他插件（例如搜索）的过滤条件，
+    # 分面的行数与列表的行数一致
+    get_list_queryset.priority = 5
+
+    def get_facet_queryset(self, name):
+        """ 应用除 name 以外的分面过滤条件 """
+        others = [condition for other, condition in self.facet_filters.items() if other != name]
+        queryset = self.facet_base if self.facet_base is not None else self.admin_view.get_list_queryset()
+        return queryset.filter(*others).order_by()
+
+    def is_low_cardinality(self, field):
+        return bool(field.choices) or isinstance(field, models.BooleanField)
+
+    def get_cardinality(self):
+        """ 一条查询得到需要判断的分面的不同值个数，只与 model 有关，单独缓存 """
+        names = [name for name, field in self.facet_fields.items() if not self.is_low_cardinality(field)]
+        if not names:
+            return {}
+        cache = caches[self.quick_filter_cache]
+        cache_key = f'xadmin:facet_cardinality:{self.opts.label_lower}:{":".join(names)}'
+        cardinality = cache.get(cache_key)
+        if cardinality is None:
+            cardinality = self.model._default_manager.aggregate(**{
+                name: Count(self.facet_fields[name].attname, distinct=True) for name in names
+            })
+            cache.set(cache_key, cardinality, self.quick_filter_cardinality_timeout)
+        return cardinality
+
+    def get_cache_key(self, kind, queryset):
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        signature = hashlib.md5(f'{sql}:{params!r}:{get_language()}'.encode('utf-8')).hexdigest()
+        return f'xadmin:{kind}:{self.opts.label_lower}:{signature}'
+
+    def cached(self, kind, queryset, func):
+        """ 按 queryset 的 sql 缓存 func() 的结果 """
+        try:
+            cache_key = self.get_cache_key(kind, queryset)
+        except EmptyResultSet:
+            return func()
+        cache = caches[self.quick_filter_cache]
+        result = cache.get(cache_key)
+        if result is None:
+            result = func()
+            cache.set(cache_key, result, self.quick_filter_cache_timeout)
+        return result
+
+    def get_facet_counts(self, names):
+        """ 一条 UNION ALL 查询得到 names 中所有分面各个值的行数，返回 {字段名: [(值, 行数), ...]} """
+        if not names:
+            return {}
+        querysets = [
+            self.get_facet_queryset(name).annotate(
+                facet_name=Value(name, output_field=CharField()),
+                facet_value=Cast(self.facet_fields[name].attname, output_field=TextField()),
+            ).values('facet_name', 'facet_value').annotate(facet_count=Count('pk'))
+            for name in names
+        ]
+        queryset = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+
+        def count():
+            counts = {name: [] for name in names}
+            for row in queryset:
+                counts[row['facet_name']].append((row['facet_value'], row['facet_count']))
+            return counts
+
+        return self.cached('facets', queryset, count)
+
+    def get_labels(self, field, values):
+        """ 返回 {值: 显示的文字}，外键一次查询读取所有关联对象 """
+        if field.choices:
+            choices = dict(field.flatchoices)
+            return {value: force_text(choices.get(value, value)) for value in values}
+        if isinstance(field, models.BooleanField):
+            return {value: _('Yes') if value else _('No') for value in values}
+        if field.is_relation:
+            objs = field.related_model._default_manager.in_bulk([v for v in values if v is not None])
+            return {value: force_text(objs.get(value, value)) for value in values}
+        return {value: force_text(value) for value in values}
+
+    def get_url(self, name, values, null):
+        params = self.request.GET.copy()
+        for key in (CURSOR_VAR, FACET_VAR, FACET_SEARCH_VAR, FACET_PAGE_VAR):
+            params.pop(key, None)
+        params.setlist(FILTER_PREFIX + name, [force_text(v) for v in values])
+        if null:
+            params[FILTER_PREFIX + name + NULL_SUFFIX] = '1'
+        else:
+            params.pop(FILTER_PREFIX + name + NULL_SUFFIX, None)
+        return f'?{params.urlencode()}' if params else '?'
+
+    def make_choices(self, name, counts):
+        """ counts 为 [(值, 行数), ...]，返回模板使用的选项，点击选项切换是否选中 """
+        field = self.facet_fields[name]
+        selected, null_selected = self.get_selected(name)
+        labels = self.get_labels(field, [value for value, count in counts if value is not None])
+        choices = []
+        for value, count in counts:
+            if value is None:
+                checked = null_selected
+                url = self.get_url(name, selected, not null_selected)
+                label = _('(None)')
+            else:
+                checked = value in selected
+                url = self.get_url(name, selected ^ {value}, null_selected)
+                label = labels[value]
+            choices.append({'label': label, 'count': count, 'selected': checked, 'url': url})
+        return choices
+
+    def get_facets(self):
+        cardinality = self.get_cardinality()
+        low = [name for name in self.facet_fields if cardinality.get(name, 0) <= self.quick_filter_max_choices]
+        counts = self.get_facet_counts(low)
+
+        facets = []
+        for name, field in self.facet_fields.items():
+            selected, null_selected = self.get_selected(name)
+            facet = {
+                'name': name,
+                'title': force_text(capfirst(field.verbose_name)),
+                'searchable': name not in counts,
+                'clear_url': self.get_url(name, (), False) if selected or null_selected else None,
+            }
+            if facet['searchable']:
+                facet['url'] = self.get_facet_url(name)
+                # 可搜索的分面只列出已选中的值，不统计行数
+                facet['choices'] = self.make_choices(
+                    name, [(value, None) for value in selected] + ([(None, None)] if null_selected else [])
+                )
+            else:
+                values = [(self.to_python(field, value), count) for value, count in counts[name]]
+                if field.choices:
+                    order = {value: i for i, value in enumerate(dict(field.flatchoices))}
+                    values.sort(key=lambda v: order.get(v[0], len(order)))
+                else:
+                    values.sort(key=lambda v: -v[1])
+                facet['choices'] = self.make_choices(name, values)
+            facets.append(facet)
+        return facets
+
+    def get_facet_url(self, name):
+        params = self.request.GET.copy()
+        params.pop(CURSOR_VAR, None)
+        params[FACET_VAR] = name
+        return f'?{params.urlencode()}'
+
+    def get_search_lookup(self, name):
+        if name in self.quick_filter_search_fields:
+            return self.quick_filter_search_fields[name]
+        field = self.facet_fields[name]
+        if field.is_relation:
+            for related_field in field.related_model._meta.fields:
+                if isinstance(related_field, (models.CharField, models.TextField)):
+                    return f'{name}__{related_field.name}__icontains'
+            return f'{field.attname}__exact'
+        if isinstance(field, (models.CharField, models.TextField)):
+            return f'{field.attname}__icontains'
+        return f'{field.attname}__exact'
+
+    def search_facet(self, name):
+        """ 高基数分面的搜索：按行数从多到少分页返回匹配的值 """
+        field = self.facet_fields[name]
+        term = self.request.GET.get(FACET_SEARCH_VAR, '').strip()
+        try:
+            page = max(int(self.request.GET.get(FACET_PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        size = self.quick_filter_page_size
+
+        queryset = self.get_facet_queryset(name)
+        if term:
+            try:
+                queryset = queryset.filter(**{self.get_search_lookup(name): term})
+            except (ValidationError, ValueError):
+                queryset = queryset.none()
+        queryset = queryset.values(field.attname).annotate(facet_count=Count('pk')).order_by(
+            '-facet_count', field.attname
+        )[(page - 1) * size:page * size + 1]
+
+        rows = self.cached('facet_search', queryset, lambda: [(r[field.attname], r['facet_count']) for r in queryset])
+        return {
+            'choices': self.make_choices(name, rows[:size]),
+            'has_more': len(rows) > size,
+            'page': page,
+        }
+
+    def get(self, __, request, *args, **kwargs):
+        name = request.GET.get(FACET_VAR)
+        if name not in self.facet_fields:
+            return __()
+        return self.render_to_response(self.search_facet(name))
+
+    def block_left_navbar(self, context, nodes):
+        return render_to_string('xadmin/blocks/model_list.left_navbar.quickfilter.html', {
+            'facets': self.get_facets(),
+        })
+
+    def get_media(self, media):
+        return media + self.vendor(
+            'xadmin.plugin.filters.js', 'xadmin.plugin.quickfilter.js', 'xadmin.plugin.quickfilter.css'
+        )
+
+
+site.register_plugin(QuickFilterPlugin, ListAdminView)
@@ -0,0 +1,166 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView, ModelAdminView, filter_hook
+from xadmin.views.list import CURSOR_VAR
+
+REFRESH_VAR = '_refresh'
+VERSION_STRATEGIES = ('updated', 'count', 'counter')
+
+
+def get_counter_key(model):
+    return f'xadmin:change_counter:{model._meta.label_lower}'
+
+
+def bump_change_counter(sender, **kwargs):
+    admin_class = site._registry.get(sender)
+    cache = caches[getattr(admin_class, 'refresh_cache', 'default')]
+    try:
+        cache.incr(get_counter_key(sender))
+    except ValueError:
+        # 计数不存在时由下一次读取重新初始化
+        pass
+
+
+class ChangeVersionMixin:
+    """
+    model 的变更版本，refresh_version 为：
+
+    - 'updated'：refresh_version_field（如 updated_at）的最大值加上行数，需要该字段有索引；
+    - 'count'：行数，只能发现新增和删除；
+    - 'counter'：post_save/post_delete 信号维护的计数，保存在 refresh_cache 中，多进程部署时需要共享的缓存，
+      ``queryset.update()``、bulk_create 等不发送信号的写入不会改变版本。
+
+    为 None 时设置了 refresh_version_field 使用 'updated'，否则使用 'count'。
+    'updated' 和 'count' 的结果缓存 refresh_cache_timeout 秒，多个打开页面的用户共用一次查询。
+    """
+
+    refresh_version = None
+    refresh_version_field = None
+    refresh_cache = 'default'
+    refresh_cache_timeout = 2
+
+    def get_version_strategy(self):
+        strategy = self.refresh_version or ('updated' if self.refresh_version_field else 'count')
+        if strategy not in VERSION_STRATEGIES:
+            raise ImproperlyConfigured(
+                f"The refresh version {strategy} isn't one of {', '.join(VERSION_STRATEGIES)}"
+            )
+        return strategy
+
+    def format_version_value(self, value):
+        """ refresh_version_field 可以是时间，也可以是数字等其他字段（如递增的 revision） """
+        if value is None:
+            return ''
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def get_change_version(self):
+        strategy = self.get_version_strategy()
+        cache = caches[self.refresh_cache]
+        if strategy == 'counter':
+            key = get_counter_key(self.model)
+            # 计数丢失（过期、缓存重启）后从当前时间开始，保证与之前的版本不同
+            cache.add(key, int(time.time() * 1000), None)
+            return str(cache.get(key))
+
+        key = f'xadmin:change_version:{self.model._meta.label_lower}:{strategy}'
+        version = cache.get(key)
+        if version is None:
+            if strategy == 'updated':
+                result = self.model._default_manager.aggregate(
+                    updated=Max(self.refresh_version_field), count=Count('pk')
+                )
+                version = f"{self.format_version_value(result['updated'])}:{result['count']}"
+            else:
+                version = str(self.model._default_manager.count())
+            cache.set(key, version, self.refresh_cache_timeout)
+        return version
+
+
+class RefreshPlugin(ChangeVersionMixin, BaseAdminPlugin):
+    """
+    changelist 的自动刷新，refresh_times 为可选的刷新间隔（秒）。倒计时结束后页面只请求 RefreshVersionView
+    得到 model 的变更版本（带 If-None-Match），版本变化时才重新加载页面，
+    refresh_mode 为 'fragment' 时只替换列表部分。
+    """
+
+    refresh_times = ()
+    # 'reload' 或 'fragment'
+    refresh_mode = 'reload'
+
+    def init_request(self, *args, **kwargs):
+        return bool(self.refresh_times)
+
+    def get_current_refresh(self):
+        try:
+            current = int(self.request.GET.get(REFRESH_VAR, 0))
+        except ValueError:
+            return None
+        return current if current in self.refresh_times else None
+
+    def get_refresh_url(self, value):
+        params = self.request.GET.copy()
+        params.pop(CURSOR_VAR, None)
+        if value:
+            params[REFRESH_VAR] = value
+        else:
+            params.pop(REFRESH_VAR, None)
+        return f'?{params.urlencode()}' if params else '?'
+
+    def block_nav_btns(self, context, nodes):
+        current = self.get_current_refresh()
+        return render_to_string('xadmin/blocks/model_list.nav_btns.refresh.html', {
+            'current_refresh': current,
+            'refresh_times': [
+                {'time': value, 'url': self.get_refresh_url(value), 'selected': value == current}
+                for value in self.refresh_times
+            ],
+            'clear_url': self.get_refresh_url(None),
+            'version_url': self.admin_view.model_admin_url('version'),
+            'version': self.get_change_version() if current else None,
+            'refresh_mode': self.refresh_mode,
+        })
+
+    def get_media(self, media):
+        if self.get_current_refresh():
+            media = media + self.vendor('xadmin.plugin.refresh.js')
+        return media
+
+
+class RefreshVersionView(ChangeVersionMixin, ModelAdminView):
+    """ 返回 ``{"version": ...}``，ETag 为版本的摘要，If-None-Match 相同时返回 304 """
+
+    def init_request(self, *args, **kwargs):
+        if not self.has_view_permission():
+            raise PermissionDenied
+
+    @filter_hook
+    def get(self, request, *args, **kwargs):
+        version = self.get_change_version()
+        etag = f'"{hashlib.md5(version.encode("utf-8")).hexdigest()}"'
+        response = get_conditional_response(request, etag=etag) or self.render_to_response({'version': version})
+        response['ETag'] = etag
+        return response
+
+
+def ready(site):
+    """ 只为使用 'counter' 的 model 连接信号，其他 model 仍然可以使用 Django 的快速删除 """
+    for model, admin_class in site._registry.items():
+        if getattr(admin_class, 'refresh_version', None) == 'counter':
+            label = model._meta.label_lower
+            post_save.connect(bump_change_counter, sender=model, dispatch_uid=f'xadmin_change_counter_save_{label}')
+            post_delete.connect(bump_change_counter, sender=model, dispatch_uid=f'xadmin_change_counter_delete_{label}')
+
+
+site.register_plugin(RefreshPlugin, ListAdminView)
+site.register_modelview(path=r'^version/$', admin_view_class=RefreshVersionView, name='%s_%s_version')
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save
+from django.template.loader import render_to_string
+
+from xadmin.search import SEARCH_VAR, get_rank_field, get_search_backend_class
+from xadmin.sites import site
+from xadmin.views import BaseAdminPlugin, ListAdminView
+from xadmin.views.list import CURSOR_VAR
+
+
+def get_model_search_backend(model, admin_class=None):
+    """ 返回 model 的 admin 中 search_fields 配置的搜索后端，没有配置时返回 None """
+    admin_class = admin_class or site._registry.get(model)
+    search_fields = getattr(admin_class, 'search_fields', None)
+    if not search_fields:
+        return None
+    backend_class = get_search_backend_class(getattr(admin_class, 'search_backend', 'icontains'))
+    return backend_class(model, search_fields, getattr(admin_class, 'search_config', None))
+
+
+def update_search_index(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    backend = get_model_search_backend(sender)
+    if backend is not None:
+        backend.index_instance(instance, using)
+
+
+def remove_search_index(sender, instance, using=None, **kwargs):
+    backend = get_model_search_backend(sender)
+    if backend is not None:
+        backend.remove_instance(instance, using)
+
+
+class SearchPlugin(BaseAdminPlugin):
+    """
+    changelist 的搜索，search_fields 为搜索的字段，search_backend 为 xadmin.search.SEARCH_BACKENDS 中的名称
+    或 BaseSearchBackend 的子类。支持相关度的后端按相关度、主键排序，仍然使用 keyset 分页。
+    """
+
+    search_fields = ()
+    search_backend = 'icontains'
+    # PostgreSQL 全文搜索使用的 text search configuration
+    search_config = None
+
+    def init_request(self, *args, **kwargs):
+        if not self.search_fields:
+            return False
+        self.search_query = self.request.GET.get(SEARCH_VAR, '').strip()
+        self.backend = get_search_backend_class(self.search_backend)(
+            self.model, self.search_fields, self.search_config
+        )
+        return True
+
+    def get_list_queryset(self, queryset):
+        if not self.search_query:
+            return queryset
+        return self.backend.search(queryset, self.search_query)
+
+    def get_list_ordering(self, ordering):
+        if self.search_query and self.backend.ranked:
+            return [(get_rank_field(), True), (self.opts.pk, True)]
+        return ordering
+
+    def block_nav_form(self, context, nodes):
+        params = [
+            (name, value)
+            for name, values in self.request.GET.lists() if name not in (SEARCH_VAR, CURSOR_VAR)
+            for value in values
+        ]
+        return render_to_string('xadmin/blocks/model_list.nav_form.search_form.html', {
+            'search_var': SEARCH_VAR,
+            'search_query': self.search_query,
+            'search_params': params,
+            'search_name': self.opts.verbose_name,
+        })
+
+
+def ready(site):
+    """
+    只为使用需要维护索引的后端的 model 连接信号：有 post_delete 接收者的 model 不能使用 Django 的快速删除，
+    queryset.delete() 会逐行读取对象
+    """
+    for model, admin_class in site._registry.items():
+        backend = get_model_search_backend(model, admin_class)
+        if backend is not None and backend.index_signals:
+            label = model._meta.label_lower
+            post_save.connect(update_search_index, sender=model, dispatch_uid=f'xadmin_update_search_index_{label}')
+            post_delete.connect(remove_search_index, sender=model, dispatch_uid=f'xadmin_remove_search_index_{label}')
+
+
+site.register_plugin(SearchPlugin, ListAdminView)
@@ -0,0 +1,250 @@
+import operator
+from functools import reduce
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, models, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL, Value
+
+# 搜索的 url 参数
+SEARCH_VAR = '_q_'
+# 按相关度排序时 annotate 的名称，值越大越相关
+SEARCH_RANK = 'search_rank'
+
+
+def get_rank_field():
+    """ keyset 分页使用的相关度字段，attname 为 SEARCH_RANK，值从 annotate 的结果中读取 """
+    field = models.FloatField()
+    field.set_attributes_from_name(SEARCH_RANK)
+    return field
+
+
+def split_terms(query):
+    return [term for term in query.split() if term]
+
+
+class BaseSearchBackend:
+    """
+    changelist 的搜索。search 返回过滤后的 queryset，ranked 为 True 时还会 annotate 出 SEARCH_RANK，
+    changelist 按相关度、主键排序。
+    """
+
+    ranked = False
+    # 是否需要通过 post_save/post_delete 信号更新索引
+    index_signals = False
+
+    def __init__(self, model, search_fields, config=None):
+        self.model = model
+        self.opts = model._meta
+        self.search_fields = search_fields
+        self.config = config
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def create_index(self, using=None, rebuild=False):
+        """ 由 xadmin_search_index 命令调用，建立数据库中的索引 """
+
+    def index_instance(self, instance, using=None):
+        """ 对象保存后更新索引 """
+
+    def remove_instance(self, instance, using=None):
+        """ 对象删除后更新索引 """
+
+    def fallback_search(self, queryset, query):
+        """ 不能使用索引时（数据库不支持、索引还没有创建）使用 icontains 搜索，相关度都为 0，按主键排序 """
+        queryset = IcontainsSearchBackend(self.model, self.search_fields).search(queryset, query)
+        return queryset.annotate(**{SEARCH_RANK: Value(0.0, output_field=models.FloatField())})
+
+    def get_local_fields(self):
+        fields = []
+        for name in self.search_fields:
+            field = self.opts.get_field(name)
+            if not isinstance(field, (models.CharField, models.TextField)):
+                raise ImproperlyConfigured(
+                    f'The search field {name} of {self.opts.label} must be a CharField or TextField '
+                    f'of the model itself for the {self.__class__.__name__}'
+                )
+            fields.append(field)
+        return fields
+
+
+class IcontainsSearchBackend(BaseSearchBackend):
+    """ 每个词都要在某个字段中出现，使用 icontains，不需要索引，行数多时为全表扫描 """
+
+    def get_lookup(self, name):
+        if name.startswith('^'):
+            return f'{name[1:]}__istartswith'
+        if name.startswith('='):
+            return f'{name[1:]}__iexact'
+        return f'{name}__icontains'
+
+    def search(self, queryset, query):
+        lookups = [self.get_lookup(name) for name in self.search_fields]
+        for term in split_terms(query):
+            queryset = queryset.filter(reduce(operator.or_, [Q(**{lookup: term}) for lookup in lookups]))
+        if any('__' in lookup.rsplit('__', 1)[0] for lookup in lookups):
+            # 跨关系搜索时可能出现重复的行
+            queryset = queryset.distinct()
+        return queryset
+
+
+class SqliteFTSSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 全文索引。索引表为 ``<表名>_xadmin_fts``，rowid 为主键，由 xadmin_search_index 命令创建，
+    之后通过 post_save/post_delete 信号维护。bulk_create、queryset.update() 等不会发送信号，
+    之后需要用 ``xadmin_search_index --rebuild`` 重建。索引表不存在时使用 icontains 搜索。
+    按 bm25 排序。
+    """
+
+    ranked = True
+    index_signals = True
+    _existing_tables = set()
+
+    def get_table(self):
+        return f'{self.opts.db_table}_xadmin_fts'
+
+    def table_exists(self, using):
+        key = (using, self.get_table())
+        if key not in self._existing_tables:
+            with connections[using].cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.get_table()])
+                if cursor.fetchone() is None:
+                    return False
+            self._existing_tables.add(key)
+        return True
+
+    def to_match(self, query):
+        """ 每个词作为前缀匹配，引号避免输入被当作 FTS5 的查询语法 """
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in split_terms(query))
+
+    def search(self, queryset, query):
+        using = queryset.db
+        if connections[using].vendor != 'sqlite' or not self.table_exists(using):
+            return self.fallback_search(queryset, query)
+        match = self.to_match(query)
+        if not match:
+            return queryset
+
+        qn = connections[using].ops.quote_name
+        table = qn(self.get_table())
+        queryset = queryset.extra(
+            tables=[self.get_table()],
+            where=[f'{table}.rowid = {qn(self.opts.db_table)}.{qn(self.opts.pk.column)}', f'{table} MATCH %s'],
+            params=[match],
+        )
+        # bm25 越小越相关
+        return queryset.annotate(**{SEARCH_RANK: RawSQL(f'-bm25({table})', [], output_field=models.FloatField())})
+
+    def check_pk(self):
+        if not isinstance(self.opts.pk, (models.AutoField, models.IntegerField)):
+            raise ImproperlyConfigured(f'{self.__class__.__name__} requires an integer primary key on {self.opts.label}')
+
+    def create_index(self, using=None, rebuild=False):
+        self.check_pk()
+        using = using or router.db_for_write(self.model)
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            return
+        qn = connection.ops.quote_name
+        table = qn(self.get_table())
+        columns = [qn(field.column) for field in self.get_local_fields()]
+        with connection.cursor() as cursor:
+            if rebuild:
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({", ".join(columns)})')
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table}(rowid, {", ".join(columns)}) '
+                f'SELECT {qn(self.opts.pk.column)}, {", ".join(columns)} FROM {qn(self.opts.db_table)}'
+            )
+        self._existing_tables.add((using, self.get_table()))
+
+    def index_instance(self, instance, using=None):
+        using = using or router.db_for_write(self.model)
+        if connections[using].vendor != 'sqlite' or not self.table_exists(using):
+            return
+        qn = connections[using].ops.quote_name
+        fields = self.get_local_fields()
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {qn(self.get_table())} WHERE rowid = %s', [instance.pk])
+            cursor.execute(
+                f'INSERT INTO {qn(self.get_table())}(rowid, {", ".join(qn(f.column) for f in fields)}) '
+                f'VALUES (%s, {", ".join(["%s"] * len(fields))})',
+                [instance.pk] + [field.value_from_object(instance) for field in fields]
+            )
+
+    def remove_instance(self, instance, using=None):
+        using = using or router.db_for_write(self.model)
+        if connections[using].vendor != 'sqlite' or not self.table_exists(using):
+            return
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connections[using].ops.quote_name(self.get_table())} WHERE rowid = %s', [instance.pk]
+            )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL 全文搜索，``to_tsvector(config, 字段...)`` 的 GIN 表达式索引由 xadmin_search_index 命令创建，
+    查询使用相同的表达式，因此可以使用索引。按 ts_rank 排序，config 默认为 'simple'。
+    """
+
+    ranked = True
+    search_type = 'plain'
+
+    def get_config(self):
+        return self.config or 'simple'
+
+    def get_vector(self):
+        from django.contrib.postgres.search import SearchVector
+
+        return SearchVector(*[field.name for field in self.get_local_fields()], config=self.get_config())
+
+    def search(self, queryset, query):
+        if connections[queryset.db].vendor != 'postgresql':
+            return self.fallback_search(queryset, query)
+        # 需要 psycopg2，只在 PostgreSQL 上导入
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        if not split_terms(query):
+            return queryset
+        search_query = SearchQuery(query, config=self.get_config(), search_type=self.search_type)
+        return queryset.annotate(search_vector=self.get_vector()).filter(search_vector=search_query).annotate(
+            **{SEARCH_RANK: SearchRank(models.F('search_vector'), search_query)}
+        )
+
+    def get_index_name(self):
+        return f'{self.opts.db_table}_xadmin_search'[:63]
+
+    def create_index(self, using=None, rebuild=False):
+        using = using or router.db_for_write(self.model)
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            return
+        qn = connection.ops.quote_name
+        # 与 SearchVector 生成的 sql 相同：to_tsvector(config, COALESCE(a, '') || ' ' || COALESCE(b, ''))
+        expression = " || ' ' || ".join(f"COALESCE({qn(field.column)}, '')" for field in self.get_local_fields())
+        with connection.cursor() as cursor:
+            if rebuild:
+                cursor.execute(f'DROP INDEX IF EXISTS {qn(self.get_index_name())}')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(self.get_index_name())} ON {qn(self.opts.db_table)} '
+                f'USING GIN (to_tsvector(%s::regconfig, {expression}))',
+                [self.get_config()]
+            )
+
+
+SEARCH_BACKENDS = {
+    'icontains': IcontainsSearchBackend,
+    'sqlite_fts': SqliteFTSSearchBackend,
+    'postgres': PostgresSearchBackend,
+}
+
+
+def get_search_backend_class(backend):
+    if isinstance(backend, type) and issubclass(backend, BaseSearchBackend):
+        return backend
+    if backend not in SEARCH_BACKENDS:
+        raise ImproperlyConfigured(f"The search backend {backend} isn't one of {', '.join(SEARCH_BACKENDS)}")
+    return SEARCH_BACKENDS[backend]
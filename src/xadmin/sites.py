@@ -1,6 +1,8 @@
 import copy
 import inspect
+from collections import OrderedDict
 from functools import update_wrapper
+from weakref import WeakKeyDictionary
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -17,6 +19,18 @@ class NotRegistered(Exception):
     pass
 
 
+def freeze_value(value):
+    """ 把 list、dict、set 等转换为可 hash 的形式，用于 get_view_class 的缓存 key，无法转换时抛出 TypeError """
+    if isinstance(value, dict):
+        return dict, frozenset((freeze_value(k), freeze_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(freeze_value(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(freeze_value(v) for v in value)
+    hash(value)
+    return value
+
+
 class MergeAdminMetaclass(type):
     def __new__(mcs, name, bases, attrs):
         return type.__new__(mcs, str(name), bases, attrs)
@@ -27,6 +41,10 @@ class AdminSite:
         self.name = name
         self.app_name = 'xadmin'
         self.login_view = None
+        # filter_hook 插件方法链的执行方式，可选 'recursive' 或 'iterative'
+        self.filter_executor = 'recursive'
+        # 插件的创建方式，'eager' 在 view 初始化时创建全部插件，'lazy' 在第一次用到时才创建
+        self.plugin_activation = 'eager'
 
         self._registry = {}  # model_class class -> admin_class class
         self._registry_avs = {}  # admin_view_class class -> admin_class class
@@ -36,8 +54,22 @@ class AdminSite:
         # url instance contains (path, admin_view class, name)
         self._registry_modelviews = []
         self._registry_plugins = {}  # view_class class -> plugin_class class
-
-        self._admin_view_cache = {}
+        self._registry_actions = {}  # action_name -> 所有 model 的 changelist 都可用的 action 类
+        # plugin_class class -> 插件提供的 hook 及 block_* 方法名，合并后的插件类随 view 类淘汰，这里只持有弱引用
+        self._plugin_hooks = WeakKeyDictionary()
+
+        # (admin_view class, option class, opts) -> 合并后的 view 类，按最近使用排序
+        self._admin_view_cache = OrderedDict()
+        self._admin_view_cache_version = None
+        # 合并后 view 类的缓存数量上限，None 为不限制，超出后淘汰最久未使用的
+        self.view_class_cache_size = getattr(settings, 'XADMIN_VIEW_CLASS_CACHE_SIZE', None)
+        self.view_class_cache_hits = 0
+        self.view_class_cache_misses = 0
+        # 注册信息每次变化都会递增，用于让菜单等缓存失效
+        self.registry_version = 0
+        # language -> (不可变的菜单骨架, url 前缀索引, 骨架内容的摘要)，只对应 _menu_skeletons_version 时的注册信息
+        self._menu_skeletons = {}
+        self._menu_skeletons_version = None
 
         self.model_admins_order = 0
 
@@ -49,6 +81,7 @@ class AdminSite:
             'settings': copy.copy(self._registry_settings),
             'modelviews': copy.copy(self._registry_modelviews),
             'plugins': copy.copy(self._registry_plugins),
+            'actions': copy.copy(self._registry_actions),
         }
 
     def restore_registry(self, data):
@@ -58,30 +91,56 @@ class AdminSite:
         self._registry_settings = data['settings']
         self._registry_modelviews = data['modelviews']
         self._registry_plugins = data['plugins']
+        self._registry_actions = data['actions']
+        self.registry_version += 1
 
     def register_modelview(self, path, admin_view_class, name):
         from xadmin.views import BaseAdminView
 
         if issubclass(admin_view_class, BaseAdminView):
             self._registry_modelviews.append((path, admin_view_class, name))
+            self.registry_version += 1
         else:
             raise ImproperlyConfigured(f"The registered view class {admin_view_class.__name__} "
                                        f"isn't subclass of {BaseAdminView.__name__}")
 
     def registry_view(self, path, admin_view_class, name):
         self._registry_views.append((path, admin_view_class, name))
+        self.registry_version += 1
 
     def register_plugin(self, plugin_class, admin_view_class):
         from xadmin.views import BaseAdminPlugin
 
         if issubclass(plugin_class, BaseAdminPlugin):
             self._registry_plugins.setdefault(admin_view_class, []).append(plugin_class)
+            self.registry_version += 1
         else:
             raise ImproperlyConfigured(f"The registered plugin class {plugin_class.__name__} "
                                        f"isn't subclass of {BaseAdminPlugin.__name__}")
 
+    def register_action(self, action_class):
+        """ 注册全局的 action，admin 设置了 global_actions 时以 global_actions 为准 """
+        from xadmin.plugins.actions import BaseActionView
+
+        if issubclass(action_class, BaseActionView):
+            self._registry_actions[action_class.action_name] = action_class
+            self.registry_version += 1
+        else:
+            raise ImproperlyConfigured(f"The registered action class {action_class.__name__} "
+                                       f"isn't subclass of {BaseActionView.__name__}")
+
+    def unregister_action(self, action_name):
+        if action_name not in self._registry_actions:
+            raise NotRegistered(f'The action {action_name} is not registered')
+        del self._registry_actions[action_name]
+        self.registry_version += 1
+
+    def get_actions(self):
+        return list(self._registry_actions.values())
+
     def register_settings(self, name, admin_class):
         self._registry_settings[name.lower()] = admin_class
+        self.registry_version += 1
 
     def register(self, model_or_iterable, admin_class=None, **options):
         from xadmin.views.base import BaseAdminView
@@ -118,6 +177,7 @@ class AdminSite:
                 admin_class.order = self.model_admins_order
                 self.model_admins_order += 1
                 self._registry[model] = admin_class
+                self.registry_version += 1
             else:
                 if model in self._registry_avs:
                     raise ImproperlyConfigured(f'The admin_view_class {model.__name__} is already registered')
@@ -128,6 +188,7 @@ class AdminSite:
 
                 # Instantiate the admin class to save in the registry
                 self._registry_avs[model] = admin_class
+                self.registry_version += 1
 
     def unregister(self, model_or_iterable):
         """
@@ -145,14 +206,29 @@ class AdminSite:
                 if model not in self._registry:
                     raise NotRegistered(f'The model {model.__name__} is not registered')
                 del self._registry[model]
+                self.registry_version += 1
             else:
                 if model not in self._registry_avs:
                     raise NotRegistered(f'The admin_view_class {model.__name__} is not registered')
                 del self._registry_avs[model]
+                self.registry_version += 1
 
     def set_login_view(self, login_view):
         self.login_view = login_view
 
+    def set_filter_executor(self, executor):
+        from xadmin.views.base import FILTER_EXECUTORS
+
+        if executor not in FILTER_EXECUTORS:
+            raise ImproperlyConfigured(f"The filter executor {executor} isn't one of "
+                                       f"{', '.join(FILTER_EXECUTORS)}")
+        self.filter_executor = executor
+
+    def set_plugin_activation(self, activation):
+        if activation not in ('eager', 'lazy'):
+            raise ImproperlyConfigured(f"The plugin activation {activation} isn't one of eager, lazy")
+        self.plugin_activation = activation
+
     def has_permission(self, request):
         """
         Return True if the given HttpRequest has permission to view
@@ -275,29 +351,105 @@ class AdminSite:
                 merge_opts.extend(opts)
                 ps = self._registry_plugins.get(klass, [])
                 plugins.extend(map(self._create_plugin(merge_opts), ps) if merge_opts else ps)
+        for plugin_class in plugins:
+            self.get_plugin_hooks(plugin_class)
         return plugins
 
+    def get_plugin_hooks(self, plugin_class):
+        """ 返回插件类提供的 hook 及 block_* 方法名，即 BaseAdminPlugin 之外定义的公开方法 """
+        from xadmin.views import BaseAdminPlugin
+
+        hooks = self._plugin_hooks.get(plugin_class)
+        if hooks is None:
+            hooks = self._plugin_hooks[plugin_class] = frozenset(
+                name for name in dir(plugin_class)
+                if name[0] != '_' and callable(getattr(plugin_class, name))
+                and getattr(plugin_class, name) is not getattr(BaseAdminPlugin, name, None)
+            )
+        return hooks
+
+    def _get_menu_entry(self, admin_view):
+        from django.utils.translation import get_language
+        from xadmin.util import freeze_menu, menu_digest, MenuIndex
+
+        if self._menu_skeletons_version != self.registry_version:
+            self._menu_skeletons = {}
+            self._menu_skeletons_version = self.registry_version
+
+        language = get_language()
+        entry = self._menu_skeletons.get(language)
+        if entry is None:
+            skeleton = freeze_menu(admin_view.get_nav_menu())
+            entry = self._menu_skeletons[language] = (skeleton, MenuIndex(skeleton), menu_digest(skeleton))
+        return entry
+
+    def get_menu_skeleton(self, admin_view):
+        """
+        返回与请求无关的菜单骨架（标题、url、icon、所需权限及排序），按 (site, registry_version, 语言) 只构建一次，
+        所有 view 共用，注册信息变化后重新构建。菜单的设置（get_site_menu、apps_icons 等）
+        应注册在 CommAdminView 上，对整个 site 生效。
+        """
+        return self._get_menu_entry(admin_view)[0]
+
+    def get_menu_index(self, admin_view):
+        """ 返回菜单骨架的 url 前缀索引 """
+        return self._get_menu_entry(admin_view)[1]
+
+    def get_menu_digest(self, admin_view):
+        """ 返回菜单骨架内容的摘要，每次构建骨架时计算一次 """
+        return self._get_menu_entry(admin_view)[2]
+
     def get_view_class(self, admin_view_class, option_class=None, **opts):
         """ 创建继承自 view 类, admin 类, plugin 类的子类 """
+        if self._admin_view_cache_version != self.registry_version:
+            # 注册信息变化后，已合并的类可能缺少新注册的插件或设置
+            self._admin_view_cache.clear()
+            self._admin_view_cache_version = self.registry_version
+
+        try:
+            key = (admin_view_class, option_class, freeze_value(opts))
+        except TypeError:
+            # opts 中有不能 hash 的值时不缓存
+            key = None
+        view_class = self._admin_view_cache.get(key) if key is not None else None
+        if view_class is not None:
+            self.view_class_cache_hits += 1
+            self._admin_view_cache.move_to_end(key)
+            return view_class
+
+        self.view_class_cache_misses += 1
         merges = [option_class] if option_class else []
         for klass in admin_view_class.mro():
             admin_class = self._registry_avs.get(klass)
             if admin_class:
                 merges.append(admin_class)
-            settings_class = self._get_settings_class(admin_view_class)
+            settings_class = self._get_settings_class(klass)
             if settings_class:
-                merges.append(admin_class)
+                merges.append(settings_class)
             merges.append(klass)
 
-        new_class_name = ''.join(c.__name__ for c in merges)
-        if new_class_name not in self._admin_view_cache:
-            plugins = self.get_plugins(admin_view_class, option_class)
-            self._admin_view_cache[new_class_name] = MergeAdminMetaclass(
-                new_class_name,
-                tuple(merges),
-                dict({'plugin_classes': plugins, 'admin_site': self}, **opts),
-            )
-        return self._admin_view_cache[new_class_name]
+        plugins = self.get_plugins(admin_view_class, option_class)
+        view_class = MergeAdminMetaclass(
+            ''.join(c.__name__ for c in merges),
+            tuple(merges),
+            dict({'plugin_classes': plugins, 'admin_site': self}, **opts),
+        )
+        if key is None:
+            return view_class
+        self._admin_view_cache[key] = view_class
+        if self.view_class_cache_size is not None:
+            while len(self._admin_view_cache) > self.view_class_cache_size:
+                self._admin_view_cache.popitem(last=False)
+        return view_class
+
+    def view_class_cache_info(self):
+        """ 返回合并 view 类缓存的命中次数、未命中次数、当前数量及数量上限 """
+        return {
+            'hits': self.view_class_cache_hits,
+            'misses': self.view_class_cache_misses,
+            'size': len(self._admin_view_cache),
+            'maxsize': self.view_class_cache_size,
+        }
 
     def create_admin_view(self, admin_view_class):
         return self.get_view_class(admin_view_class).as_view()
@@ -321,7 +473,13 @@ class AdminSite:
 
         # Admin-site-wide views.
         urlpatterns = [
-            path('jsi18n/', wrap(self.i18n_javascript, cacheable=True), name='jsi18n')
+            path('jsi18n/', wrap(self.i18n_javascript, cacheable=True), name='jsi18n'),
+            path(
+                'widget/<str:page>/<str:widget_id>/',
+                wrap(self.dashboard_widget, cacheable=True),
+                name='dashboard_widget',
+            ),
+            path('changes/', wrap(self.change_feed), name='change_feed'),
         ]
 
         # Register admin views
@@ -355,6 +513,37 @@ class AdminSite:
     def urls(self):
         return self.get_urls(), self.name, self.app_name
 
+    def dashboard_widget(self, request, page, widget_id):
+        """ 延迟加载的 dashboard widget，page 为 dashboard 通过 registry_view 注册时的 name """
+        from django.http import Http404, HttpResponseNotAllowed
+        from xadmin.views.dashboard import Dashboard
+
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        for _path, view_class, name in self._registry_views:
+            if name == page and inspect.isclass(view_class) and issubclass(view_class, Dashboard):
+                return self.get_view_class(view_class)(request).widget_response(widget_id)
+        raise Http404
+
+    def change_feed(self, request):
+        """ change feed 由 asgi_application 包装后的 ASGI 应用处理，请求到达这里说明没有使用它 """
+        from django.http import HttpResponse
+
+        return HttpResponse(
+            'The change feed requires the ASGI application returned by AdminSite.asgi_application().',
+            status=501, content_type='text/plain',
+        )
+
+    def asgi_application(self, application):
+        """
+        包装 Django 的 ASGI application，在其中处理 change feed 的 SSE 长连接，例如 asgi.py 中::
+
+            application = xadmin.site.asgi_application(get_asgi_application())
+        """
+        from xadmin.changefeed import ChangeFeedApplication
+
+        return ChangeFeedApplication(self, application)
+
     def i18n_javascript(self, request, extra_context=None):
         """
         Display the i18n JavaScript that the Django admin requires.
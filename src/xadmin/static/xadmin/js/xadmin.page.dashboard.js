@@ -75,4 +75,42 @@ jQuery(function() {
   $('.btn-quick-form').on('post-success', function(e){
     window.location.reload();
   });
+
+  // 延迟加载的 widget：进入可视区域后才请求内容，多个 widget 的请求并行发出
+  var load_widget = function(el){
+    var placeholder = $(el);
+    $.ajax({
+      url: placeholder.data('widget-url'),
+      dataType: 'html',
+      success: function(html){
+        var widget = $(html);
+        placeholder.replaceWith(widget);
+        widget.find('.exform').exform();
+        if($.fn.sortable && $('.column').data('ui-sortable')){
+          $('.column').sortable('refresh');
+        }
+        widget.trigger('widget-loaded');
+      },
+      error: function(){
+        placeholder.find('.widget-skeleton').replaceWith(
+          '<p class="text-danger">' + gettext('Failed to load the widget.') + '</p>');
+      }
+    });
+  };
+  var deferred_widgets = $('.widget-deferred');
+  if(deferred_widgets.length){
+    if('IntersectionObserver' in window){
+      var observer = new IntersectionObserver(function(entries){
+        $.each(entries, function(i, entry){
+          if(entry.isIntersecting){
+            observer.unobserve(entry.target);
+            load_widget(entry.target);
+          }
+        });
+      }, {rootMargin: '200px'});
+      deferred_widgets.each(function(){ observer.observe(this); });
+    } else {
+      deferred_widgets.each(function(){ load_widget(this); });
+    }
+  }
 });
\ No newline at end of file
@@ -112,7 +112,45 @@
       $('#changelist-form').submit();
     }
 
+    // 分批执行的操作：循环提交，每次从上一次返回的 cursor 继续，直到全部处理完成
+    $.fn.actionProgress = function() {
+        return this.each(function() {
+            var $form = $(this),
+                total = parseInt($form.data('total')) || 0,
+                processed = 0,
+                $bar = $form.find('.progress-bar');
+
+            var step = function(cursor) {
+                $.ajax({
+                    type: 'POST',
+                    url: $form.attr('action'),
+                    dataType: 'json',
+                    data: $form.serialize() + '&' + $.param({_action_cursor: cursor, _action_processed: processed}),
+                    beforeSend: function(xhr, settings) {
+                        xhr.setRequestHeader("X-CSRFToken", $.getCookie('csrftoken'));
+                    },
+                    success: function(data) {
+                        processed += data['processed'];
+                        var percent = total ? Math.min(100, Math.round(processed * 100 / total)) : 100;
+                        $bar.css('width', percent + '%').text(percent + '%');
+                        if (data['result'] == 'progress') {
+                            step(data['cursor']);
+                        } else {
+                            window.location.href = data['redirect'];
+                        }
+                    },
+                    error: function(xhr) {
+                        $bar.removeClass('active');
+                        $form.find('.action-progress-error').text(xhr.responseText || xhr.statusText).show();
+                    }
+                });
+            };
+            step('');
+        });
+    }
+
     $(document).ready(function($) {
         $(".results input.action-select").actions();
+        $("form.action-progress").actionProgress();
     });
 })(jQuery);
@@ -0,0 +1,39 @@
+(function($) {
+
+  // 订阅 change feed，model 变化后合并 debounce 毫秒内的事件，只重新加载列表部分
+  $(function(){
+    var feed_el = $('#change_feed');
+    if(!feed_el.length || !window.EventSource){
+      return;
+    }
+    var timer = null;
+    var reload = function(){
+      timer = null;
+      var list = $('#changelist-form');
+      if(!list.length){
+        window.location.reload();
+        return;
+      }
+      list.load(window.location.href + ' #changelist-form > *', function(){
+        list.trigger('refreshed');
+      });
+    };
+    var source = new EventSource(feed_el.data('url'));
+    source.onopen = function(){
+      feed_el.removeClass('disabled');
+    };
+    source.onerror = function(){
+      // 浏览器会按服务端的 retry 自动重连
+      feed_el.addClass('disabled');
+    };
+    source.addEventListener('change', function(){
+      if(timer === null){
+        timer = setTimeout(reload, parseInt(feed_el.data('debounce')) || 500);
+      }
+    });
+    $(window).on('beforeunload', function(){
+      source.close();
+    });
+  });
+
+})(jQuery);
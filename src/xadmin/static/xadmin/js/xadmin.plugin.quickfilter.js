@@ -36,6 +36,50 @@
 	  }
   });
   
+  // 高基数的分面：输入时从服务端分页搜索
+  function renderFacetChoices($search, data, append){
+	if (!append) {
+		$search.nextUntil('li.nav-header').filter('.facet-result').remove();
+	}
+	$search.nextUntil('li.nav-header').filter('.facet-more').remove();
+	var $last = $search.nextUntil('li.nav-header').last();
+	if (!$last.length) $last = $search;
+	var items = $.map(data['choices'], function(choice){
+		var $a = $('<a class="small filter-item"></a>').attr('href', choice['url'])
+			.append($('<input class="filter-col-1" type="checkbox">').prop('checked', choice['selected']))
+			.append($('<span class="filter-col-2"></span>').text(choice['label'] + ' ')
+				.append($('<span class="badge"></span>').text(choice['count'])));
+		$a.find('input').click(function(){ window.location.href = choice['url']; });
+		return $('<li class="filter-multiselect facet-result"></li>').append($a)[0];
+	});
+	if (data['has_more']) {
+		items.push($('<li class="facet-result facet-more"><a class="small filter-item" href="#">' + gettext('Show more') + '</a></li>')
+			.click(function(e){
+				e.preventDefault();
+				e.stopPropagation();
+				searchFacet($search, data['page'] + 1);
+			})[0]);
+	}
+	$last.after(items);
+  }
+
+  function searchFacet($search, page){
+	$.getJSON($search.data('facet-url'), {_facet_q: $search.find('input').val(), _facet_page: page}, function(data){
+		renderFacetChoices($search, data, page > 1);
+	});
+  }
+
+  $('.nav-quickfilter li.facet-search').each(function(){
+	var $search = $(this), timer = null;
+	$search.find('input').on('input', function(){
+		clearTimeout(timer);
+		timer = setTimeout(function(){ searchFacet($search, 1); }, 300);
+	}).on('keydown', function(e){
+		if (e.keyCode == 13) e.preventDefault();
+	});
+	searchFacet($search, 1);
+  });
+
   $('.nav-quickfilter li.nav-header').on('click',function(e) {
 	  e.preventDefault();
 	  e.stopPropagation();
@@ -1,11 +1,50 @@
 (function($) {
 
+  // 倒计时结束后只请求 model 的变更版本，版本变化时才刷新页面或列表
+  var restart = function(){
+    var refresh_el = $('#refresh_time');
+    refresh_el.text(refresh_el.data('interval'));
+    setTimeout("$.dofresh()",1000)
+  };
+
+  var changed = function(version){
+    var refresh_el = $('#refresh_time');
+    var list = $('#changelist-form');
+    if(refresh_el.data('mode') == 'fragment' && list.length){
+      list.load(window.location.href + ' #changelist-form > *', function(){
+        refresh_el.data('version', version);
+        list.trigger('refreshed');
+        restart();
+      });
+    } else {
+      window.location.reload();
+    }
+  };
+
   $.dofresh = function(){
     var refresh_el = $('#refresh_time');
     var time = parseInt(refresh_el.text());
     if(time == 1){
       refresh_el.text(0);
-      window.location.reload();
+      var url = refresh_el.data('version-url');
+      if(!url){
+        window.location.reload();
+        return;
+      }
+      $.ajax({
+        url: url,
+        dataType: 'json',
+        // 由 jQuery 带上上次的 ETag，没有变化时返回 304
+        ifModified: true,
+        success: function(data, status){
+          if(status != 'notmodified' && data && String(data.version) != String(refresh_el.data('version'))){
+            changed(data.version);
+          } else {
+            restart();
+          }
+        },
+        error: restart
+      });
     } else {
       refresh_el.text(time-1);
       setTimeout("$.dofresh()",1000)
@@ -14,9 +53,9 @@
 
   $(function(){
     var refresh_el = $('#refresh_time');
-    if(refresh_el){
+    if(refresh_el.length){
       setTimeout("$.dofresh()",1000)
     }
   });
 
-})(jQuery);
\ No newline at end of file
+})(jQuery);
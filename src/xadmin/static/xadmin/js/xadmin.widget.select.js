@@ -6,28 +6,30 @@
         f.find('.select-search').each(function(){
             var $el = $(this);
             var preload = $el.hasClass('select-preload');
+            var url = $el.data('search-url');
             $el.selectize({
                 valueField: 'id',
-                labelField: '__str__',
-                searchField: '__str__',
+                labelField: 'text',
+                searchField: 'text',
                 create: false,
-                maxItems: 1,
+                maxItems: $el.is('[multiple]') ? null : 1,
                 preload: preload,
+                // 结果已由服务端搜索和排序，不再在本地过滤
+                score: function(){ return function(){ return 1; }; },
                 load: function(query, callback) {
                     if(!preload && !query.length) return callback();
                     $.ajax({
-                        url: $el.data('search-url')+$el.data('choices'),
+                        url: url,
                         dataType: 'json',
                         data: {
-                            '_q_' : query,
-                            '_cols': 'id.__str__'
+                            '_q_' : query
                         },
                         type: 'GET',
                         error: function() {
                             callback();
                         },
                         success: function(res) {
-                            callback(res.objects);
+                            callback(res.results);
                         }
                     });
                 }
@@ -35,4 +37,3 @@
         })
     }});
 })(jQuery)
-
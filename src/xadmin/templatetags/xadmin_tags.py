@@ -15,7 +15,7 @@ def view_block(context, block_name, *args, **kwargs):
     nodes = []
     method_name = f'block_{block_name}'
 
-    for view in [admin_view] + admin_view.plugins:
+    for view in [admin_view] + admin_view.get_hook_plugins(method_name):
         if hasattr(view, method_name) and callable(getattr(view, method_name)):
             block_func = getattr(view, method_name)
             result = block_func(context, nodes, *args, **kwargs)
@@ -0,0 +1,138 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+# 请求上缓存当前用户设置的属性名
+REQUEST_CACHE_ATTR = '_xadmin_user_settings'
+
+
+class UserSettingsStore:
+    """
+    用户设置的读写。
+
+    读取：每个请求第一次读取时用一条查询加载当前用户的所有设置，缓存在 request 上。
+    写入：先放入进程内的待写缓冲，同一用户同一 key 的多次保存只保留最后的值。每个 (用户, key) 单独计时：
+    连续 delay 秒没有新的保存后写入，持续保存（例如拖动面板）时从第一次保存起最多等待 max_delay 秒，
+    其他用户或其他 key 的保存不会推迟它的写入。一个后台定时器在最早到期的时间执行一次 upsert。
+    读取时会合并本进程中尚未写入的值；多进程部署时其他进程最多在 max_delay 秒后读到新值。delay 为 0 时同步写入。
+    """
+
+    def __init__(self, delay=None, max_delay=None):
+        self.delay = getattr(settings, 'XADMIN_USER_SETTINGS_DELAY', 1) if delay is None else delay
+        self.max_delay = getattr(settings, 'XADMIN_USER_SETTINGS_MAX_DELAY', 10) if max_delay is None else max_delay
+        # (user_id, key) -> (value, 第一次尚未写入的保存的时间, 写入的时间)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        # _timer 到期的时间
+        self._timer_deadline = None
+
+    def load(self, user):
+        from xadmin.models import UserSettings
+
+        values = dict(UserSettings.objects.filter(user_id=user.pk).values_list('key', 'value'))
+        with self._lock:
+            values.update(
+                (key, entry[0]) for (user_id, key), entry in self._pending.items() if user_id == user.pk
+            )
+        return values
+
+    def get_all(self, request):
+        """ 返回 {key: value}，每个请求只查询一次 """
+        values = getattr(request, REQUEST_CACHE_ATTR, None)
+        if values is None:
+            user = request.user
+            values = self.load(user) if user.is_authenticated else {}
+            setattr(request, REQUEST_CACHE_ATTR, values)
+        return values
+
+    def get(self, request, key, default=None):
+        return self.get_all(request).get(key, default)
+
+    def set(self, request, key, value):
+        self.get_all(request)[key] = value
+        if self.delay <= 0:
+            self.write(request.user.pk, key, value)
+            return
+        with self._lock:
+            now = time.monotonic()
+            entry = self._pending.get((request.user.pk, key))
+            since = now if entry is None else entry[1]
+            self._pending[(request.user.pk, key)] = (value, since, min(now + self.delay, since + self.max_delay))
+            self._schedule(now)
+
+    def _schedule(self, now):
+        """ 在持有 _lock 时调用，保证定时器不晚于最早到期的写入；提前触发的定时器会重新计时 """
+        if not self._pending:
+            return
+        deadline = min(entry[2] for entry in self._pending.values())
+        if self._timer is not None:
+            if self._timer_deadline <= deadline:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(max(deadline - now, 0), self._flush_in_thread)
+        self._timer.daemon = True
+        self._timer_deadline = deadline
+        self._timer.start()
+
+    def write(self, user_id, key, value):
+        """ upsert：先 UPDATE，没有更新到行时 INSERT，并发插入冲突时再 UPDATE 一次 """
+        from xadmin.models import UserSettings
+
+        queryset = UserSettings.objects.filter(user_id=user_id, key=key)
+        if queryset.update(value=value):
+            return
+        try:
+            with transaction.atomic():
+                UserSettings.objects.create(user_id=user_id, key=key, value=value)
+        except IntegrityError:
+            queryset.update(value=value)
+
+    def flush(self):
+        """ 写入所有待写的设置 """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_deadline = None
+        for (user_id, key), entry in pending.items():
+            self.write(user_id, key, entry[0])
+
+    def flush_due(self):
+        """ 写入已到期的设置，还有待写的设置时重新计时 """
+        with self._lock:
+            now = time.monotonic()
+            due = {item: entry for item, entry in self._pending.items() if entry[2] <= now}
+            for item in due:
+                del self._pending[item]
+            if self._timer is threading.current_thread():
+                self._timer = self._timer_deadline = None
+            self._schedule(now)
+        for (user_id, key), entry in due.items():
+            self.write(user_id, key, entry[0])
+
+    def _flush_in_thread(self):
+        try:
+            self.flush_due()
+        finally:
+            # 后台线程中的数据库连接不会被请求结束时的信号关闭
+            connection.close()
+
+
+store = UserSettingsStore()
+atexit.register(store.flush)
+
+
+def get_user_settings(request):
+    return store.get_all(request)
+
+
+def get_user_setting(request, key, default=None):
+    return store.get(request, key, default)
+
+
+def save_user_setting(request, key, value):
+    store.set(request, key, value)
@@ -1,17 +1,35 @@
+import hashlib
+import json
+from types import MappingProxyType
+
 from django.conf import settings
 from django.forms import Media
 from django.templatetags.static import static
 from django.utils.translation import get_language
 
 
-def xstatic(*tags):
+# (tags, language, mode) -> 解析后的静态文件 url，进程内共享
+_xstatic_cache = {}
+# (tags, language, mode) -> forms.Media
+_vendor_cache = {}
+# xadmin_bundle 命令生成的 manifest，vendor tags -> 合并后的 css/js 文件
+BUNDLE_MANIFEST = 'xadmin/bundles/manifest.json'
+_bundle_manifest = None
+
+
+def get_static_mode():
+    if settings.DEBUG:
+        return 'dev'
+    return getattr(settings, 'STATIC_USE_CDN', False) and 'cdn' or 'production'
+
+
+def resolve_files(tags, lang, mode):
+    """ 返回 tags 对应的静态文件路径（相对 STATIC_URL）或 http 地址 """
     from .vendors import vendors
-    node = vendors
 
     fs = []
-    lang = get_language()
-
     for tag in tags:
+        node = vendors
         try:
             for p in tag.split('.'):
                 node = node[p]
@@ -28,33 +46,111 @@ def xstatic(*tags):
         if isinstance(node, str):
             files = node
         else:
-            mode = 'dev'
-            if not settings.DEBUG:
-                mode = getattr(settings, 'STATIC_USE_CDN', False) and 'cdn' or 'production'
-
-            if mode == 'cdn' and mode not in node:
-                mode = 'production'
-            if mode == 'production' and mode not in node:
-                mode = 'dev'
-            files = node[mode]
+            node_mode = mode
+            if node_mode == 'cdn' and node_mode not in node:
+                node_mode = 'production'
+            if node_mode == 'production' and node_mode not in node:
+                node_mode = 'dev'
+            files = node[node_mode]
 
         files = type(files) in (list, tuple) and files or [files, ]
         fs.extend([f % {'lang': lang.replace('_', '-')} for f in files])
+    return fs
+
+
+def _resolve_static(tags, lang, mode):
+    return tuple(f.startswith('http://') and f or static(f) for f in resolve_files(tags, lang, mode))
 
-    return [f.startswith('http://') and f or static(f) for f in fs]
+
+def xstatic(*tags):
+    key = (tags, get_language(), get_static_mode())
+    files = _xstatic_cache.get(key)
+    if files is None:
+        files = _xstatic_cache[key] = _resolve_static(*key)
+    return list(files)
+
+
+def get_bundle_manifest():
+    """ 读取 xadmin_bundle 命令生成的 manifest，没有生成时返回空 dict """
+    global _bundle_manifest
+    if _bundle_manifest is None:
+        from django.contrib.staticfiles import finders
+
+        path = finders.find(BUNDLE_MANIFEST)
+        if path:
+            with open(path, encoding='utf-8') as f:
+                _bundle_manifest = json.load(f)
+        else:
+            _bundle_manifest = {}
+    return _bundle_manifest
+
+
+def get_bundle_key(tags):
+    return ' '.join(tags)
 
 
 def vendor(*tags):
-    css = {'screen': []}
-    js = []
-    for tag in tags:
-        file_type = tag.split('.')[-1]
-        files = xstatic(tag)
-        if file_type == 'js':
-            js.extend(files)
-        elif file_type == 'css':
-            css['screen'] += files
-    return Media(css=css, js=js)
+    key = (tags, get_language(), get_static_mode())
+    media = _vendor_cache.get(key)
+    if media is None:
+        css = {'screen': []}
+        js = []
+        # 开启 XADMIN_STATIC_BUNDLE 后非 DEBUG 模式下使用合并后的文件
+        bundle = None
+        if key[2] != 'dev' and getattr(settings, 'XADMIN_STATIC_BUNDLE', False):
+            bundle = get_bundle_manifest().get(get_bundle_key(tags))
+        if bundle:
+            if 'css' in bundle:
+                css['screen'].append(static(bundle['css']))
+            if 'js' in bundle:
+                js.append(static(bundle['js']))
+            tags = ()
+        for tag in tags:
+            file_type = tag.split('.')[-1]
+            files = xstatic(tag)
+            if file_type == 'js':
+                js.extend(files)
+            elif file_type == 'css':
+                css['screen'] += files
+        media = _vendor_cache[key] = Media(css=css, js=js)
+    return media
+
+
+class MediaCollector:
+    """
+    在 get_media 插件链中收集 Media，最后由 merge 一次性合并，避免每次 ``Media + Media`` 都合并 css/js 列表。
+    ``+`` 返回新的 collector，只复制 Media 的引用列表，不修改左侧的 collector；``+=`` 追加到自身。
+    """
+
+    def __init__(self, *media):
+        self._media = list(media)
+
+    def __add__(self, other):
+        collector = MediaCollector(*self._media)
+        collector += other
+        return collector
+
+    def __iadd__(self, other):
+        if isinstance(other, MediaCollector):
+            self._media.extend(other._media)
+        else:
+            self._media.append(other)
+        return self
+
+    # 让 ``Media + MediaCollector`` 也能正常合并
+    @property
+    def _css_lists(self):
+        return [css for m in self._media for css in m._css_lists]
+
+    @property
+    def _js_lists(self):
+        return [js for m in self._media for js in m._js_lists]
+
+    def merge(self):
+        media = Media()
+        media._css_lists = self._css_lists
+        media._js_lists = self._js_lists
+        return media
 
 
 def sortkeypicker(keynames):
@@ -72,3 +168,70 @@ def sortkeypicker(keynames):
                 composite[i] = -v
         return composite
     return getit
+
+
+def freeze_menu(menu):
+    """ 把菜单转换为不可变结构，dict 转为 MappingProxyType，list 转为 tuple """
+    if isinstance(menu, dict):
+        return MappingProxyType({k: freeze_menu(v) for k, v in menu.items()})
+    elif isinstance(menu, (list, tuple)):
+        return tuple(freeze_menu(m) for m in menu)
+    return menu
+
+
+def menu_digest(menu):
+    """ 菜单骨架内容的摘要，内容相同的骨架在不同进程中得到相同的摘要，可以用于共享缓存的 key """
+    def default(o):
+        if isinstance(o, MappingProxyType):
+            return dict(o)
+        # 翻译字符串、callable 类型的 perm 等
+        return getattr(o, '__qualname__', None) or str(o)
+
+    data = json.dumps(menu, default=default, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+class MenuIndex:
+    """
+    菜单 url 的前缀树，key 为菜单项在菜单中的位置（各级下标组成的 tuple），
+    查询 path 时只需沿 path 的字符向下查找，耗时与 path 长度成正比。
+    """
+
+    def __init__(self, menus):
+        self.root = {}
+        self._add_menus(menus, ())
+
+    def _add_menus(self, menus, key):
+        for index, menu in enumerate(menus):
+            item_key = key + (index,)
+            if 'url' in menu:
+                url = menu['url']
+                chop_index = url.find('?')
+                self._add(url if chop_index == -1 else url[:chop_index], item_key)
+            if 'menus' in menu:
+                self._add_menus(menu['menus'], item_key)
+
+    def _add(self, url, key):
+        node = self.root
+        for char in url:
+            node = node.setdefault(char, {})
+        # 空字符串不会是 url 中的字符，用作结束标记
+        node.setdefault('', []).append(key)
+
+    def match(self, path):
+        """ 返回 url 是 path 前缀的菜单项 """
+        node = self.root
+        keys = list(node.get('', ()))
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            keys.extend(node.get('', ()))
+        return keys
+
+    def selected(self, path):
+        """ 返回被选中的菜单项及其所有父菜单 """
+        selected = set()
+        for key in self.match(path):
+            selected.update(key[:i] for i in range(1, len(key) + 1))
+        return selected
@@ -155,3 +155,18 @@ vendors = {
         }
     },
 }
+
+# 每种页面用到的 vendor tags，xadmin_bundle 命令会把每组中的 css 和 js 分别合并成一个文件，
+# 组内的 tags 需要与 vendor 调用时的参数一致；登录页只用到 base
+bundles = {
+    'base': (
+        ('font-awesome.css', 'xadmin.main.css', 'xadmin.plugins.css', 'xadmin.responsive.css'),
+        ('jquery-ui-sortable.js', 'bootstrap.js', 'xadmin.main.js', 'xadmin.responsive.js'),
+    ),
+    'dashboard': (
+        ('xadmin.page.dashboard.js', 'xadmin.page.dashboard.css'),
+    ),
+    'form': (
+        ('xadmin.page.form.js', 'xadmin.form.css'),
+    ),
+}
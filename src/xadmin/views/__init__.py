@@ -1,12 +1,14 @@
 from django.contrib.auth.admin import csrf_protect_m
 
-from .base import BaseAdminObject, BaseAdminPlugin, BaseAdminView, filter_hook
-from .website import IndexView, LoginView
+from .base import BaseAdminObject, BaseAdminPlugin, BaseAdminView, ModelAdminView, filter_hook
+from .autocomplete import AutocompleteView
+from .list import ListAdminView
+from .website import IndexView, LoginView, UserSettingView
 
 __all__ = (
     'BaseAdminObject',
-    'BaseAdminPlugin', 'BaseAdminView',
-    'IndexView', 'LoginView',
+    'BaseAdminPlugin', 'BaseAdminView', 'ModelAdminView', 'ListAdminView', 'AutocompleteView',
+    'IndexView', 'LoginView', 'UserSettingView',
     'filter_hook', 'csrf_protect_m', 'register_builtin_views',
 )
 
@@ -15,5 +17,10 @@ __all__ = (
 def register_builtin_views(site):
     site.registry_view(path='', admin_view_class=IndexView, name='index')
     site.registry_view(path='login/', admin_view_class=LoginView, name='login')
+    site.registry_view(path='settings/user', admin_view_class=UserSettingView, name='user_settings')
 
     site.set_login_view(LoginView)
+
+    # admin model views
+    site.register_modelview(path=r'^$', admin_view_class=ListAdminView, name='%s_%s_changelist')
+    site.register_modelview(path=r'^autocomplete/$', admin_view_class=AutocompleteView, name='%s_%s_autocomplete')
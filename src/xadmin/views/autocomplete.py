@@ -0,0 +1,90 @@
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.db import models
+from django.utils.encoding import force_text
+from django.views.decorators.cache import never_cache
+
+from xadmin.search import SEARCH_RANK, SEARCH_VAR, IcontainsSearchBackend, get_search_backend_class
+from xadmin.views import filter_hook
+from xadmin.views.base import ModelAdminView
+
+# 使用控件的字段，格式为 app_label.model_name.field_name，用于 limit_choices_to 和 to_field
+FIELD_VAR = '_field'
+PAGE_VAR = '_page'
+
+
+class AutocompleteView(ModelAdminView):
+    """
+    外键、多对多控件的搜索接口，需要 model 的查看权限。使用 model 的 search_fields 和 search_backend 搜索，
+    没有配置 search_fields 时搜索第一个唯一的字符字段，没有时搜索第一个字符字段。每页 autocomplete_page_size 行，
+    多读一行判断是否有下一页，不统计总行数。返回 ``{"results": [{"id": ..., "text": ...}], "more": true/false}``。
+    """
+
+    autocomplete_page_size = 20
+    search_fields = ()
+    search_backend = 'icontains'
+    search_config = None
+
+    def init_request(self, *args, **kwargs):
+        if not self.has_view_permission():
+            raise PermissionDenied
+        self.source_field = self.get_source_field()
+
+    def get_source_field(self):
+        label = self.request.GET.get(FIELD_VAR)
+        if not label:
+            return None
+        try:
+            app_label, model_name, field_name = label.split('.')
+            field = apps.get_model(app_label, model_name)._meta.get_field(field_name)
+        except (ValueError, LookupError, FieldDoesNotExist):
+            raise PermissionDenied
+        if not (field.many_to_one or field.many_to_many) or field.related_model is not self.model:
+            raise PermissionDenied
+        return field
+
+    def get_to_field(self):
+        """ 返回的 id 为外键 to_field 的值，默认为主键 """
+        field_name = getattr(getattr(self.source_field, 'remote_field', None), 'field_name', None)
+        return self.opts.get_field(field_name) if field_name else self.opts.pk
+
+    def get_search_backend(self):
+        if self.search_fields:
+            return get_search_backend_class(self.search_backend)(self.model, self.search_fields, self.search_config)
+        fields = [field for field in self.opts.fields if isinstance(field, (models.CharField, models.TextField))]
+        # 优先使用唯一的字符字段（例如 username），避免搜索到 password 等字段
+        fields.sort(key=lambda field: not field.unique)
+        if fields:
+            return IcontainsSearchBackend(self.model, (fields[0].name,))
+        return None
+
+    @filter_hook
+    def get_search_queryset(self, query):
+        queryset = self.queryset()
+        if self.source_field is not None:
+            queryset = queryset.complex_filter(self.source_field.get_limit_choices_to())
+        backend = self.get_search_backend()
+        if query and backend is not None:
+            queryset = backend.search(queryset, query)
+            if backend.ranked and SEARCH_RANK in queryset.query.annotations:
+                return queryset.order_by(f'-{SEARCH_RANK}', 'pk')
+        return queryset.order_by(*(list(self.get_ordering()) + ['pk']))
+
+    @filter_hook
+    def get_result(self, obj):
+        return {'id': force_text(self.get_to_field().value_from_object(obj)), 'text': force_text(obj)}
+
+    @never_cache
+    @filter_hook
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get(SEARCH_VAR, '').strip()
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        size = self.autocomplete_page_size
+        rows = list(self.get_search_queryset(query)[(page - 1) * size:page * size + 1])
+        return self.render_to_response({
+            'results': [self.get_result(obj) for obj in rows[:size]],
+            'more': len(rows) > size,
+        })
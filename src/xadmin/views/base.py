@@ -1,16 +1,17 @@
-import copy
 import datetime
 import decimal
 import functools
+import hashlib
 import json
 from collections import OrderedDict
 from functools import update_wrapper
 from inspect import getfullargspec
 
-from django import forms
 from django.apps import apps
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import get_permission_codename
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse, HttpResponse
@@ -19,26 +20,64 @@ from django.urls import reverse
 from django.utils import timezone
 from django.utils.decorators import classonlymethod
 from django.utils.encoding import force_text, smart_text
-from django.utils.functional import Promise
+from django.utils.functional import Promise, cached_property
 from django.utils.text import capfirst
-from django.utils.translation import ugettext as _
+from django.utils.translation import ugettext as _, get_language
 from django.views import View
 
-from xadmin.util import vendor, sortkeypicker
+from xadmin.counters import get_counter_class
+from xadmin.usersettings import get_user_setting, save_user_setting
+from xadmin.util import vendor, sortkeypicker, MediaCollector
 
 
 class IncorrectPluginArg(Exception):
     pass
 
 
+FILTER_SELF_ONLY = 0
+FILTER_LAZY = 1
+FILTER_EAGER = 2
+
+
+def get_filter_kind(fm):
+    """ 根据插件方法的参数判断调用方式：只有 self、``__`` 延迟调用父方法、直接接收父方法结果 """
+    fargs = getfullargspec(fm)[0]
+    if len(fargs) == 1:
+        return FILTER_SELF_ONLY
+    elif fargs[1] == '__':
+        return FILTER_LAZY
+    return FILTER_EAGER
+
+
+def compile_filter_chain(plugin_classes, tag):
+    """ 解析插件类中名为 tag 的方法，返回按 priority 排序的 (插件序号, 调用方式) 元组 """
+    filters = []
+    for index, plugin_class in enumerate(plugin_classes):
+        fm = getattr(plugin_class, tag, None)
+        if callable(fm):
+            filters.append((getattr(fm, 'priority', 10), index, get_filter_kind(fm)))
+    return tuple((index, kind) for priority, index, kind in sorted(filters, key=lambda x: x[0]))
+
+
+def get_filter_chain(view_class, tag):
+    """ 每个 (view 类, hook) 只解析一次插件方法链，结果缓存在 view 类上 """
+    chains = view_class.__dict__.get('_filter_chains')
+    if chains is None:
+        chains = {}
+        view_class._filter_chains = chains
+    chain = chains.get(tag)
+    if chain is None:
+        chain = chains[tag] = compile_filter_chain(getattr(view_class, 'plugin_classes', ()), tag)
+    return chain
+
+
 def filter_chain(filters, token, func, *args, **kwargs):
     if token == -1:
         return func()
     else:
         def _inner_method():
-            fm = filters[token]
-            fargs = getfullargspec(fm)[0]
-            if len(fargs) == 1:
+            kind, fm = filters[token]
+            if kind == FILTER_SELF_ONLY:
                 # Only self arg
                 result = func()
                 if result is None:
@@ -46,11 +85,54 @@ def filter_chain(filters, token, func, *args, **kwargs):
                 else:
                     raise IncorrectPluginArg('Plugin filter method need a arg to receive parent method result.')
             else:
-                return fm(func if fargs[1] == '__' else func(), *args, **kwargs)
+                return fm(func if kind == FILTER_LAZY else func(), *args, **kwargs)
 
         return filter_chain(filters, token - 1, _inner_method, *args, **kwargs)
 
 
+def recursive_filter_chain(filters, func, *args, **kwargs):
+    return filter_chain(filters, len(filters) - 1, func, *args, **kwargs)
+
+
+def iterative_filter_chain(filters, func, *args, **kwargs):
+    """
+    与 filter_chain 语义一致的平坦循环实现：只有 ``__`` 延迟调用的插件方法才会增加一层调用栈，
+    其他插件方法按 priority 从内到外依次处理父方法结果。
+    """
+    count = len(filters)
+
+    def run(start):
+        # 找到第一个需要延迟调用父方法的插件，它之后的部分交给 ``__`` 执行
+        end = start
+        while end < count and filters[end][0] != FILTER_LAZY:
+            end += 1
+        if end == count:
+            result = func()
+        else:
+            result = filters[end][1](functools.partial(run, end + 1), *args, **kwargs)
+
+        for index in range(end - 1, start - 1, -1):
+            kind, fm = filters[index]
+            if kind == FILTER_SELF_ONLY:
+                if result is not None:
+                    raise IncorrectPluginArg('Plugin filter method need a arg to receive parent method result.')
+                result = fm()
+            else:
+                result = fm(result, *args, **kwargs)
+        return result
+
+    return run(0)
+
+
+FILTER_EXECUTORS = {
+    'recursive': recursive_filter_chain,
+    'iterative': iterative_filter_chain,
+}
+
+# 延迟创建模式下尚未创建的插件占位
+PLUGIN_NOT_LOADED = object()
+
+
 def filter_hook(func):
     tag = func.__name__
     func.__doc__ = "``filter_hook``\n\n" + (func.__doc__ or "")
@@ -61,15 +143,20 @@ def filter_hook(func):
         def _inner_method():
             return func(self, *args, **kwargs)
 
-        if self.plugins:
-            filters = [
-                (getattr(getattr(p, tag), 'priority', 10), getattr(p, tag))
-                for p in self.plugins if callable(getattr(p, tag, None))
-            ]
-            filters = [f for p, f in sorted(filters, key=lambda x: x[0])]
-            return filter_chain(filters, len(filters) - 1, _inner_method, *args, **kwargs)
-        else:
-            return _inner_method()
+        if self._active_plugins:
+            # 只需剔除 init_request 返回 False 的插件，延迟创建的插件在第一次用到时创建
+            plugins = self._active_plugins
+            filters = []
+            for index, kind in get_filter_chain(self.__class__, tag):
+                plugin = plugins[index]
+                if plugin is PLUGIN_NOT_LOADED:
+                    plugin = self._load_plugin(index)
+                if plugin is not None:
+                    filters.append((kind, getattr(plugin, tag)))
+            if filters:
+                executor = FILTER_EXECUTORS[self.admin_site.filter_executor]
+                return executor(filters, _inner_method, *args, **kwargs)
+        return _inner_method()
 
     return method
 
@@ -121,6 +208,9 @@ class BaseAdminObject:
 
 
 class BaseAdminPlugin(BaseAdminObject):
+    # 延迟创建模式下仍在 view 初始化时创建，用于 init_request 有副作用的插件
+    eager_init = False
+
     def __init__(self, admin_view):
         self.admin_view = admin_view
         self.admin_site = admin_view.admin_site
@@ -144,7 +234,15 @@ class BaseAdminView(BaseAdminObject, View):
         self.user = request.user
 
         self.plugins = []
-        self.base_plugins = [p(self) for p in getattr(self, 'plugin_classes', [])]
+        self._active_plugins = []
+        plugin_classes = getattr(self, 'plugin_classes', [])
+        lazy = bool(plugin_classes) and self.admin_site.plugin_activation == 'lazy'
+        # 延迟创建的插件先用 PLUGIN_NOT_LOADED 占位，在第一次调用 hook 或 view_block 时才创建
+        self._plugin_slots = [
+            PLUGIN_NOT_LOADED if lazy and not p.eager_init else p(self)
+            for p in plugin_classes
+        ]
+        self.base_plugins = [p for p in self._plugin_slots if p is not PLUGIN_NOT_LOADED]
 
         self.args = args
         self.kwargs = kwargs
@@ -175,15 +273,73 @@ class BaseAdminView(BaseAdminObject, View):
 
     def init_plugin(self, *args, **kwargs):
         plugins = []
-        for p in self.base_plugins:
-            p.request = self.request
-            p.user = self.user
-            p.args = self.args
-            p.kwargs = self.kwargs
-            result = p.init_request(*args, **kwargs)
-            if result is not False:
+        active_plugins = []
+        for p in self._plugin_slots:
+            if p is PLUGIN_NOT_LOADED:
+                active_plugins.append(p)
+            elif self._setup_plugin(p, *args, **kwargs):
                 plugins.append(p)
+                active_plugins.append(p)
+            else:
+                active_plugins.append(None)
         self.plugins = plugins
+        self._active_plugins = active_plugins
+
+    def _setup_plugin(self, plugin, *args, **kwargs):
+        plugin.request = self.request
+        plugin.user = self.user
+        plugin.args = self.args
+        plugin.kwargs = self.kwargs
+        return plugin.init_request(*args, **kwargs) is not False
+
+    def _load_plugin(self, index):
+        """ 创建延迟创建模式下的插件，init_request 返回 False 时返回 None """
+        plugin = self.plugin_classes[index](self)
+        self.base_plugins.append(plugin)
+        if self._setup_plugin(plugin, *self.args, **self.kwargs):
+            self.plugins.append(plugin)
+        else:
+            plugin = None
+        self._active_plugins[index] = plugin
+        return plugin
+
+    def get_hook_plugins(self, name):
+        """ 返回定义了 name 方法且已启用的插件 """
+        plugins = []
+        for index, plugin in enumerate(self._active_plugins):
+            if plugin is PLUGIN_NOT_LOADED:
+                if name not in self.admin_site.get_plugin_hooks(self.plugin_classes[index]):
+                    continue
+                plugin = self._load_plugin(index)
+            if plugin is not None and callable(getattr(plugin, name, None)):
+                plugins.append(plugin)
+        return plugins
+
+    @cached_property
+    def user_perms(self):
+        """ 当前用户的所有权限，每个请求只通过 auth backend 加载一次 """
+        if not self.user.is_active or self.user.is_superuser:
+            return frozenset()
+        return frozenset(self.user.get_all_permissions())
+
+    def has_perm(self, perm):
+        """ 与 user.has_perm 的结果一致，但只查询 user_perms """
+        if not self.user.is_active:
+            return False
+        return self.user.is_superuser or perm in self.user_perms
+
+    def message_user(self, message, level='info'):
+        """ 通过 django.contrib.messages 显示提示，level 为 debug、info、success、warning 或 error """
+        if hasattr(messages, level) and callable(getattr(messages, level)):
+            getattr(messages, level)(self.request, message)
+
+    def get_user_setting(self, key, default=None):
+        """ 当前用户的设置，每个请求只查询一次 """
+        return get_user_setting(self.request, key, default)
+
+    def save_user_setting(self, key, value):
+        """ 保存当前用户的设置，短时间内对同一 key 的多次保存合并为一次写入 """
+        save_user_setting(self.request, key, value)
 
     @filter_hook
     def get_context(self):
@@ -191,11 +347,12 @@ class BaseAdminView(BaseAdminObject, View):
 
     @property
     def media(self):
-        return self.get_media()
+        media = self.get_media()
+        return media.merge() if isinstance(media, MediaCollector) else media
 
     @filter_hook
     def get_media(self):
-        return forms.Media()
+        return MediaCollector()
 
 
 class CommAdminView(BaseAdminView):
@@ -210,9 +367,108 @@ class CommAdminView(BaseAdminView):
     apps_label_title = {}
     apps_icons = {}
 
+    # 菜单缓存使用的 cache 配置名及过期时间（秒），DEBUG 模式下不缓存
+    menu_cache = getattr(settings, 'XADMIN_MENU_CACHE', 'default')
+    menu_cache_timeout = getattr(settings, 'XADMIN_MENU_CACHE_TIMEOUT', 60 * 60)
+
     def get_site_menu(self):
         return None
 
+    def get_nav_menu_cache_key(self):
+        """
+        相同权限的用户共用同一份菜单缓存。key 中包含菜单骨架内容的摘要，而不是进程内的 registry_version，
+        使用共享的缓存时，任何进程中菜单内容的变化（例如部署后修改了名称、图标）都会使用新的 key
+        """
+        if self.user.is_superuser:
+            perms = 'super'
+        else:
+            perms = ','.join(sorted(self.user_perms))
+        fingerprint = hashlib.md5(perms.encode('utf-8')).hexdigest()
+        return f'xadmin:nav_menu:{self.admin_site.name}:{self.admin_site.get_menu_digest(self)}:' \
+               f'{get_language()}:{fingerprint}'
+
+    def get_user_nav_menu(self):
+        """
+        返回当前用户有权限访问的 nav_menu 及 positions，positions 为菜单骨架中的位置到 nav_menu 中位置的映射
+        """
+        cache_key = None
+        if not settings.DEBUG:
+            cache_key = self.get_nav_menu_cache_key()
+            cached = caches[self.menu_cache].get(cache_key)
+            if cached is not None:
+                cached = json.loads(cached)
+                return cached['menus'], {tuple(k): tuple(p) for k, p in cached['positions']}
+
+        # 菜单骨架由 admin_site 缓存且不可变，这里只需按权限过滤并复制出新的 menu
+        menus = self.admin_site.get_menu_skeleton(self)
+        positions = {}
+        # callable 类型的 perm 结果与具体用户相关，不能按权限共享缓存
+        shareable = True
+
+        # 过滤没有权限的 menu
+        def check_menu_permission(item):
+            nonlocal shareable
+            need_perm = item.get('perm')
+            if need_perm is None:
+                return True
+            elif callable(need_perm):
+                shareable = False
+                return need_perm(self.user)
+            elif need_perm == 'super':
+                return self.user.is_superuser
+            else:
+                return self.has_perm(need_perm)
+
+        def filter_menus(items, key, position):
+            filtered = []
+            for index, item in enumerate(items):
+                if not check_menu_permission(item):
+                    continue
+                item_key = key + (index,)
+                item_position = position + (len(filtered),)
+                new_item = {k: v for k, v in item.items() if k != 'perm'}
+                if 'menus' in item:
+                    new_item['menus'] = filter_menus(item['menus'], item_key, item_position)
+                    # 过滤空的 menu
+                    if len(new_item['menus']) == 0 and len(item['menus']) > 0:
+                        continue
+                filtered.append(new_item)
+                positions[item_key] = item_position
+            return filtered
+        nav_menu = filter_menus(menus, (), ())
+        # 把 nav_menu 放入缓存
+        if cache_key and shareable:
+            caches[self.menu_cache].set(
+                cache_key,
+                json.dumps({'menus': nav_menu, 'positions': list(positions.items())}, cls=JSONEncoder,
+                           ensure_ascii=False),
+                self.menu_cache_timeout
+            )
+        return nav_menu, positions
+
+    def get_selected_nav_menu(self, nav_menu, positions):
+        """
+        通过菜单骨架的 url 前缀索引找出被选中的菜单链，只复制被选中的菜单项并标记 selected，不修改 nav_menu
+        """
+        selected = sorted(
+            positions[key]
+            for key in self.admin_site.get_menu_index(self).selected(self.request.path)
+            if key in positions
+        )
+        if not selected:
+            return nav_menu
+
+        nav_menu = list(nav_menu)
+        copied = {(): nav_menu}
+        # 父菜单的位置总是排在子菜单之前
+        for position in selected:
+            parent = copied[position[:-1]]
+            item = dict(parent[position[-1]], selected=True)
+            if 'menus' in item:
+                item['menus'] = copied[position] = list(item['menus'])
+            parent[position[-1]] = item
+        return nav_menu
+
     @filter_hook
     def get_nav_menu(self):
         site_menu = list(self.get_site_menu() or [])
@@ -237,8 +493,7 @@ class CommAdminView(BaseAdminView):
             # 生成 model_dict
             model_dict = {
                 'title': smart_text(capfirst(model._meta.verbose_name_plural)),
-                # 'url': self.get_model_url(model, name='changelist'),
-                'url': '#',
+                'url': self.get_model_url(model, name='changelist'),
                 'icon': self.get_model_icon(model),
                 'perm': self.get_model_perm(model, 'view'),
                 'order': model_admin.order,
@@ -290,58 +545,9 @@ class CommAdminView(BaseAdminView):
     def get_context(self):
         context = super(CommAdminView, self).get_context()
         # 获取 nav_menu
-        if not settings.DEBUG and 'nav_menu' in self.request.session:
-            nav_menu = json.loads(self.request.session['nav_menu'])
-        else:
-            menus = copy.copy(self.get_nav_menu())
-
-            # 过滤没有权限的 menu
-            def check_menu_permission(item):
-                need_perm = item.pop('perm', None)
-                if need_perm is None:
-                    return True
-                elif callable(need_perm):
-                    return need_perm(self.user)
-                elif need_perm == 'super':
-                    return self.user.is_superuser
-                else:
-                    return self.user.has_perm(need_perm)
-
-            def filter_item(item):
-                if 'menus' in item:
-                    before_filter_length = len(item['menus'])
-                    item['menus'] = [filter_item(i) for i in item['menus'] if check_menu_permission(i)]
-                    after_filter_length = len(item['menus'])
-                    if after_filter_length == 0 and before_filter_length > 0:
-                        return None
-                return item
-            nav_menu = [filter_item(item) for item in menus if check_menu_permission(item)]
-            # 过滤空的 menu
-            nav_menu = list(filter(lambda x: x, nav_menu))
-            # 把 nav_menu 放入 session
-            if not settings.DEBUG:
-                self.request.session['nav_menu'] = json.dumps(nav_menu, cls=JSONEncoder, ensure_ascii=False)
-                self.request.session.modified = True
-
+        nav_menu, positions = self.get_user_nav_menu()
         # 设置被选中的 menu
-        def check_selected(menu, path):
-            selected = False
-            if 'url' in menu:
-                chop_index = menu['url'].find('?')
-                if chop_index == -1:
-                    selected = path.startswith(menu['url'])
-                else:
-                    selected = path.startswith(menu['url'][chop_index:])
-            if 'menus' in menu:
-                for m in menu['menus']:
-                    _s = check_selected(m, path)
-                    if _s:
-                        selected = True
-            if selected:
-                menu['selected'] = selected
-            return selected
-        for menu in nav_menu:
-            check_selected(menu, self.request.path)
+        nav_menu = self.get_selected_nav_menu(nav_menu, positions)
 
         context.update({
             'menu_template': self.menu_template,
@@ -374,6 +580,13 @@ class ModelAdminView(CommAdminView):
     model = None
     remove_permissions = []
 
+    # 统计行数的方式：'exact'、'cached'、'estimate' 或 xadmin.counters.BaseCounter 的子类
+    count_strategy = 'exact'
+    count_cache = 'default'
+    count_cache_timeout = 60
+    # 估算行数小于该值时使用精确行数
+    count_estimate_threshold = 10000
+
     def __init__(self, request, *args, **kwargs):
         self.opts = self.model._meta
         self.app_label = self.model._meta.app_label
@@ -468,23 +681,28 @@ class ModelAdminView(CommAdminView):
         """
         return self.model._default_manager.get_queryset()
 
+    @filter_hook
+    def get_result_count(self, queryset):
+        """ 返回 (行数, 是否为估算值) """
+        return get_counter_class(self.count_strategy)(self).count(queryset)
+
     def has_view_permission(self, obj=None):
         view_codename = get_permission_codename('view', self.opts)
         change_codename = get_permission_codename('change', self.opts)
 
         return ('view' not in self.remove_permissions) and (
-                self.user.has_perm(f'{self.app_label}.{view_codename}') or
-                self.user.has_perm(f'{self.app_label}.{change_codename}')
+                self.has_perm(f'{self.app_label}.{view_codename}') or
+                self.has_perm(f'{self.app_label}.{change_codename}')
         )
 
     def has_add_permission(self):
         codename = get_permission_codename('add', self.opts)
-        return ('add' not in self.remove_permissions) and self.user.has_perm(f'{self.app_label}.{codename}')
+        return ('add' not in self.remove_permissions) and self.has_perm(f'{self.app_label}.{codename}')
 
     def has_change_permission(self, obj=None):
         codename = get_permission_codename('change', self.opts)
-        return ('change' not in self.remove_permissions) and self.user.has_perm(f'{self.app_label}.{codename}')
+        return ('change' not in self.remove_permissions) and self.has_perm(f'{self.app_label}.{codename}')
 
     def has_delete_permission(self, request=None, obj=None):
         codename = get_permission_codename('delete', self.opts)
-        return ('delete' not in self.remove_permissions) and self.user.has_perm(f'{self.app_label}.{codename}')
+        return ('delete' not in self.remove_permissions) and self.has_perm(f'{self.app_label}.{codename}')
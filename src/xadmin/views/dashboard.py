@@ -1,15 +1,222 @@
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth.admin import csrf_protect_m
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.forms import Media
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.urls import NoReverseMatch, reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone, translation
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext as _
 from django.views.decorators.cache import never_cache
 
+from xadmin.counters import get_counter_class
 from xadmin.views import filter_hook
-from xadmin.views.base import CommAdminView
+from xadmin.views.base import BaseAdminObject, CommAdminView
+
+
+class WidgetManager:
+    """ dashboard widget 的注册表，widget_type 为 widgets 配置中 'type' 的值 """
+
+    def __init__(self):
+        self._widgets = {}
+
+    def register(self, widget_class):
+        self._widgets[widget_class.widget_type] = widget_class
+        return widget_class
+
+    def get(self, widget_type):
+        if widget_type not in self._widgets:
+            raise ImproperlyConfigured(
+                f"The widget type {widget_type} isn't one of {', '.join(self._widgets)}"
+            )
+        return self._widgets[widget_type]
+
+    def get_widgets(self):
+        return list(self._widgets.values())
+
+
+widget_manager = WidgetManager()
+
+
+class BaseWidget(BaseAdminObject):
+    """
+    dashboard 的 widget。get_data 返回模板使用的数据，可以是 ``async def``，
+    各个 widget 的 get_data 由 Dashboard 并发执行，模板在请求的线程中渲染。
+
+    cache_timeout 大于 0 时 get_data 的结果缓存 cache_timeout 秒，cache_scope 为 'user' 时每个用户单独缓存，
+    为 'perms' 时权限相同的用户共用缓存，此时 get_data 的结果只能与用户的权限有关。
+    """
+
+    widget_type = None
+    title = None
+    icon = 'fa fa-plus-square'
+    template = 'xadmin/widgets/base.html'
+    placeholder_template = 'xadmin/widgets/placeholder.html'
+
+    cache_timeout = 0
+    cache_scope = 'user'
+    # 是否延迟加载，None 时使用 Dashboard 的 widget_deferred
+    deferred = None
+
+    def __init__(self, dashboard, widget_id, options):
+        self.dashboard = dashboard
+        self.admin_site = dashboard.admin_site
+        self.request = dashboard.request
+        self.user = dashboard.user
+        self.widget_id = widget_id
+        self.options = options
+        self.title = options.get('title', self.title)
+        self.icon = options.get('icon', self.icon)
+        self.cache_timeout = options.get('cache_timeout', self.cache_timeout)
+        self.deferred = options.get('deferred', self.deferred)
+        self.data = None
+        # 延迟加载时 widget 内容的 url，为 None 时直接渲染
+        self.deferred_url = None
+
+    def has_perm(self):
+        return True
+
+    def get_data(self):
+        return {}
+
+    def get_cache_key(self):
+        if self.cache_scope == 'perms':
+            perms = 'superuser' if self.user.is_superuser else ','.join(sorted(self.dashboard.user_perms))
+            scope = f'perms:{hashlib.md5(perms.encode("utf-8")).hexdigest()}'
+        else:
+            scope = f'user:{self.user.pk}'
+        options = hashlib.md5(json.dumps(self.options, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return f'xadmin:widget:{self.widget_type}:{self.widget_id}:{options}:{scope}:{translation.get_language()}'
+
+    def get_context(self):
+        context = {
+            'widget_id': self.widget_id,
+            'widget_type': self.widget_type,
+            'title': self.title,
+            'icon': self.icon,
+        }
+        context.update(self.data or {})
+        return context
+
+    def widget(self):
+        if self.deferred_url:
+            return render_to_string(self.placeholder_template, {
+                'widget_id': self.widget_id,
+                'widget_type': self.widget_type,
+                'title': self.title,
+                'icon': self.icon,
+                'widget_url': self.deferred_url,
+            })
+        return render_to_string(self.template, self.get_context())
+
+    def media(self):
+        return Media()
+
+
+@widget_manager.register
+class HtmlWidget(BaseWidget):
+    widget_type = 'html'
+    icon = 'fa fa-file-o'
+    template = 'xadmin/widgets/html.html'
+
+    def get_data(self):
+        return {'content': self.options.get('content', '')}
+
+
+@widget_manager.register
+class ModelCountWidget(BaseWidget):
+    """ model 的行数，options 中 model 为 'app_label.ModelName'，count_strategy 默认为 'estimate'，需要查看权限 """
+
+    widget_type = 'count'
+    icon = 'fa fa-bar-chart'
+    template = 'xadmin/widgets/count.html'
+    cache_timeout = 60
+    cache_scope = 'perms'
+
+    # xadmin.counters 使用的配置
+    count_cache = 'default'
+    count_cache_timeout = 60
+    count_estimate_threshold = 10000
+
+    @cached_property
+    def model(self):
+        return apps.get_model(self.options['model'])
+
+    def has_perm(self):
+        opts = self.model._meta
+        return self.dashboard.has_perm(f'{opts.app_label}.view_{opts.model_name}') or \
+            self.dashboard.has_perm(f'{opts.app_label}.change_{opts.model_name}')
+
+    def get_data(self):
+        counter = get_counter_class(self.options.get('count_strategy', 'estimate'))(self)
+        count, approximate = counter.count(self.model._default_manager.all())
+        return {'count': count, 'count_approximate': approximate}
+
+    def get_context(self):
+        context = super(ModelCountWidget, self).get_context()
+        context.update({
+            'url': self.get_model_url(self.model, 'changelist') if self.model in self.admin_site._registry else None,
+            'verbose_name': self.model._meta.verbose_name_plural,
+        })
+        return context
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_widget_executor():
+    """ 所有请求共用的线程池，线程数为 XADMIN_WIDGET_WORKERS """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'XADMIN_WIDGET_WORKERS', 8), thread_name_prefix='xadmin-widget'
+                )
+    return _executor
+
+
+def get_widget_data(widget, language, tz):
+    """ 在其他线程中执行 widget.get_data，使用请求的语言和时区，结束后关闭这个线程的数据库连接 """
+    try:
+        with translation.override(language), timezone.override(tz):
+            if asyncio.iscoroutinefunction(widget.get_data):
+                return async_to_sync(widget.get_data)()
+            return widget.get_data()
+    finally:
+        connections.close_all()
 
 
 class Dashboard(CommAdminView):
+    """
+    widgets 为每一列的 widget 配置，例如 ``[[{'type': 'html', 'title': ..., 'content': ...}], [...]]``，
+    用户拖动后的位置保存在 portal key 对应的用户设置中。
+
+    widget_deferred 为 True 时页面中只渲染占位的 widget，由 xadmin.page.dashboard.js 在 widget 进入可视区域后
+    从 AdminSite 的 ``widget/<url name>/<widget id>/`` 加载内容，只有通过 registry_view 注册的 dashboard 可以延迟加载。
+
+    多个 widget 的 get_data 并发执行：WSGI 下使用共用的线程池，ASGI 下在事件循环中作为 asyncio 任务执行，
+    同时执行的个数不超过 XADMIN_WIDGET_WORKERS，总耗时约为最慢的 widget 的耗时。
+    """
 
     widget_customiz = True
     widgets = []
+    widget_cache = 'default'
+    widget_deferred = False
     title = _('Dashboard')
     icon = None
 
@@ -23,12 +230,120 @@ class Dashboard(CommAdminView):
     def get_title(self):
         return self.title
 
+    @filter_hook
+    def get_widget_configs(self):
+        return self.widgets
+
+    def get_widget_id(self, options, column, index):
+        return options.get('id') or f'widget_{column}_{index}'
+
+    @filter_hook
+    def get_widget_columns(self):
+        """ 按配置创建 widget，去掉没有权限的，返回每一列的 widget """
+        return self.get_layout(self.create_widgets())
+
+    def create_widgets(self):
+        columns = []
+        for column, configs in enumerate(self.get_widget_configs()):
+            widgets = []
+            for index, options in enumerate(configs):
+                widget_class = widget_manager.get(options.get('type', 'html'))
+                widget = widget_class(self, self.get_widget_id(options, column, index), options)
+                if widget.has_perm():
+                    widgets.append(widget)
+            columns.append(widgets)
+        return columns
+
+    def get_layout(self, columns):
+        """ 按保存的位置 ``id,id|id`` 重新排列，保存后新增的 widget 放在配置中的列的末尾 """
+        position = self.get_user_setting(self.get_portal_key())
+        if not position:
+            return columns
+        widgets = {widget.widget_id: widget for column in columns for widget in column}
+        layout = [
+            [widgets.pop(widget_id) for widget_id in column.split(',') if widget_id in widgets]
+            for column in position.split('|')
+        ]
+        for index, column in enumerate(columns):
+            rest = [widget for widget in column if widget.widget_id in widgets]
+            if rest:
+                while len(layout) <= index:
+                    layout.append([])
+                layout[index].extend(rest)
+        return layout
+
+    @cached_property
+    def widget_columns(self):
+        return self.get_widget_columns()
+
+    def load_widgets(self, widgets):
+        """ 读取缓存，没有缓存的 widget 并发执行 get_data，结果按各自的 cache_timeout 缓存 """
+        cache = caches[self.widget_cache]
+        keys = {widget: widget.get_cache_key() for widget in widgets if widget.cache_timeout}
+        cached = cache.get_many(list(keys.values())) if keys else {}
+
+        pending = []
+        for widget in widgets:
+            if widget in keys and keys[widget] in cached:
+                widget.data = cached[keys[widget]]
+            else:
+                pending.append(widget)
+
+        for widget, data in zip(pending, self.run_widgets(pending)):
+            widget.data = data
+            if widget in keys:
+                cache.set(keys[widget], data, widget.cache_timeout)
+
+    def run_widgets(self, widgets):
+        if not widgets:
+            return []
+        if len(widgets) == 1 and not asyncio.iscoroutinefunction(widgets[0].get_data):
+            return [widgets[0].get_data()]
+        language, tz = translation.get_language(), timezone.get_current_timezone()
+        if isinstance(self.request, ASGIRequest):
+            return async_to_sync(self.run_widgets_async)(widgets, language, tz)
+        executor = get_widget_executor()
+        futures = [executor.submit(get_widget_data, widget, language, tz) for widget in widgets]
+        return [future.result() for future in futures]
+
+    async def run_widgets_async(self, widgets, language, tz):
+        semaphore = asyncio.Semaphore(getattr(settings, 'XADMIN_WIDGET_WORKERS', 8))
+
+        async def run(widget):
+            async with semaphore:
+                if asyncio.iscoroutinefunction(widget.get_data):
+                    with translation.override(language), timezone.override(tz):
+                        return await widget.get_data()
+                return await sync_to_async(get_widget_data, thread_sensitive=False)(widget, language, tz)
+
+        return await asyncio.gather(*[run(widget) for widget in widgets])
+
+    def get_widget_url(self, widget):
+        match = self.request.resolver_match
+        if match is None or not match.url_name:
+            return None
+        try:
+            return reverse(f'{self.admin_site.app_name}:dashboard_widget', args=(match.url_name, widget.widget_id))
+        except NoReverseMatch:
+            return None
+
     @filter_hook
     def get_context(self):
+        columns = self.widget_columns
+        widgets = []
+        for column in columns:
+            for widget in column:
+                if widget.deferred if widget.deferred is not None else self.widget_deferred:
+                    widget.deferred_url = self.get_widget_url(widget)
+                if not widget.deferred_url:
+                    widgets.append(widget)
+        self.load_widgets(widgets)
+        width = 12 // max(len(columns), 1)
         new_context = {
             'title': self.get_title(),
             'icon': self.icon,
             'portal_key': self.get_portal_key(),
+            'columns': [(f'col-sm-{width}', column) for column in columns],
         }
         context = super(Dashboard, self).get_context()
         context.update(new_context)
@@ -38,6 +353,25 @@ class Dashboard(CommAdminView):
     def get(self, request, *args, **kwargs):
         return self.template_response('xadmin/views/dashboard.html', self.get_context())
 
+    def widget_response(self, widget_id):
+        """
+        单个 widget 的内容，由 AdminSite.dashboard_widget 调用。ETag 为内容的摘要，
+        浏览器缓存 widget 的 cache_timeout 秒，之后用 If-None-Match 验证，内容没有变化时返回 304。
+        """
+        for widget in (widget for column in self.create_widgets() for widget in column):
+            if widget.widget_id == widget_id:
+                break
+        else:
+            raise Http404
+        self.load_widgets([widget])
+        content = widget.widget()
+        etag = f'"{hashlib.md5(content.encode("utf-8")).hexdigest()}"'
+        response = get_conditional_response(self.request, etag=etag) or HttpResponse(content)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=widget.cache_timeout or 0)
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        return response
+
     @csrf_protect_m
     def post(self, request, *args, **kwargs):
         return self.get(request)
@@ -47,8 +381,8 @@ class Dashboard(CommAdminView):
         media = super(Dashboard, self).get_media()
         media += self.vendor('xadmin.page.dashboard.js', 'xadmin.page.dashboard.css')
         if self.widget_customiz:
-            media = media + self.vendor('xadmin.plugin.portal.js')
-        for ws in self.widgets:
-            for widget in ws:
-                media = media + widget.media()
+            media += self.vendor('xadmin.plugin.portal.js')
+        for column in self.widget_columns:
+            for widget in column:
+                media += widget.media()
         return media
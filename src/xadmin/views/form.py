@@ -5,14 +5,19 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Column
 from django import forms
 from django.contrib.auth.admin import csrf_protect_m
+from django.core.cache import caches
 from django.db import transaction
 from django.http import HttpResponseRedirect
+from django.urls import NoReverseMatch, reverse
 from django.template.response import TemplateResponse
 from django.utils.translation import ugettext as _
 
+from xadmin.counters import EstimateCounter
 from xadmin.layout import Container, Col, Fieldset
 from xadmin.views import filter_hook
+from xadmin.views.autocomplete import FIELD_VAR
 from xadmin.views.base import CommAdminView
+from xadmin.widgets import AutocompleteMixin, AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class FormAdminView(CommAdminView):
@@ -24,13 +29,75 @@ class FormAdminView(CommAdminView):
 
     form_layout = None
 
+    # 关联 model 的行数超过该值时，外键和多对多字段改用 autocomplete 控件，None 表示不替换
+    autocomplete_threshold = 1000
+    autocomplete_cache = 'default'
+    autocomplete_cache_timeout = 300
+
     def init_request(self, *args, **kwargs):
         # comm method for both get and post
         self.prepare_form()
 
     @filter_hook
     def prepare_form(self):
-        self.view_form = self.form
+        self.view_form = self.get_autocomplete_form(self.form)
+
+    def get_relation_size(self, model):
+        """ 关联表的行数，优先使用数据库的估算值，否则精确统计并缓存 autocomplete_cache_timeout 秒 """
+        queryset = model._default_manager.all()
+        size = EstimateCounter(self).estimate(queryset)
+        if size is None:
+            cache = caches[self.autocomplete_cache]
+            cache_key = f'xadmin:relation_size:{queryset.db}:{model._meta.label_lower}'
+            size = cache.get(cache_key)
+            if size is None:
+                size = queryset.count()
+                cache.set(cache_key, size, self.autocomplete_cache_timeout)
+        return size
+
+    def get_autocomplete_url(self, form_class, name, field):
+        model = field.queryset.model
+        if model not in self.admin_site._registry:
+            return None
+        try:
+            url = reverse(f'{self.admin_site.app_name}:{model._meta.app_label}_{model._meta.model_name}_autocomplete')
+        except NoReverseMatch:
+            return None
+        form_model = getattr(getattr(form_class, '_meta', None), 'model', None)
+        if form_model is not None:
+            url = f'{url}?{FIELD_VAR}={form_model._meta.label_lower}.{name}'
+        return url
+
+    def get_autocomplete_form(self, form_class):
+        """
+        关联表行数超过 autocomplete_threshold 的 ModelChoiceField 改用 autocomplete 控件，
+        避免把关联表的所有行渲染为 option。没有需要替换的字段时返回原来的 form
+        """
+        if self.autocomplete_threshold is None:
+            return form_class
+        fields = {}
+        for name, field in form_class.base_fields.items():
+            if not isinstance(field, forms.ModelChoiceField) or isinstance(field.widget, AutocompleteMixin) \
+                    or not isinstance(field.widget, forms.Select):
+                continue
+            if self.get_relation_size(field.queryset.model) <= self.autocomplete_threshold:
+                continue
+            url = self.get_autocomplete_url(form_class, name, field)
+            if url is None:
+                continue
+            field = copy.deepcopy(field)
+            widget_class = AutocompleteSelectMultiple if isinstance(field, forms.ModelMultipleChoiceField) \
+                else AutocompleteSelect
+            widget = widget_class(url, attrs=field.widget.attrs)
+            widget.choices = field.choices
+            widget.is_required = field.required
+            field.widget = widget
+            fields[name] = field
+        if not fields:
+            return form_class
+        form_class = type(form_class.__name__, (form_class,), {})
+        form_class.base_fields = dict(form_class.base_fields, **fields)
+        return form_class
 
     @filter_hook
     def instance_forms(self):
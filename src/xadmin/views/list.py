@@ -0,0 +1,264 @@
+import base64
+import datetime
+import json
+import logging
+
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils.encoding import force_text
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.translation import ugettext as _
+from django.views.decorators.cache import never_cache
+
+from xadmin.views import filter_hook, csrf_protect_m
+from xadmin.views.base import ModelAdminView
+
+CURSOR_VAR = 'c'
+
+logger = logging.getLogger(__name__)
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """ DjangoJSONEncoder 会把时间截断到毫秒，cursor 中的值必须与数据库中的值完全相同，否则翻页时会跳过行 """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class ListAdminView(ModelAdminView):
+    """
+    Changelist 页面，使用 keyset (seek) 分页：按 ordering 加上主键排序，翻页时用上一页最后一行的值过滤，
+    不使用 OFFSET，第 10000 页与第 1 页的查询代价相同。
+    """
+
+    list_display = ('__str__',)
+    list_per_page = 50
+
+    object_list_template = None
+
+    def init_request(self, *args, **kwargs):
+        if not self.has_view_permission():
+            raise PermissionDenied
+
+    @cached_property
+    def list_ordering(self):
+        return self.get_list_ordering()
+
+    @cached_property
+    def cursor(self):
+        return self.get_cursor()
+
+    @filter_hook
+    def get_list_ordering(self):
+        """
+        返回 [(field, descending), ...]，在 get_ordering 之后补上主键保证排序唯一。
+        keyset 分页需要能直接比较的字段，所以只支持本 model 上非空的字段，
+        其他字段（可为空的、关联 model 上的）无法用于 keyset 分页，这时记录警告并只按主键排序。
+        插件（例如按相关度排序的搜索）可以返回 annotate 出的值对应的字段，字段的 attname 为 annotation 的名称。
+        """
+        ordering = []
+        for name in self.get_ordering():
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = self.opts.pk if name == 'pk' else self.opts.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or field.null:
+                logger.warning(
+                    'The ordering field %s of %s must be a concrete, non-nullable field of the model, '
+                    'the changelist is ordered by the primary key only.', name, self.opts.label
+                )
+                return [(self.opts.pk, descending)]
+            ordering.append((field, descending))
+            if field.primary_key:
+                return ordering
+
+        ordering.append((self.opts.pk, ordering[-1][1] if ordering else True))
+        return ordering
+
+    def get_cursor(self):
+        """ 返回 (direction, values)，direction 为 'next' 或 'prev'，没有或无效的 cursor 返回 None """
+        token = self.request.GET.get(CURSOR_VAR)
+        if not token:
+            return None
+        try:
+            return self.decode_cursor(token)
+        except InvalidCursor:
+            return None
+
+    def encode_cursor(self, direction, obj):
+        values = [field.value_from_object(obj) for field, descending in self.list_ordering]
+        data = json.dumps({'d': direction, 'v': values}, cls=CursorJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8'))
+            direction, values = data['d'], data['v']
+            if direction not in ('next', 'prev') or len(values) != len(self.list_ordering):
+                raise InvalidCursor
+            return direction, [
+                field.to_python(value) for (field, descending), value in zip(self.list_ordering, values)
+            ]
+        except InvalidCursor:
+            raise
+        except Exception:
+            raise InvalidCursor
+
+    def keyset_filter(self, values, reverse=False):
+        """
+        返回排在 values 之后（reverse 为 True 时为之前）的行的过滤条件，例如按 (a, -b, pk) 排序时为
+        ``a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND pk > vpk)``
+        """
+        condition = Q()
+        equals = {}
+        for (field, descending), value in zip(self.list_ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equals, **{f'{field.attname}__{lookup}': value})
+            equals[field.attname] = value
+        return condition
+
+    def get_order_by(self, reverse=False):
+        return [
+            f'{"-" if descending != reverse else ""}{field.attname}'
+            for field, descending in self.list_ordering
+        ]
+
+    @filter_hook
+    def get_list_queryset(self):
+        """ 返回过滤后但未排序、未分页的 queryset，插件可以在这里加入过滤条件 """
+        return self.queryset()
+
+    @filter_hook
+    def get_page(self):
+        """ 返回当前页的对象列表、总行数，以及上一页、下一页的 cursor """
+        queryset = self.get_list_queryset()
+        result_count, approximate = self.get_result_count(queryset)
+        per_page = self.list_per_page
+        if self.cursor is None:
+            direction, values = 'next', None
+        else:
+            direction, values = self.cursor
+        reverse = direction == 'prev'
+
+        queryset = queryset.order_by(*self.get_order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+        # 多取一行用来判断该方向上是否还有下一页
+        result_list = list(queryset[:per_page + 1])
+        has_more = len(result_list) > per_page
+        result_list = result_list[:per_page]
+        if reverse:
+            result_list.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = values is not None, has_more
+
+        return {
+            'result_count': result_count,
+            'result_count_approximate': approximate,
+            'result_list': result_list,
+            'prev_cursor': self.encode_cursor('prev', result_list[0]) if has_prev and result_list else None,
+            'next_cursor': self.encode_cursor('next', result_list[-1]) if has_next and result_list else None,
+        }
+
+    def get_query_string(self, new_params=None, remove=None):
+        params = self.request.GET.copy()
+        for key in remove or ():
+            params.pop(key, None)
+        for key, value in (new_params or {}).items():
+            if value is None:
+                params.pop(key, None)
+            else:
+                params[key] = value
+        return f'?{params.urlencode()}' if params else '?'
+
+    def label_for_field(self, name):
+        if name == '__str__':
+            return force_text(capfirst(self.opts.verbose_name))
+        try:
+            return force_text(capfirst(self.opts.get_field(name).verbose_name))
+        except FieldDoesNotExist:
+            attr = getattr(self, name, None) or getattr(self.model, name)
+            return force_text(getattr(attr, 'short_description', capfirst(name.replace('_', ' '))))
+
+    def value_for_field(self, obj, name):
+        if name == '__str__':
+            return force_text(obj)
+        try:
+            field = self.opts.get_field(name)
+        except FieldDoesNotExist:
+            attr = getattr(self, name, None)
+            if callable(attr):
+                return attr(obj)
+            value = getattr(obj, name)
+            return value() if callable(value) else value
+        if field.choices:
+            return getattr(obj, f'get_{field.name}_display')()
+        return getattr(obj, field.name)
+
+    @filter_hook
+    def result_headers(self):
+        return [{'name': name, 'label': self.label_for_field(name)} for name in self.list_display]
+
+    @filter_hook
+    def result_item(self, obj, name):
+        return {'name': name, 'value': self.value_for_field(obj, name)}
+
+    @filter_hook
+    def result_row(self, obj):
+        return {'object': obj, 'cells': [self.result_item(obj, name) for name in self.list_display]}
+
+    @filter_hook
+    def get_context(self):
+        page = self.get_page()
+        new_context = {
+            'title': _('%s List') % force_text(self.opts.verbose_name),
+            'result_headers': self.result_headers(),
+            'results': [self.result_row(obj) for obj in page['result_list']],
+            'result_list': page['result_list'],
+            'result_count': page['result_count'],
+            'result_count_approximate': page['result_count_approximate'],
+            'prev_url': page['prev_cursor'] and self.get_query_string({CURSOR_VAR: page['prev_cursor']}),
+            'next_url': page['next_cursor'] and self.get_query_string({CURSOR_VAR: page['next_cursor']}),
+            'first_url': self.get_query_string(remove=[CURSOR_VAR]) if self.cursor else None,
+            'has_add_permission': self.has_add_permission(),
+        }
+        context = super(ListAdminView, self).get_context()
+        context.update(new_context)
+        return context
+
+    @filter_hook
+    def get_media(self):
+        return super(ListAdminView, self).get_media() + self.vendor('xadmin.page.list.js')
+
+    @filter_hook
+    def get_breadcrumb(self):
+        bcs = super(ListAdminView, self).get_breadcrumb()
+        bcs[-1].pop('url', None)
+        return bcs
+
+    @never_cache
+    @filter_hook
+    def get(self, request, *args, **kwargs):
+        return TemplateResponse(
+            request,
+            self.object_list_template or self.get_template_list('views/model_list.html'),
+            self.get_context()
+        )
+
+    @csrf_protect_m
+    @filter_hook
+    def post(self, request, *args, **kwargs):
+        """ changelist 本身不处理 POST，由导入、actions 等插件处理 """
+        return self.http_method_not_allowed(request, *args, **kwargs)
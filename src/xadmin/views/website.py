@@ -1,10 +1,12 @@
 from django.contrib.auth import REDIRECT_FIELD_NAME
 from django.contrib.auth.views import LoginView as login
+from django.http import HttpResponseBadRequest
 from django.utils.translation import ugettext as _
 from django.views.decorators.cache import never_cache
 
 from xadmin.forms import AdminAuthenticationForm
-from xadmin.views import BaseAdminView
+from xadmin.models import UserSettings
+from xadmin.views import BaseAdminView, csrf_protect_m
 from xadmin.views.dashboard import Dashboard
 
 
@@ -38,3 +40,16 @@ class LoginView(BaseAdminView):
     @never_cache
     def post(self, request, *args, **kwargs):
         return self.get(request)
+
+
+class UserSettingView(BaseAdminView):
+    """ 保存当前用户的设置，由 $.save_user_settings 调用 """
+
+    @csrf_protect_m
+    def post(self, request, *args, **kwargs):
+        key = request.POST.get('key')
+        value = request.POST.get('value')
+        if not key or value is None or len(key) > UserSettings._meta.get_field('key').max_length:
+            return HttpResponseBadRequest()
+        self.save_user_setting(key, value)
+        return self.render_to_response({'result': 'success'})
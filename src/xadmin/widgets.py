@@ -0,0 +1,63 @@
+from django import forms
+from django.core.exceptions import ValidationError
+
+from xadmin.util import vendor
+
+
+class AutocompleteMixin:
+    """
+    外键、多对多字段的 autocomplete 控件，只渲染已选中的值，其他选项由 url（AutocompleteView）分页搜索返回，
+    不会读取关联表的所有行。
+    """
+
+    def __init__(self, url, attrs=None, choices=()):
+        super(AutocompleteMixin, self).__init__(attrs, choices)
+        self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super(AutocompleteMixin, self).build_attrs(base_attrs, extra_attrs)
+        attrs['class'] = f"{attrs.get('class', '')} select-search".strip()
+        attrs['data-search-url'] = self.url
+        return attrs
+
+    def get_selected_objects(self, value):
+        """ 只读取选中的对象，忽略无法转换的值 """
+        field = self.choices.field
+        opts = field.queryset.model._meta
+        to_field = field.to_field_name or 'pk'
+        model_field = opts.get_field(field.to_field_name) if field.to_field_name else opts.pk
+        values = []
+        for v in value:
+            if v in field.empty_values:
+                continue
+            try:
+                values.append(model_field.to_python(v))
+            except ValidationError:
+                continue
+        if not values:
+            return []
+        return field.queryset.filter(**{f'{to_field}__in': values})
+
+    def optgroups(self, name, value, attrs=None):
+        groups = []
+        index = 0
+        if not self.is_required and not self.allow_multiple_selected:
+            groups.append((None, [self.create_option(name, '', '', False, index)], index))
+            index += 1
+        for obj in self.get_selected_objects(value):
+            option_value, option_label = self.choices.choice(obj)
+            groups.append((None, [self.create_option(name, option_value, option_label, True, index)], index))
+            index += 1
+        return groups
+
+    @property
+    def media(self):
+        return vendor('select.js', 'select.css', 'xadmin.widget.select.js')
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass